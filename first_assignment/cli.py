@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Command-line entry point for the entity linking evaluation.
+
+    python cli.py load     [--data dev_nl.tsv] [--max-sentences N] [--jsonl]
+    python cli.py sample   [--size 100] [--seed 42] [--jsonl]
+    python cli.py evaluate --samples 25 [--linker llm|local] [--output FILE]
+                           [--index-data train_nl.tsv] [--titles FILE] [--self-index]
+    python cli.py analyze  [RESULTS]
+    python cli.py export   [RESULTS] [CSV]
+
+Every subcommand imports its module when it runs, and only `evaluate` with
+the LLM linker imports the OpenAI SDK, so the offline subcommands start fast
+enough to be called in shell loops, e.g.
+
+    for f in evaluation_results_*.json; do python cli.py export "$f" "${f%.json}.csv"; done
+"""
+
+import argparse
+import os
+import sys
+
+
+def add_data_arguments(parser, max_sentences=100, help='sentences to load'):
+    parser.add_argument('--data', default='dev_nl.tsv', help='MultiNERD TSV file')
+    parser.add_argument('--max-sentences', type=int, default=max_sentences, help=help)
+
+
+def print_sentences(data, jsonl):
+    if jsonl:
+        import json
+        for item in data:
+            print(json.dumps(item, ensure_ascii=False))
+        return
+    for i, item in enumerate(data, 1):
+        print(f"{i}. {item['sentence']}")
+        print(f"   Entities: {item['entities']}")
+
+
+def cmd_load(args):
+    from evaluation import load_multinerd_data
+
+    data = load_multinerd_data(args.data, max_sentences=args.max_sentences)
+    print_sentences(data, args.jsonl)
+    print(f"Loaded {len(data)} sentences with entities", file=sys.stderr)
+
+
+def cmd_sample(args):
+    from evaluation import get_random_sample, load_multinerd_data
+
+    data = load_multinerd_data(args.data, max_sentences=args.max_sentences)
+    sample = get_random_sample(data, sample_size=args.size, seed=args.seed)
+    print_sentences(sample, args.jsonl)
+    print(f"Sampled {len(sample)} of {len(data)} sentences", file=sys.stderr)
+
+
+def cmd_evaluate(args):
+    from evaluation import load_multinerd_data, run_evaluation
+
+    data = load_multinerd_data(args.data, max_sentences=args.max_sentences or max(100, args.samples))
+    predictor = None
+    if args.linker == 'local':
+        from local_linker import LocalLinker, index_from_args
+        predictor = LocalLinker(index_from_args(args, data)).predict
+    if run_evaluation(args.samples, output_file=args.output, predictor=predictor, data=data) is None:
+        return 1
+    return 0
+
+
+def cmd_analyze(args):
+    from error_analysis import analyze_errors, print_error_analysis
+
+    print_error_analysis(analyze_errors(args.results))
+
+
+def cmd_export(args):
+    from extract_results_to_csv import extract_results_to_csv
+
+    extract_results_to_csv(args.results, args.csv)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Entity linking evaluation on MultiNERD Dutch")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    load = sub.add_parser('load', help='load and print the sentences with entities')
+    add_data_arguments(load)
+    load.add_argument('--jsonl', action='store_true', help='print one JSON object per sentence')
+    load.set_defaults(func=cmd_load)
+
+    sample = sub.add_parser('sample', help='print the random evaluation sample')
+    add_data_arguments(sample)
+    sample.add_argument('--size', type=int, default=100, help='sample size')
+    sample.add_argument('--seed', type=int, default=42, help='random seed')
+    sample.add_argument('--jsonl', action='store_true', help='print one JSON object per sentence')
+    sample.set_defaults(func=cmd_sample)
+
+    evaluate = sub.add_parser('evaluate', help='evaluate the sample and save the results JSON')
+    add_data_arguments(evaluate, max_sentences=None,
+                       help='sentences to load (default: the larger of 100 and --samples)')
+    evaluate.add_argument('--samples', type=int, default=5,
+                          help='sentences to evaluate: 5 (quick test), 25 (medium) or 100 (full)')
+    evaluate.add_argument('--linker', choices=['llm', 'local'], default='llm',
+                          help="'local' uses local_linker instead of API calls")
+    evaluate.add_argument('--output', help='results file (default: evaluation_results_{N}samples.json)')
+    # Same options as local_linker.add_index_arguments, without importing it here
+    evaluate.add_argument('--index-data', default='train_nl.tsv',
+                          help="with --linker local: MultiNERD TSV whose gold titles are indexed, "
+                               "a split other than --data ('' for --titles only)")
+    evaluate.add_argument('--titles', help='with --linker local: file with one Wikipedia title per line')
+    evaluate.add_argument('--self-index', action='store_true',
+                          help='with --linker local: index the gold titles of the evaluated sentences '
+                               '(leaks the labels: an upper bound, not a baseline)')
+    evaluate.set_defaults(func=cmd_evaluate)
+
+    analyze = sub.add_parser('analyze', help='detailed error analysis of a results file')
+    analyze.add_argument('results', nargs='?', default='evaluation_results_100samples.json')
+    analyze.set_defaults(func=cmd_analyze)
+
+    export = sub.add_parser('export', help='convert a results file to CSV')
+    export.add_argument('results', nargs='?', default='evaluation_results_100samples.json')
+    export.add_argument('csv', nargs='?', default='evaluation_dataset_100sentences.csv')
+    export.set_defaults(func=cmd_export)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except BrokenPipeError:
+        # Output was piped into e.g. head; silence the flush at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
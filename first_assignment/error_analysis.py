@@ -3,6 +3,7 @@
 Detailed error analysis for the entity linking evaluation.
 """
 
+import argparse
 import json
 from collections import Counter, defaultdict
 
@@ -65,11 +66,10 @@ def analyze_errors(json_file_path):
         'hallucination_errors': hallucination_errors[:10]
     }
 
-if __name__ == "__main__":
-    json_file = "evaluation_results_100samples.json"
-    
-    errors = analyze_errors(json_file)
-    
+def print_error_analysis(errors):
+    """
+    Print examples of each error category.
+    """
     print("🔍 DETAILED ERROR ANALYSIS")
     print("=" * 60)
     
@@ -91,4 +91,15 @@ if __name__ == "__main__":
     for i, error in enumerate(errors['hallucination_errors'][:5], 1):
         print(f"  {i}. Hallucinated: '{error['predicted']}'")
         print(f"     True entities: {error['true_entities']}")
-        print(f"     Sentence: {error['sentence']}\n")
\ No newline at end of file
+        print(f"     Sentence: {error['sentence']}\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Detailed error analysis of entity linking results")
+    parser.add_argument('results', nargs='?', default='evaluation_results_100samples.json',
+                        help='evaluation results JSON (default: evaluation_results_100samples.json)')
+    args = parser.parse_args()
+    
+    print_error_analysis(analyze_errors(args.results))
+
+if __name__ == "__main__":
+    main()
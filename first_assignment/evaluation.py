@@ -6,14 +6,16 @@ This script evaluates LLM performance on entity linking using MultiNERD Dutch de
 We compare predicted Wikipedia page titles from OpenAI GPT models against ground truth annotations.
 """
 
+import argparse
 import csv
 import json
 import random
 import os
 from collections import defaultdict
 import re
-from dotenv import load_dotenv
-from openai import AzureOpenAI
+
+# dotenv and openai are imported in make_client only, so that loading data and
+# scoring results does not pay for importing the OpenAI SDK
 
 def load_multinerd_data(file_path="dev_nl.tsv", max_sentences=100):
     """
@@ -24,7 +26,9 @@ def load_multinerd_data(file_path="dev_nl.tsv", max_sentences=100):
         max_sentences: Maximum number of sentences to process
     
     Returns:
-        List of dictionaries with 'sentence' and 'entities' keys
+        List of dictionaries with 'sentence', 'entities' and 'mentions' keys.
+        'mentions' holds the NER spans (BIO tags in column 2) as dictionaries
+        with 'text', 'type' and the gold 'title' (column 6, may be empty).
     """
     def filter_entity_type(tag):
         try:
@@ -46,24 +50,45 @@ def load_multinerd_data(file_path="dev_nl.tsv", max_sentences=100):
         reader = csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE)
         tokens = []
         entities = []
+        mentions = []
+        span = None
         count = 0
         
         for row in reader:
             if len(row) >= 3:  # Token row
                 tokens.append(row[1])  # Add token
-                if len(row) > 6 and row[6] and filter_entity_type(row[2]):
-                    entities.append(row[6])  # Add Wikipedia title
+                title = row[6] if len(row) > 6 else ''
+                if title and filter_entity_type(row[2]):
+                    entities.append(title)  # Add Wikipedia title
+                
+                # Collect BIO spans as mentions
+                tag = row[2]
+                if tag.startswith('I-') and span and span['type'] == tag[2:]:
+                    span['tokens'].append(row[1])
+                    span['title'] = span['title'] or title
+                elif tag.startswith(('B-', 'I-')):
+                    span = {'tokens': [row[1]], 'type': tag[2:], 'title': title}
+                    if filter_entity_type(tag):
+                        mentions.append(span)
+                else:
+                    span = None
             else:  # End of sentence
                 if entities and count < max_sentences:
                     sentence = detokenize(tokens)
                     annotations.append({
                         'sentence': sentence,
-                        'entities': list(set(entities))  # Remove duplicates
+                        'entities': list(set(entities)),  # Remove duplicates
+                        'mentions': [
+                            {'text': detokenize(m['tokens']), 'type': m['type'], 'title': m['title']}
+                            for m in mentions
+                        ]
                     })
                     count += 1
                 
                 # Reset for next sentence
                 entities = []
+                mentions = []
+                span = None
                 tokens = []
     
     return annotations
@@ -79,9 +104,13 @@ def get_random_sample(data, sample_size=100, seed=42):
     
     return random.sample(data, sample_size)
 
-def get_entity_links(sentence, client, deployment_name):
+def get_entity_links(sentence, client, deployment_name, usage=None):
     """
     Get Wikipedia page titles for named entities in a Dutch sentence using Azure OpenAI.
+    
+    Args:
+        usage: Optional dictionary in which the number of 'calls' and the
+               'prompt_tokens' / 'completion_tokens' reported by the API are accumulated
     """
     try:
         response = client.chat.completions.create(
@@ -100,6 +129,12 @@ def get_entity_links(sentence, client, deployment_name):
             max_tokens=200
         )
         
+        if usage is not None:
+            usage['calls'] = usage.get('calls', 0) + 1
+            if getattr(response, 'usage', None) is not None:
+                usage['prompt_tokens'] = usage.get('prompt_tokens', 0) + response.usage.prompt_tokens
+                usage['completion_tokens'] = usage.get('completion_tokens', 0) + response.usage.completion_tokens
+        
         result = response.choices[0].message.content.strip()
         
         if result.lower() in ['geen', 'none', '']:
@@ -160,7 +195,64 @@ def calculate_metrics(predicted_entities, true_entities):
         'fn': fn
     }
 
-def evaluate_sample(sample_data, client, deployment_name, max_samples=10):
+def score_prediction(item, predicted_entities):
+    """
+    Score the predictions for one sentence.
+    
+    Args:
+        item: Sentence dictionary with 'sentence' and 'entities'
+        predicted_entities: List of predicted Wikipedia titles
+    
+    Returns:
+        Result dictionary as stored in 'detailed_results'
+    """
+    return {
+        'sentence': item['sentence'],
+        'true_entities': item['entities'],
+        'predicted_entities': predicted_entities,
+        'metrics': calculate_metrics(predicted_entities, item['entities'])
+    }
+
+def collect_errors(error_analysis, result):
+    """
+    Add the false positives and false negatives of one result to error_analysis.
+    """
+    metrics = result['metrics']
+    predicted = set(normalize_title(p) for p in result['predicted_entities'])
+    true = set(normalize_title(t) for t in result['true_entities'])
+    
+    if metrics['fp'] > 0:
+        error_analysis['false_positives'].extend([
+            e for e in result['predicted_entities'] if normalize_title(e) not in true
+        ])
+    
+    if metrics['fn'] > 0:
+        error_analysis['false_negatives'].extend([
+            e for e in result['true_entities'] if normalize_title(e) not in predicted
+        ])
+
+def overall_metrics(all_metrics):
+    """
+    Micro-averaged precision, recall and F1 over per-sentence metrics.
+    """
+    total_tp = sum(m['tp'] for m in all_metrics)
+    total_fp = sum(m['fp'] for m in all_metrics) 
+    total_fn = sum(m['fn'] for m in all_metrics)
+    
+    precision = total_tp / (total_tp + total_fp) if (total_tp + total_fp) > 0 else 0.0
+    recall = total_tp / (total_tp + total_fn) if (total_tp + total_fn) > 0 else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if (precision + recall) > 0 else 0.0
+    
+    return {
+        'precision': precision,
+        'recall': recall,
+        'f1': f1,
+        'total_tp': total_tp,
+        'total_fp': total_fp, 
+        'total_fn': total_fn
+    }
+
+def evaluate_sample(sample_data, client, deployment_name, max_samples=10, predictor=None, verbose=True):
     """
     Evaluate entity linking performance on a sample of sentences.
     
@@ -168,73 +260,41 @@ def evaluate_sample(sample_data, client, deployment_name, max_samples=10):
         sample_data: List of sentences with ground truth entities
         client: OpenAI client instance
         max_samples: Maximum number of samples to evaluate (for testing)
+        predictor: Optional function taking a sentence dictionary and returning
+                   predicted titles (e.g. local_linker.LocalLinker.predict);
+                   defaults to get_entity_links with the given client
+        verbose: Print every sentence while evaluating
     
     Returns:
         Dictionary with overall metrics and detailed results
     """
+    if predictor is None:
+        def predictor(item):
+            return get_entity_links(item['sentence'], client, deployment_name)
+    
     results = []
-    all_metrics = []
     error_analysis = defaultdict(list)
     
     print(f"Evaluating {min(len(sample_data), max_samples)} sentences...\n")
     
     for i, item in enumerate(sample_data[:max_samples]):
-        sentence = item['sentence']
-        true_entities = item['entities']
+        if verbose:
+            print(f"\n[{i+1}] Sentence: {item['sentence']}")
+            print(f"Ground truth: {item['entities']}")
         
-        print(f"\n[{i+1}] Sentence: {sentence}")
-        print(f"Ground truth: {true_entities}")
-        
-        # Get predictions
-        predicted_entities = get_entity_links(sentence, client, deployment_name)
-        print(f"Predicted: {predicted_entities}")
-        
-        # Calculate metrics for this sentence
-        metrics = calculate_metrics(predicted_entities, true_entities)
-        all_metrics.append(metrics)
-        
-        print(f"Metrics: P={metrics['precision']:.3f}, R={metrics['recall']:.3f}, F1={metrics['f1']:.3f}")
-        
-        # Store detailed results
-        result = {
-            'sentence': sentence,
-            'true_entities': true_entities,
-            'predicted_entities': predicted_entities,
-            'metrics': metrics
-        }
+        # Get predictions and score them
+        predicted_entities = predictor(item)
+        result = score_prediction(item, predicted_entities)
         results.append(result)
+        collect_errors(error_analysis, result)
         
-        # Error analysis
-        if metrics['fp'] > 0:
-            error_analysis['false_positives'].extend([
-                e for e in predicted_entities 
-                if normalize_title(e) not in set(normalize_title(t) for t in true_entities)
-            ])
-        
-        if metrics['fn'] > 0:
-            error_analysis['false_negatives'].extend([
-                e for e in true_entities
-                if normalize_title(e) not in set(normalize_title(p) for p in predicted_entities) 
-            ])
-    
-    # Calculate overall metrics
-    total_tp = sum(m['tp'] for m in all_metrics)
-    total_fp = sum(m['fp'] for m in all_metrics) 
-    total_fn = sum(m['fn'] for m in all_metrics)
-    
-    overall_precision = total_tp / (total_tp + total_fp) if (total_tp + total_fp) > 0 else 0.0
-    overall_recall = total_tp / (total_tp + total_fn) if (total_tp + total_fn) > 0 else 0.0
-    overall_f1 = 2 * overall_precision * overall_recall / (overall_precision + overall_recall) if (overall_precision + overall_recall) > 0 else 0.0
+        if verbose:
+            metrics = result['metrics']
+            print(f"Predicted: {predicted_entities}")
+            print(f"Metrics: P={metrics['precision']:.3f}, R={metrics['recall']:.3f}, F1={metrics['f1']:.3f}")
     
     return {
-        'overall_metrics': {
-            'precision': overall_precision,
-            'recall': overall_recall,
-            'f1': overall_f1,
-            'total_tp': total_tp,
-            'total_fp': total_fp, 
-            'total_fn': total_fn
-        },
+        'overall_metrics': overall_metrics([r['metrics'] for r in results]),
         'detailed_results': results,
         'error_analysis': dict(error_analysis)
     }
@@ -278,37 +338,57 @@ def print_evaluation_report(results):
     
     print(f"\n" + "=" * 60)
 
-def main():
+def make_client():
     """
-    Main evaluation function.
+    Create the Azure OpenAI client from .env, or return (None, None) if unconfigured.
     """
-    # Load Azure OpenAI configuration
+    from dotenv import load_dotenv
+    from openai import AzureOpenAI
+
     load_dotenv()
     api_key = os.getenv('AZURE_OPENAI_API_KEY')
     endpoint = os.getenv('AZURE_OPENAI_ENDPOINT')
     api_version = os.getenv('AZURE_OPENAI_API_VERSION')
     deployment_name = os.getenv('AZURE_OPENAI_DEPLOYMENT_NAME')
-    
     if not all([api_key, endpoint, api_version, deployment_name]):
-        print("Error: Missing Azure OpenAI configuration in .env file")
-        print("Required: AZURE_OPENAI_API_KEY, AZURE_OPENAI_ENDPOINT, AZURE_OPENAI_API_VERSION, AZURE_OPENAI_DEPLOYMENT_NAME")
-        return
-    
-    client = AzureOpenAI(
-        api_key=api_key,
-        api_version=api_version,
-        azure_endpoint=endpoint
-    )
-    
-    print(f"Azure OpenAI Configuration:")
-    print(f"  Endpoint: {endpoint}")
-    print(f"  Deployment: {deployment_name}")
-    print(f"  API Version: {api_version}")
-    print()
+        return None, None
+    return AzureOpenAI(api_key=api_key, api_version=api_version, azure_endpoint=endpoint), deployment_name
+
+def run_evaluation(max_samples=5, data_path="dev_nl.tsv", max_sentences=None, output_file=None, predictor=None,
+                   data=None):
+    """
+    Load the data, evaluate a sample, print the report and save the results.
+    
+    Args:
+        max_samples: Number of sampled sentences to evaluate
+        max_sentences: Sentences to load (default: at least max_samples, and at least 100)
+        data: Already loaded sentences; data_path and max_sentences are then unused
+        output_file: Where to save the results (default: evaluation_results_{N}samples.json,
+                     N being the number of sentences actually evaluated)
+        predictor: Optional predictor as in evaluate_sample; without one the
+                   Azure OpenAI client is created from the .env file
+    
+    Returns:
+        The evaluation results, or None if the client is not configured
+    """
+    client = deployment_name = None
+    if predictor is None:
+        client, deployment_name = make_client()
+        if client is None:
+            print("Error: Missing Azure OpenAI configuration in .env file")
+            print("Required: AZURE_OPENAI_API_KEY, AZURE_OPENAI_ENDPOINT, AZURE_OPENAI_API_VERSION, AZURE_OPENAI_DEPLOYMENT_NAME")
+            return None
+        
+        print(f"Azure OpenAI Configuration:")
+        print(f"  Endpoint: {os.getenv('AZURE_OPENAI_ENDPOINT')}")
+        print(f"  Deployment: {deployment_name}")
+        print(f"  API Version: {os.getenv('AZURE_OPENAI_API_VERSION')}")
+        print()
     
     # Load the data
-    print("Loading MultiNERD data...")
-    data = load_multinerd_data()
+    if data is None:
+        print("Loading MultiNERD data...")
+        data = load_multinerd_data(data_path, max_sentences=max_sentences or max(100, max_samples))
     print(f"Loaded {len(data)} sentences with entities")
     
     if data:
@@ -316,8 +396,8 @@ def main():
         print(f"Sentence: {data[0]['sentence']}")
         print(f"Entities: {data[0]['entities']}")
     
-    # Get sample for evaluation
-    sample_data = get_random_sample(data, sample_size=100)
+    # Get sample for evaluation; runs of up to 100 sentences use a prefix of the same sample
+    sample_data = get_random_sample(data, sample_size=max(100, max_samples))
     print(f"\nSample size: {len(sample_data)}")
     
     # Test metrics function
@@ -331,40 +411,22 @@ def main():
     print(f"Test ground truth: {test_true}")
     print(f"Test metrics: {test_metrics}")
     
-    # Ask user for evaluation size
-    print("\n" + "="*40)
-    print("EVALUATION OPTIONS")
-    print("="*40)
-    print("Choose evaluation size:")
-    print("1. Small test (5 sentences) - Quick test, minimal API calls")
-    print("2. Medium test (25 sentences) - Moderate evaluation")
-    print("3. Full evaluation (100 sentences) - Complete evaluation, ~100 API calls")
-    
-    while True:
-        choice = input("\nEnter your choice (1, 2, or 3): ").strip()
-        if choice == '1':
-            max_samples = 5
-            break
-        elif choice == '2':
-            max_samples = 25
-            break
-        elif choice == '3':
-            max_samples = 100
-            break
-        else:
-            print("Invalid choice. Please enter 1, 2, or 3.")
-    
-    # Run evaluation
-    print(f"\nStarting evaluation with {max_samples} sentences...")
-    print("This will make OpenAI API calls. Please wait...")
-    
-    evaluation_results = evaluate_sample(sample_data, client, deployment_name, max_samples=max_samples)
+    # Run evaluation; the data may hold fewer sentences than requested
+    evaluated = len(sample_data[:max_samples])
+    if evaluated < max_samples:
+        print(f"\nOnly {evaluated} sentences available; {max_samples} were requested")
+    print(f"\nStarting evaluation with {evaluated} sentences...")
+    if predictor is None:
+        print("This will make OpenAI API calls. Please wait...")
+    
+    evaluation_results = evaluate_sample(sample_data, client, deployment_name, max_samples=max_samples,
+                                         predictor=predictor)
     
     # Print the report
     print_evaluation_report(evaluation_results)
     
     # Save results to file
-    output_file = f'evaluation_results_{max_samples}samples.json'
+    output_file = output_file or f'evaluation_results_{evaluated}samples.json'
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(evaluation_results, f, indent=2, ensure_ascii=False)
     
@@ -375,13 +437,30 @@ def main():
     print(f"\n" + "="*40)
     print("SUMMARY FOR ASSIGNMENT REPORT")
     print("="*40)
-    print(f"Evaluation Size: {max_samples} sentences")
+    print(f"Evaluation Size: {evaluated} sentences")
     print(f"Precision: {overall['precision']:.3f}")
     print(f"Recall: {overall['recall']:.3f}")  
     print(f"F1-Score: {overall['f1']:.3f}")
     print(f"True Positives: {overall['total_tp']}")
     print(f"False Positives: {overall['total_fp']}")
     print(f"False Negatives: {overall['total_fn']}")
+    
+    return evaluation_results
+
+def main():
+    """
+    Main evaluation function.
+    """
+    parser = argparse.ArgumentParser(description="Entity linking evaluation with Azure OpenAI on MultiNERD")
+    parser.add_argument('--samples', type=int, default=5,
+                        help='sentences to evaluate: 5 (quick test), 25 (medium) or 100 (full, ~100 API calls)')
+    parser.add_argument('--data', default='dev_nl.tsv', help='MultiNERD TSV file')
+    parser.add_argument('--max-sentences', type=int,
+                        help='sentences to load (default: the larger of 100 and --samples)')
+    parser.add_argument('--output', help='results file (default: evaluation_results_{N}samples.json)')
+    args = parser.parse_args()
+    
+    run_evaluation(args.samples, args.data, args.max_sentences, args.output)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -3,6 +3,7 @@
 Extract evaluation results to CSV format for analysis and submission.
 """
 
+import argparse
 import json
 import csv
 from pathlib import Path
@@ -82,12 +83,19 @@ def extract_results_to_csv(json_file_path, csv_file_path):
     
     return csv_file_path
 
-if __name__ == "__main__":
-    json_file = "evaluation_results_100samples.json"
-    csv_file = "evaluation_dataset_100sentences.csv"
+def main():
+    parser = argparse.ArgumentParser(description="Convert evaluation results JSON to CSV")
+    parser.add_argument('json_file', nargs='?', default='evaluation_results_100samples.json',
+                        help='evaluation results JSON (default: evaluation_results_100samples.json)')
+    parser.add_argument('csv_file', nargs='?', default='evaluation_dataset_100sentences.csv',
+                        help='output CSV (default: evaluation_dataset_100sentences.csv)')
+    args = parser.parse_args()
     
-    if Path(json_file).exists():
-        extract_results_to_csv(json_file, csv_file)
+    if Path(args.json_file).exists():
+        extract_results_to_csv(args.json_file, args.csv_file)
     else:
-        print(f"❌ Error: {json_file} not found!")
-        print("Make sure you have run the full evaluation first.")
\ No newline at end of file
+        print(f"❌ Error: {args.json_file} not found!")
+        print("Make sure you have run the full evaluation first.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Local Entity Linker for MultiNERD
+
+A non-LLM baseline that links NER mentions to Wikipedia page titles with an
+inverted index, so unambiguous mentions like "Amsterdam" need no API call.
+
+The index holds every title's surface form (underscores as spaces, without a
+trailing disambiguation like "(stad)") under three keys:
+  - the full normalized surface form (exact lookup),
+  - its word tokens,
+  - its character trigrams.
+A mention is looked up exactly first; otherwise candidates are gathered from
+the token and trigram postings (skipping very common trigrams) and ranked by
+trigram Dice similarity. Titles that share a surface form are ranked by how
+often they occur as gold titles.
+
+The linker can run on its own through the evaluate_sample scoring path, or as
+the first tier of a TieredLinker that only sends sentences with low-confidence
+mentions to get_entity_links.
+
+By default the index is built from a different split (--index-data) and/or a
+titles dump, never from the evaluated sentences: indexing their gold titles
+would hand the linker the answers. --self-index does exactly that on purpose,
+as an upper bound for the candidate lookup.
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from collections import Counter, defaultdict
+
+from evaluation import (evaluate_sample, get_random_sample, load_multinerd_data, make_client,
+                        normalize_title, print_evaluation_report)
+
+DEFAULT_INDEX_DATA = 'train_nl.tsv'
+
+DISAMBIGUATION = re.compile(r'\s*\([^)]*\)$')
+TOKEN = re.compile(r'\w+')
+
+
+def surface_form(title):
+    """
+    Normalized surface form of a title: "Antwerpen_(stad)" -> "antwerpen".
+    """
+    return DISAMBIGUATION.sub('', normalize_title(title))
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    """
+    Inverted index from surface forms, tokens and character trigrams to titles.
+    """
+
+    def __init__(self, max_postings=5000):
+        self.titles = []                      # title id -> title
+        self.title_ids = {}                   # normalized title -> title id
+        self.prior = []                       # title id -> gold frequency
+        self.gram_counts = []                 # title id -> number of trigrams
+        self.exact = defaultdict(list)        # surface form -> title ids
+        self.tokens = defaultdict(list)       # token -> title ids
+        self.grams = defaultdict(list)        # trigram -> title ids
+        # Trigrams/tokens shared by more titles than this are skipped as stop-grams
+        self.max_postings = max_postings
+
+    def __len__(self):
+        return len(self.titles)
+
+    def add(self, title, count=0):
+        """
+        Add a title (or increase its gold frequency if already present).
+        """
+        key = normalize_title(title)
+        if not key:
+            return
+        title_id = self.title_ids.get(key)
+        if title_id is not None:
+            self.prior[title_id] += count
+            return
+
+        title_id = len(self.titles)
+        self.title_ids[key] = title_id
+        self.titles.append(title)
+        self.prior.append(count)
+
+        surface = surface_form(title)
+        grams = trigrams(surface)
+        self.gram_counts.append(len(grams))
+        self.exact[surface].append(title_id)
+        for token in set(TOKEN.findall(surface)):
+            self.tokens[token].append(title_id)
+        for gram in grams:
+            self.grams[gram].append(title_id)
+
+    def candidates(self, mention, k=5):
+        """
+        Rank candidate titles for a mention.
+
+        Returns:
+            List of (title, score) pairs, best first; scores are in [0, 1]
+        """
+        text = normalize_title(mention)
+        ids = self.exact.get(text)
+        if ids:
+            ranked = sorted(ids, key=lambda i: -self.prior[i])
+            return [(self.titles[i], 1.0) for i in ranked[:k]]
+
+        mention_grams = trigrams(text)
+        overlap = Counter()
+        for gram in mention_grams:
+            postings = self.grams.get(gram, ())
+            if len(postings) <= self.max_postings:
+                overlap.update(postings)
+        # Titles sharing a rare token are candidates even with little trigram overlap
+        for token in TOKEN.findall(text):
+            postings = self.tokens.get(token, ())
+            if len(postings) <= self.max_postings:
+                for title_id in postings:
+                    overlap[title_id] += 0
+
+        scored = []
+        for title_id, shared in overlap.items():
+            dice = 2 * shared / (len(mention_grams) + self.gram_counts[title_id])
+            scored.append((dice, self.prior[title_id], title_id))
+        scored.sort(reverse=True)
+        return [(self.titles[i], dice) for dice, _, i in scored[:k]]
+
+    def link(self, mention):
+        """
+        Best title for a mention and a confidence in [0, 1].
+
+        The confidence is the similarity score, scaled down by the share of
+        the gold frequency that competing titles with the same score hold.
+        """
+        ranked = self.candidates(mention)
+        if not ranked:
+            return None, 0.0
+        best_title, best_score = ranked[0]
+        tied = [self.prior[self.title_ids[normalize_title(t)]] for t, s in ranked if s == best_score]
+        if len(tied) > 1:
+            share = (tied[0] + 1) / (sum(tied) + len(tied))
+            return best_title, best_score * share
+        return best_title, best_score
+
+
+def build_index(data=(), titles_file=None, max_postings=5000):
+    """
+    Build a TitleIndex from gold titles in MultiNERD data and/or a titles file.
+
+    Args:
+        data: Sentences as returned by load_multinerd_data
+        titles_file: Optional file with one Wikipedia title per line
+                     (e.g. a nlwiki all-titles-in-ns0 dump)
+    """
+    index = TitleIndex(max_postings=max_postings)
+    for item in data:
+        for mention in item.get('mentions', []):
+            if mention['title']:
+                index.add(mention['title'], count=1)
+    if titles_file:
+        with open(titles_file, encoding='utf-8') as f:
+            for line in f:
+                title = line.strip()
+                if title and title != 'page_title':
+                    index.add(title)
+    return index
+
+
+def add_index_arguments(parser):
+    parser.add_argument('--index-data', default=DEFAULT_INDEX_DATA,
+                        help=f"MultiNERD TSV whose gold titles are indexed, a split other than --data "
+                             f"(default: {DEFAULT_INDEX_DATA}; '' for --titles only)")
+    parser.add_argument('--titles', help='optional file with one Wikipedia title per line')
+    parser.add_argument('--self-index', action='store_true',
+                        help='index the gold titles of the evaluated sentences instead '
+                             '(leaks the labels: an upper bound, not a baseline)')
+
+def index_from_args(args, eval_data):
+    """
+    Build the TitleIndex selected by the add_index_arguments options.
+
+    Args:
+        eval_data: The sentences being evaluated; only indexed with --self-index
+    """
+    if args.self_index:
+        print("Warning: --self-index indexes the gold titles of the evaluated sentences; "
+              "scores are an upper bound, not a baseline.")
+        return build_index(eval_data, args.titles)
+    if args.index_data and os.path.abspath(args.index_data) == os.path.abspath(args.data):
+        raise SystemExit("Error: --index-data is the evaluated file; use another split, "
+                         "or --self-index to index it on purpose")
+    if not args.index_data and not args.titles:
+        raise SystemExit("Error: nothing to index; pass --index-data and/or --titles")
+    if args.index_data and not os.path.exists(args.index_data):
+        raise SystemExit(f"Error: {args.index_data} not found; pass another split as --index-data, "
+                         f"or --index-data '' with --titles")
+    index_data = load_multinerd_data(args.index_data, max_sentences=10 ** 9) if args.index_data else ()
+    return build_index(index_data, args.titles)
+
+
+class LocalLinker:
+    """
+    Predictor that links each NER mention of a sentence with the local index.
+    """
+
+    def __init__(self, index, min_confidence=0.0):
+        self.index = index
+        self.min_confidence = min_confidence
+        self.mentions = 0
+
+    def link_mentions(self, item):
+        """
+        Returns:
+            List of (mention text, title, confidence)
+        """
+        linked = []
+        for mention in item.get('mentions', []):
+            title, confidence = self.index.link(mention['text'])
+            linked.append((mention['text'], title, confidence))
+        self.mentions += len(linked)
+        return linked
+
+    def predict(self, item):
+        titles = []
+        for _, title, confidence in self.link_mentions(item):
+            if title and confidence >= self.min_confidence and title not in titles:
+                titles.append(title)
+        return titles
+
+
+class TieredLinker:
+    """
+    Predictor that keeps confident local links and escalates the rest.
+
+    If any mention of a sentence links below `threshold`, the sentence is sent
+    to get_entity_links once. LLM titles that correspond to a confidently
+    linked mention are dropped in favour of the local link; all others are kept.
+    """
+
+    def __init__(self, local, client, deployment_name, threshold=0.9):
+        self.local = local
+        self.client = client
+        self.deployment_name = deployment_name
+        self.threshold = threshold
+        self.calls = 0
+        self.escalated_mentions = 0
+        self.usage = {'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+
+    def predict(self, item):
+        from evaluation import get_entity_links
+
+        linked = self.local.link_mentions(item)
+        confident = [(text, title) for text, title, confidence in linked
+                     if title and confidence >= self.threshold]
+        uncertain = len(linked) - len(confident)
+
+        titles = []
+        for _, title in confident:
+            if title not in titles:
+                titles.append(title)
+        if not uncertain and linked:
+            return titles
+
+        self.calls += 1
+        self.escalated_mentions += uncertain
+        confident_grams = [trigrams(normalize_title(text)) for text, _ in confident]
+        covered = set(normalize_title(t) for t in titles)
+        for title in get_entity_links(item['sentence'], self.client, self.deployment_name, usage=self.usage):
+            grams = trigrams(surface_form(title))
+            duplicate = any(2 * len(grams & g) / (len(grams) + len(g)) >= 0.5 for g in confident_grams)
+            if not duplicate and normalize_title(title) not in covered:
+                titles.append(title)
+                covered.add(normalize_title(title))
+        return titles
+
+
+def run_predictor(name, sample_data, predictor, max_samples):
+    """
+    Evaluate one predictor and time it.
+
+    Returns:
+        (evaluation results, comparison row)
+    """
+    start = time.perf_counter()
+    results = evaluate_sample(sample_data, None, None, max_samples=max_samples,
+                              predictor=predictor, verbose=False)
+    seconds = time.perf_counter() - start
+    sentences = len(results['detailed_results'])
+    row = {
+        'linker': name,
+        'sentences': sentences,
+        'precision': results['overall_metrics']['precision'],
+        'recall': results['overall_metrics']['recall'],
+        'f1': results['overall_metrics']['f1'],
+        'seconds': seconds,
+        'sentences_per_second': sentences / seconds if seconds > 0 else float('inf'),
+        'llm_calls': 0,
+        'llm_tokens': 0,
+    }
+    return results, row
+
+def print_comparison(rows):
+    """
+    Print throughput, F1 and cost (LLM calls and tokens) per linker.
+    """
+    print("\n" + "=" * 90)
+    print("LINKER COMPARISON")
+    print("=" * 90)
+    print(f"{'Linker':<12} {'Sent.':>6} {'P':>7} {'R':>7} {'F1':>7} {'Sent./s':>10} {'LLM calls':>10} "
+          f"{'Calls/sent.':>11} {'LLM tokens':>11}")
+    for row in rows:
+        per_sentence = row['llm_calls'] / row['sentences'] if row['sentences'] else 0.0
+        print(f"{row['linker']:<12} {row['sentences']:>6} {row['precision']:>7.3f} {row['recall']:>7.3f} "
+              f"{row['f1']:>7.3f} {row['sentences_per_second']:>10.1f} {row['llm_calls']:>10} {per_sentence:>11.2f} "
+              f"{row['llm_tokens']:>11}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Local inverted-index entity linker for MultiNERD")
+    parser.add_argument('--data', default='dev_nl.tsv', help='MultiNERD TSV file to evaluate on')
+    add_index_arguments(parser)
+    parser.add_argument('--max-sentences', type=int, default=100, help='sentences to load')
+    parser.add_argument('--samples', type=int, default=100, help='sentences to evaluate')
+    parser.add_argument('--threshold', type=float, default=0.9,
+                        help='confidence below which a sentence is escalated to the LLM (with --tiered)')
+    parser.add_argument('--tiered', action='store_true', help='also run the LLM-only and tiered linkers')
+    args = parser.parse_args()
+
+    data = load_multinerd_data(args.data, max_sentences=args.max_sentences)
+    sample_data = get_random_sample(data, sample_size=args.samples)
+
+    start = time.perf_counter()
+    index = index_from_args(args, data)
+    print(f"Indexed {len(index)} titles in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    local = LocalLinker(index)
+    local_results, local_row = run_predictor('local', sample_data, local.predict, args.samples)
+    print(f"Linked {local.mentions} mentions, "
+          f"{local_row['seconds'] / max(local.mentions, 1) * 1e6:.1f} µs per mention")
+    print_evaluation_report(local_results)
+    rows = [local_row]
+
+    output_file = f'evaluation_results_local_{args.samples}samples.json'
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(local_results, f, indent=2, ensure_ascii=False)
+    print(f"Results saved to: {output_file}")
+
+    if args.tiered:
+        client, deployment_name = make_client()
+        if client is None:
+            print("Skipping LLM linkers: missing Azure OpenAI configuration in .env file")
+        else:
+            from evaluation import get_entity_links
+
+            usage = {'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+
+            def llm_predict(item):
+                return get_entity_links(item['sentence'], client, deployment_name, usage=usage)
+
+            _, llm_row = run_predictor('llm', sample_data, llm_predict, args.samples)
+            llm_row['llm_calls'] = usage['calls']
+            llm_row['llm_tokens'] = usage['prompt_tokens'] + usage['completion_tokens']
+
+            tiered = TieredLinker(LocalLinker(index), client, deployment_name, threshold=args.threshold)
+            _, tiered_row = run_predictor('tiered', sample_data, tiered.predict, args.samples)
+            tiered_row['llm_calls'] = tiered.calls
+            tiered_row['llm_tokens'] = tiered.usage['prompt_tokens'] + tiered.usage['completion_tokens']
+            print(f"Tiered: escalated {tiered.escalated_mentions} low-confidence mentions in {tiered.calls} calls")
+            rows += [llm_row, tiered_row]
+
+    print_comparison(rows)
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,8 @@
 import os
 
-from dotenv import load_dotenv
-from openai import AzureOpenAI
-
-load_dotenv()
-
-# Load Azure OpenAI configuration
-api_key = os.getenv('AZURE_OPENAI_API_KEY')
-endpoint = os.getenv('AZURE_OPENAI_ENDPOINT')
-api_version = os.getenv('AZURE_OPENAI_API_VERSION')
-deployment_name = os.getenv('AZURE_OPENAI_DEPLOYMENT_NAME')
-
-# Initialize Azure OpenAI client
-client = AzureOpenAI(
-    api_key=api_key,
-    api_version=api_version,
-    azure_endpoint=endpoint
-)
-
-print(f"Azure OpenAI Configuration:")
-print(f"  Endpoint: {endpoint}")
-print(f"  Deployment: {deployment_name}")
-print(f"  API Version: {api_version}")
-print()
+# Set by main()
+client = None
+deployment_name = None
 
 def get_entity_links(sentence, model=None):
     """
@@ -75,8 +55,41 @@ test_sentences = [
     "Deze restauratie werd geleid door C.H. Peters, die geadviseerd werd door P.J.H. Cuypers."
 ]
 
-for sentence in test_sentences:
-    print(f"Sentence: {sentence}")
-    predicted_titles = get_entity_links(sentence)
-    print(f"Predicted entities: {predicted_titles}")
-    print()
\ No newline at end of file
+def main():
+    """
+    Print the Azure OpenAI configuration and link the test sentences.
+    """
+    global client, deployment_name
+
+    from dotenv import load_dotenv
+    from openai import AzureOpenAI
+
+    load_dotenv()
+
+    # Load Azure OpenAI configuration
+    api_key = os.getenv('AZURE_OPENAI_API_KEY')
+    endpoint = os.getenv('AZURE_OPENAI_ENDPOINT')
+    api_version = os.getenv('AZURE_OPENAI_API_VERSION')
+    deployment_name = os.getenv('AZURE_OPENAI_DEPLOYMENT_NAME')
+
+    # Initialize Azure OpenAI client
+    client = AzureOpenAI(
+        api_key=api_key,
+        api_version=api_version,
+        azure_endpoint=endpoint
+    )
+
+    print(f"Azure OpenAI Configuration:")
+    print(f"  Endpoint: {endpoint}")
+    print(f"  Deployment: {deployment_name}")
+    print(f"  API Version: {api_version}")
+    print()
+
+    for sentence in test_sentences:
+        print(f"Sentence: {sentence}")
+        predicted_titles = get_entity_links(sentence)
+        print(f"Predicted entities: {predicted_titles}")
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Compact Record Types for Evaluation Runs
+
+evaluate_sample keeps every result as nested dictionaries:
+
+    {'sentence': ..., 'true_entities': [...], 'predicted_entities': [...],
+     'metrics': {'precision': ..., 'recall': ..., 'f1': ..., 'tp': ..., 'fp': ..., 'fn': ...}}
+
+and a results file loaded with json.load holds a separate string object for
+every occurrence of a title. For runs of 100k+ sentences this module offers
+slotted records instead:
+
+  TitleTable   interns titles: each distinct title is stored once and
+               referenced by an integer ID
+  Sentence     the sentence text and its gold title IDs
+  Metrics      the TP/FP/FN counts; precision, recall and F1 are computed
+               from them with the same formulas as calculate_metrics
+  Result       a Sentence, the predicted title IDs and their Metrics
+  Run          the TitleTable and Results of one run, plus any extra
+               top-level entries (e.g. 'sequential')
+
+Run.from_results / Run.to_results convert losslessly from and to the
+evaluate_sample format (error_analysis is rebuilt like collect_errors does).
+dump_run writes the same format with a "__type__" tag on every result and its
+metrics, and load_run reads such a file directly into records, converting
+only the tagged objects while the JSON is parsed. Untagged results files are
+read too, through Run.from_results.
+
+Usage:
+    python records.py check evaluation_results_100samples.json
+    python records.py bench --sentences 100000
+"""
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+from evaluation import normalize_title
+
+
+class TitleTable:
+    """
+    Interned titles; IDs are positions in the table.
+    """
+    __slots__ = ('titles', 'ids', 'normalized')
+
+    def __init__(self):
+        self.titles = []
+        self.ids = {}
+        self.normalized = []
+
+    def intern(self, title):
+        """
+        Return the ID of a title, adding it to the table if needed.
+        """
+        title_id = self.ids.get(title)
+        if title_id is None:
+            # The dictionary's int object is the one shared by all records
+            title_id = self.ids[title] = len(self.titles)
+            self.titles.append(title)
+            self.normalized.append(normalize_title(title))
+        return title_id
+
+    def intern_all(self, titles):
+        return tuple([self.intern(t) for t in titles])
+
+    def lookup(self, ids):
+        return [self.titles[i] for i in ids]
+
+    def __len__(self):
+        return len(self.titles)
+
+
+class Sentence:
+    __slots__ = ('text', 'entities')
+
+    def __init__(self, text, entities):
+        self.text = text
+        self.entities = entities
+
+
+class Metrics:
+    __slots__ = ('tp', 'fp', 'fn')
+
+    def __init__(self, tp, fp, fn):
+        self.tp = tp
+        self.fp = fp
+        self.fn = fn
+
+    @classmethod
+    def compare(cls, predicted, true, titles):
+        """
+        Count TP/FP/FN between predicted and true title IDs, on normalized titles.
+        """
+        pred_normalized = set(titles.normalized[i] for i in predicted)
+        true_normalized = set(titles.normalized[i] for i in true)
+        return cls(len(pred_normalized & true_normalized),
+                   len(pred_normalized - true_normalized),
+                   len(true_normalized - pred_normalized))
+
+    @property
+    def precision(self):
+        return self.tp / (self.tp + self.fp) if (self.tp + self.fp) > 0 else 0.0
+
+    @property
+    def recall(self):
+        return self.tp / (self.tp + self.fn) if (self.tp + self.fn) > 0 else 0.0
+
+    @property
+    def f1(self):
+        precision, recall = self.precision, self.recall
+        return 2 * precision * recall / (precision + recall) if (precision + recall) > 0 else 0.0
+
+    def to_dict(self):
+        return {
+            'precision': self.precision,
+            'recall': self.recall,
+            'f1': self.f1,
+            'tp': self.tp,
+            'fp': self.fp,
+            'fn': self.fn
+        }
+
+
+class Result:
+    __slots__ = ('sentence', 'predicted', 'metrics')
+
+    def __init__(self, sentence, predicted, metrics):
+        self.sentence = sentence
+        self.predicted = predicted
+        self.metrics = metrics
+
+    def to_dict(self, titles):
+        return {
+            'sentence': self.sentence.text,
+            'true_entities': titles.lookup(self.sentence.entities),
+            'predicted_entities': titles.lookup(self.predicted),
+            'metrics': self.metrics.to_dict()
+        }
+
+
+class Run:
+    """
+    The results of one evaluation run as slotted records.
+    """
+    __slots__ = ('titles', 'results', 'extra')
+
+    def __init__(self, titles=None):
+        self.titles = titles if titles is not None else TitleTable()
+        self.results = []
+        self.extra = {}
+
+    def add(self, sentence, predicted_entities):
+        """
+        Score the predicted titles for a Sentence and append the Result.
+        """
+        predicted = self.titles.intern_all(predicted_entities)
+        result = Result(sentence, predicted, Metrics.compare(predicted, sentence.entities, self.titles))
+        self.results.append(result)
+        return result
+
+    def add_dict(self, result):
+        """
+        Append a result dictionary in the 'detailed_results' format.
+        """
+        sentence = Sentence(result['sentence'], self.titles.intern_all(result['true_entities']))
+        m = result['metrics']
+        self.results.append(Result(sentence, self.titles.intern_all(result['predicted_entities']),
+                                   Metrics(m['tp'], m['fp'], m['fn'])))
+
+    @classmethod
+    def from_results(cls, results):
+        """
+        Build a Run from an evaluate_sample result dictionary.
+        """
+        run = cls()
+        for result in results['detailed_results']:
+            run.add_dict(result)
+        run.extra = {k: v for k, v in results.items()
+                     if k not in ('overall_metrics', 'detailed_results', 'error_analysis')}
+        return run
+
+    def overall_metrics(self):
+        total = Metrics(sum(r.metrics.tp for r in self.results),
+                        sum(r.metrics.fp for r in self.results),
+                        sum(r.metrics.fn for r in self.results))
+        return {
+            'precision': total.precision,
+            'recall': total.recall,
+            'f1': total.f1,
+            'total_tp': total.tp,
+            'total_fp': total.fp,
+            'total_fn': total.fn
+        }
+
+    def error_analysis(self):
+        """
+        False positive and false negative titles, in the order collect_errors lists them.
+        """
+        normalized = self.titles.normalized
+        errors = {}
+        for r in self.results:
+            predicted = set(normalized[i] for i in r.predicted)
+            true = set(normalized[i] for i in r.sentence.entities)
+            if r.metrics.fp > 0:
+                errors.setdefault('false_positives', []).extend(
+                    self.titles.titles[i] for i in r.predicted if normalized[i] not in true)
+            if r.metrics.fn > 0:
+                errors.setdefault('false_negatives', []).extend(
+                    self.titles.titles[i] for i in r.sentence.entities if normalized[i] not in predicted)
+        return errors
+
+    def to_results(self):
+        """
+        Convert back to the evaluate_sample result dictionary.
+        """
+        results = {
+            'overall_metrics': self.overall_metrics(),
+            'detailed_results': [r.to_dict(self.titles) for r in self.results],
+            'error_analysis': self.error_analysis()
+        }
+        results.update(self.extra)
+        return results
+
+
+def dumps_run(run, **kwargs):
+    """
+    Serialize a Run in the evaluate_sample format, tagging every result and
+    its metrics with "__type__" for loads_run.
+    """
+    results = run.to_results()
+    results['detailed_results'] = [
+        {'__type__': 'Result', **r, 'metrics': {'__type__': 'Metrics', **r['metrics']}}
+        for r in results['detailed_results']
+    ]
+    return json.dumps(results, ensure_ascii=False, **kwargs)
+
+def loads_run(text):
+    """
+    Parse a results JSON string straight into a Run.
+
+    Results tagged by dumps_run are converted while the JSON is parsed, so the
+    dictionaries of the whole run never exist at the same time. Other objects,
+    including anything under the extra top-level entries, are left as they
+    are; untagged results (e.g. from evaluation.py) are converted afterwards.
+    """
+    run = Run()
+
+    def hook(obj):
+        kind = obj.get('__type__')
+        if kind == 'Metrics':
+            return Metrics(obj['tp'], obj['fp'], obj['fn'])
+        if kind == 'Result':
+            sentence = Sentence(obj['sentence'], run.titles.intern_all(obj['true_entities']))
+            return Result(sentence, run.titles.intern_all(obj['predicted_entities']), obj['metrics'])
+        return obj
+
+    results = json.loads(text, object_hook=hook)
+    for result in results['detailed_results']:
+        if isinstance(result, Result):
+            run.results.append(result)
+        else:
+            run.add_dict(result)
+    run.extra = {k: v for k, v in results.items()
+                 if k not in ('overall_metrics', 'detailed_results', 'error_analysis')}
+    return run
+
+def dump_run(run, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(dumps_run(run, indent=2))
+
+def load_run(path):
+    with open(path, encoding='utf-8') as f:
+        return loads_run(f.read())
+
+
+# ============== BENCHMARK ==============
+
+def synthetic_results(n_sentences, n_titles=20000, seed=42):
+    """
+    A synthetic evaluate_sample result of n_sentences, serialized as JSON.
+    """
+    from evaluation import collect_errors, overall_metrics, score_prediction
+
+    rng = random.Random(seed)
+    titles = [f"Titel_{i}_{rng.choice(['(stad)', '(band)', '(film)', ''])}".rstrip('_') for i in range(n_titles)]
+    words = ['de', 'het', 'een', 'van', 'in', 'op', 'werd', 'door', 'met', 'en', 'stad', 'jaar']
+    results, errors = [], {'false_positives': [], 'false_negatives': []}
+    for i in range(n_sentences):
+        true = list(set(rng.choice(titles) for _ in range(rng.randint(1, 4))))
+        predicted = [t for t in true if rng.random() < 0.6] + [rng.choice(titles) for _ in range(rng.randint(0, 2))]
+        text = ' '.join(rng.choice(words) for _ in range(rng.randint(8, 25))) + f" {i} ."
+        result = score_prediction({'sentence': text, 'entities': true}, predicted)
+        results.append(result)
+        collect_errors(errors, result)
+    return json.dumps({
+        'overall_metrics': overall_metrics([r['metrics'] for r in results]),
+        'detailed_results': results,
+        'error_analysis': errors
+    }, ensure_ascii=False)
+
+
+def traced(build):
+    """
+    Build an object under tracemalloc; returns (object, retained bytes, peak bytes, seconds).
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    obj = build()
+    seconds = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current, peak, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact record types for evaluation results")
+    sub = parser.add_subparsers(dest='command', required=True)
+    check = sub.add_parser('check', help='verify the lossless round trips of results files')
+    check.add_argument('files', nargs='+')
+    bench = sub.add_parser('bench', help='compare the memory of dicts and records on a synthetic run')
+    bench.add_argument('--sentences', type=int, default=100000)
+    bench.add_argument('--titles', type=int, default=20000, help='distinct titles in the synthetic run')
+    args = parser.parse_args()
+
+    if args.command == 'check':
+        failed = 0
+        for path in args.files:
+            with open(path, encoding='utf-8') as f:
+                original = json.load(f)
+            run = load_run(path)
+            ok = (run.to_results() == original == Run.from_results(original).to_results()
+                  == loads_run(dumps_run(run)).to_results())
+            failed += not ok
+            print(f"{'✅' if ok else '❌'} {path}")
+        raise SystemExit(1 if failed else 0)
+
+    print(f"Generating a synthetic run of {args.sentences} sentences...")
+    text = synthetic_results(args.sentences, args.titles)
+    tagged = dumps_run(Run.from_results(json.loads(text)))
+
+    dicts, dict_bytes, dict_peak, dict_seconds = traced(lambda: json.loads(text)['detailed_results'])
+    run, run_bytes, run_peak, run_seconds = traced(lambda: loads_run(tagged))
+    assert run.to_results()['detailed_results'] == dicts
+
+    n = args.sentences
+    print(f"\n{'':22s} {'retained MB':>12s} {'bytes/sent.':>12s} {'peak MB':>10s} {'seconds':>9s}")
+    print(f"{'dicts (json.load)':22s} {dict_bytes / 2**20:12.1f} {dict_bytes / n:12.0f} "
+          f"{dict_peak / 2**20:10.1f} {dict_seconds:9.2f}")
+    print(f"{'records':22s} {run_bytes / 2**20:12.1f} {run_bytes / n:12.0f} "
+          f"{run_peak / 2**20:10.1f} {run_seconds:9.2f}")
+    print(f"\n{len(run.titles)} distinct titles; records retain "
+          f"{(1 - run_bytes / dict_bytes) * 100:.0f}% less memory")
+
+
+if __name__ == "__main__":
+    main()
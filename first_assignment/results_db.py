@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+SQLite Results Warehouse for Entity Linking Evaluations
+
+Ingests evaluation_results_*.json files (the evaluate_sample format) into one
+indexed SQLite database so that many runs can be compared with SQL instead of
+loading every JSON file:
+
+  runs              one row per ingested file: name, deployment, overall metrics
+  sentences         every distinct sentence once, keyed by a hash of its text
+  results           per run and sentence: P/R/F1 and TP/FP/FN counts
+  entity_outcomes   per run, sentence and title: 'TP', 'FP' or 'FN'
+
+Each file is ingested in a single transaction with bulk inserts; ingesting a
+file under an existing run name replaces that run (and drops sentences no
+run refers to any more).
+
+Usage:
+    python results_db.py ingest evaluation_results_100samples.json --deployment gpt-4o-mini
+    python results_db.py runs
+    python results_db.py regressed RUN_A RUN_B          # run names; --by-id for run ids
+    python results_db.py top-fp --deployment gpt-4o-mini
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+from evaluation import normalize_title
+
+DEFAULT_DB = 'evaluation_results.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      INTEGER PRIMARY KEY,
+    name        TEXT NOT NULL UNIQUE,
+    source_path TEXT,
+    deployment  TEXT,
+    ingested_at TEXT NOT NULL,
+    sentences   INTEGER NOT NULL,
+    precision   REAL,
+    recall      REAL,
+    f1          REAL,
+    total_tp    INTEGER,
+    total_fp    INTEGER,
+    total_fn    INTEGER,
+    extra       TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_deployment ON runs(deployment);
+
+CREATE TABLE IF NOT EXISTS sentences (
+    sentence_id INTEGER PRIMARY KEY,
+    text_hash   TEXT NOT NULL UNIQUE,
+    text        TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS results (
+    run_id      INTEGER NOT NULL REFERENCES runs(run_id),
+    position    INTEGER NOT NULL,
+    sentence_id INTEGER NOT NULL REFERENCES sentences(sentence_id),
+    precision   REAL,
+    recall      REAL,
+    f1          REAL,
+    tp          INTEGER,
+    fp          INTEGER,
+    fn          INTEGER,
+    PRIMARY KEY (run_id, position)
+);
+CREATE INDEX IF NOT EXISTS results_sentence ON results(sentence_id, run_id);
+
+CREATE TABLE IF NOT EXISTS entity_outcomes (
+    run_id      INTEGER NOT NULL REFERENCES runs(run_id),
+    sentence_id INTEGER NOT NULL REFERENCES sentences(sentence_id),
+    title       TEXT NOT NULL,
+    normalized  TEXT NOT NULL,
+    outcome     TEXT NOT NULL CHECK (outcome IN ('TP', 'FP', 'FN'))
+);
+CREATE INDEX IF NOT EXISTS outcomes_run ON entity_outcomes(run_id, outcome, normalized);
+-- Covers top_false_positives without touching the table
+CREATE INDEX IF NOT EXISTS outcomes_fp ON entity_outcomes(outcome, normalized, run_id, title);
+"""
+
+def connect(path=DEFAULT_DB):
+    """
+    Open (and if needed create) the results database.
+    """
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+def text_hash(sentence):
+    return hashlib.sha1(sentence.encode('utf-8')).hexdigest()
+
+def entity_outcomes(result):
+    """
+    Split one result into (title, normalized, outcome) rows, as calculate_metrics counts them.
+    """
+    true = {}
+    for title in result['true_entities']:
+        true.setdefault(normalize_title(title), title)
+    predicted = {}
+    for title in result['predicted_entities']:
+        predicted.setdefault(normalize_title(title), title)
+
+    rows = []
+    for norm, title in predicted.items():
+        rows.append((title, norm, 'TP' if norm in true else 'FP'))
+    for norm, title in true.items():
+        if norm not in predicted:
+            rows.append((title, norm, 'FN'))
+    return rows
+
+def _sentence_ids(conn, hashes):
+    ids = {}
+    hashes = list(hashes)
+    for start in range(0, len(hashes), 900):
+        chunk = hashes[start:start + 900]
+        placeholders = ','.join('?' * len(chunk))
+        ids.update({h: i for i, h in conn.execute(
+            f"SELECT sentence_id, text_hash FROM sentences WHERE text_hash IN ({placeholders})", chunk)})
+    return ids
+
+def ingest_results(conn, results, name, deployment=None, source_path=None):
+    """
+    Store one evaluation result dictionary as a run, replacing a run of the same name.
+
+    Returns:
+        run_id of the new run
+    """
+    overall = results['overall_metrics']
+    detailed = results['detailed_results']
+    run_info = results.get('run', {})
+    deployment = deployment or run_info.get('deployment')
+    extra = {k: v for k, v in results.items()
+             if k not in ('overall_metrics', 'detailed_results', 'error_analysis')}
+
+    with conn:
+        old = conn.execute("SELECT run_id FROM runs WHERE name = ?", (name,)).fetchone()
+        old_sentences = []
+        if old:
+            old_sentences = [row[0] for row in conn.execute(
+                "SELECT DISTINCT sentence_id FROM results WHERE run_id = ?", old)]
+            conn.execute("DELETE FROM entity_outcomes WHERE run_id = ?", old)
+            conn.execute("DELETE FROM results WHERE run_id = ?", old)
+            conn.execute("DELETE FROM runs WHERE run_id = ?", old)
+
+        cursor = conn.execute(
+            "INSERT INTO runs (name, source_path, deployment, ingested_at, sentences, precision, recall, f1, "
+            "total_tp, total_fp, total_fn, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (name, source_path, deployment, datetime.now(timezone.utc).isoformat(timespec='seconds'),
+             len(detailed), overall['precision'], overall['recall'], overall['f1'],
+             overall['total_tp'], overall['total_fp'], overall['total_fn'],
+             json.dumps(extra, ensure_ascii=False) if extra else None))
+        run_id = cursor.lastrowid
+
+        hashes = [text_hash(r['sentence']) for r in detailed]
+        conn.executemany("INSERT OR IGNORE INTO sentences (text_hash, text) VALUES (?, ?)",
+                         ((h, r['sentence']) for h, r in zip(hashes, detailed)))
+        ids = _sentence_ids(conn, set(hashes))
+
+        result_rows = []
+        outcome_rows = []
+        for position, (h, r) in enumerate(zip(hashes, detailed)):
+            m = r['metrics']
+            sentence_id = ids[h]
+            result_rows.append((run_id, position, sentence_id, m['precision'], m['recall'], m['f1'],
+                                m['tp'], m['fp'], m['fn']))
+            outcome_rows.extend((run_id, sentence_id, title, norm, outcome)
+                                for title, norm, outcome in entity_outcomes(r))
+        conn.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", result_rows)
+        conn.executemany("INSERT INTO entity_outcomes VALUES (?, ?, ?, ?, ?)", outcome_rows)
+
+        # Sentences only the replaced run referred to
+        conn.executemany(
+            "DELETE FROM sentences WHERE sentence_id = ? "
+            "AND NOT EXISTS (SELECT 1 FROM results WHERE results.sentence_id = sentences.sentence_id)",
+            ((sentence_id,) for sentence_id in old_sentences))
+    return run_id
+
+def ingest_file(conn, path, name=None, deployment=None):
+    """
+    Ingest an evaluation_results_*.json file; the run name defaults to the file name.
+    """
+    with open(path, encoding='utf-8') as f:
+        results = json.load(f)
+    name = name or os.path.splitext(os.path.basename(path))[0]
+    return ingest_results(conn, results, name, deployment, source_path=os.path.abspath(path))
+
+# ============== QUERIES ==============
+
+def run_id_by_name(conn, name):
+    """
+    Resolve a run name to its run_id.
+    """
+    row = conn.execute("SELECT run_id FROM runs WHERE name = ?", (name,)).fetchone()
+    if row is None:
+        raise KeyError(f"Unknown run name: {name}")
+    return row[0]
+
+def check_run_id(conn, run_id):
+    """
+    Return run_id if such a run exists.
+    """
+    row = conn.execute("SELECT run_id FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+    if row is None:
+        raise KeyError(f"Unknown run id: {run_id}")
+    return row[0]
+
+def list_runs(conn):
+    return conn.execute(
+        "SELECT run_id, name, deployment, sentences, precision, recall, f1, ingested_at "
+        "FROM runs ORDER BY run_id").fetchall()
+
+def regressed_sentences(conn, run_a, run_b, min_drop=0.0):
+    """
+    Sentences whose F1 in run B is lower than in run A by more than min_drop.
+    A sentence that occurs several times in a run is compared by its mean F1
+    in that run, so it is reported once.
+
+    Args:
+        run_a, run_b: run_ids, e.g. from run_id_by_name
+
+    Returns:
+        List of (sentence, f1 in A, f1 in B), largest drop first
+    """
+    return conn.execute(
+        """
+        WITH a AS (SELECT sentence_id, AVG(f1) AS f1 FROM results WHERE run_id = ? GROUP BY sentence_id),
+             b AS (SELECT sentence_id, AVG(f1) AS f1 FROM results WHERE run_id = ? GROUP BY sentence_id)
+        SELECT s.text, a.f1, b.f1
+        FROM a
+        JOIN b ON b.sentence_id = a.sentence_id
+        JOIN sentences s ON s.sentence_id = a.sentence_id
+        WHERE b.f1 < a.f1 - ?
+        ORDER BY a.f1 - b.f1 DESC, s.text
+        """,
+        (run_a, run_b, min_drop)).fetchall()
+
+def top_false_positives(conn, deployment=None, limit=20):
+    """
+    Most frequent false-positive titles across all runs (of one deployment).
+
+    Returns:
+        List of (title, occurrences, number of runs)
+    """
+    where, params = "", []
+    if deployment is not None:
+        where = "AND o.run_id IN (SELECT run_id FROM runs WHERE deployment = ?)"
+        params.append(deployment)
+    params.append(limit)
+    return conn.execute(
+        f"""
+        SELECT MIN(o.title), COUNT(*) AS occurrences, COUNT(DISTINCT o.run_id)
+        FROM entity_outcomes o
+        WHERE o.outcome = 'FP' {where}
+        GROUP BY o.normalized
+        ORDER BY occurrences DESC, MIN(o.title)
+        LIMIT ?
+        """, params).fetchall()
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite warehouse for entity linking evaluation results")
+    parser.add_argument('--db', default=DEFAULT_DB, help=f'database file (default: {DEFAULT_DB})')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    ingest = sub.add_parser('ingest', help='ingest evaluation result JSON files')
+    ingest.add_argument('files', nargs='+')
+    ingest.add_argument('--deployment', help='deployment (model) name to record for these runs')
+    ingest.add_argument('--name', help='run name (only with a single file; default: file name)')
+
+    sub.add_parser('runs', help='list ingested runs')
+
+    regressed = sub.add_parser('regressed', help='sentences whose F1 dropped from run A to run B')
+    regressed.add_argument('run_a')
+    regressed.add_argument('run_b')
+    regressed.add_argument('--by-id', action='store_true', help='RUN_A and RUN_B are run ids instead of names')
+    regressed.add_argument('--min-drop', type=float, default=0.0)
+
+    top_fp = sub.add_parser('top-fp', help='most frequent false-positive titles')
+    top_fp.add_argument('--deployment')
+    top_fp.add_argument('--limit', type=int, default=20)
+
+    args = parser.parse_args()
+    conn = connect(args.db)
+
+    if args.command == 'ingest':
+        for path in args.files:
+            start = time.perf_counter()
+            new_id = ingest_file(conn, path, name=args.name if len(args.files) == 1 else None,
+                                 deployment=args.deployment)
+            print(f"✅ Ingested {path} as run {new_id} in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return
+
+    if args.command == 'regressed':
+        try:
+            if args.by_id:
+                ids = [check_run_id(conn, int(run)) for run in (args.run_a, args.run_b)]
+            else:
+                ids = [run_id_by_name(conn, run) for run in (args.run_a, args.run_b)]
+        except (KeyError, ValueError) as e:
+            parser.error(e.args[0])
+
+    start = time.perf_counter()
+    if args.command == 'runs':
+        rows = list_runs(conn)
+        elapsed = time.perf_counter() - start
+        print(f"{'ID':>4} {'Name':<40} {'Deployment':<16} {'Sent.':>6} {'P':>6} {'R':>6} {'F1':>6}")
+        for rid, name, deployment, sentences, p, r, f1, _ in rows:
+            print(f"{rid:>4} {name[:40]:<40} {(deployment or '-')[:16]:<16} {sentences:>6} {p:>6.3f} {r:>6.3f} {f1:>6.3f}")
+    elif args.command == 'regressed':
+        rows = regressed_sentences(conn, ids[0], ids[1], args.min_drop)
+        elapsed = time.perf_counter() - start
+        print(f"📉 {len(rows)} sentences regressed from {args.run_a} to {args.run_b}:")
+        for text, f1_a, f1_b in rows:
+            print(f"  {f1_a:.3f} -> {f1_b:.3f}  {text[:100]}")
+    else:
+        rows = top_false_positives(conn, args.deployment, args.limit)
+        elapsed = time.perf_counter() - start
+        print(f"🔍 Top false positives{' for ' + args.deployment if args.deployment else ''}:")
+        for title, occurrences, runs in rows:
+            print(f"  {occurrences:5d} in {runs:3d} run(s)  {title}")
+    print(f"\n({elapsed * 1000:.2f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Sequential Entity Linking Evaluation with Early Stopping
+
+Instead of fixing the number of sentences up front, sentences are taken from
+the sample in order and evaluated in batches. Every `check_every` batches
+(once `min_sentences` are in) the micro precision/recall/F1 and a bootstrap
+confidence interval on F1 are updated, and the run stops as soon as one of
+these holds:
+  - the CI half-width is below the target,
+  - the budget of API calls or tokens is used up,
+  - the sample is exhausted.
+
+The result has the same format as evaluate_sample, plus a 'sequential' entry
+with the stopping reason, the final interval and the history of checks.
+"""
+
+import argparse
+import json
+import random
+from collections import defaultdict
+
+from evaluation import (collect_errors, load_multinerd_data, make_client,
+                        overall_metrics, print_evaluation_report, score_prediction)
+from local_linker import LocalLinker, add_index_arguments, index_from_args
+
+
+def micro_f1(counts):
+    """
+    Micro F1 from a list of (tp, fp, fn) tuples.
+    """
+    tp = sum(c[0] for c in counts)
+    fp = sum(c[1] for c in counts)
+    fn = sum(c[2] for c in counts)
+    return 2 * tp / (2 * tp + fp + fn) if tp else 0.0
+
+def bootstrap_ci(counts, confidence=0.95, n_bootstrap=1000, seed=42):
+    """
+    Percentile bootstrap confidence interval for micro F1, resampling sentences.
+
+    Args:
+        counts: List of per-sentence (tp, fp, fn) tuples
+
+    Returns:
+        (low, high)
+    """
+    if not counts:
+        return 0.0, 1.0
+    rng = random.Random(seed)
+    n = len(counts)
+    scores = []
+    for _ in range(n_bootstrap):
+        tp = fp = fn = 0
+        for _ in range(n):
+            c = counts[rng.randrange(n)]
+            tp += c[0]
+            fp += c[1]
+            fn += c[2]
+        scores.append(2 * tp / (2 * tp + fp + fn) if tp else 0.0)
+    scores.sort()
+    alpha = (1 - confidence) / 2
+    low = scores[int(alpha * (n_bootstrap - 1))]
+    high = scores[int(round((1 - alpha) * (n_bootstrap - 1)))]
+    return low, high
+
+def evaluate_sequential(sample_data, client, deployment_name, target_half_width=0.05, batch_size=5,
+                        max_calls=None, max_tokens=None, min_sentences=20, confidence=0.95,
+                        n_bootstrap=1000, predictor=None, check_every=4):
+    """
+    Evaluate sentences in batches until the F1 confidence interval is narrow enough.
+
+    Args:
+        sample_data: List of sentences with ground truth entities, in evaluation order
+        client: OpenAI client instance
+        target_half_width: Stop once the CI half-width on F1 is at most this
+        batch_size: Sentences evaluated between budget checks
+        max_calls: Optional budget of API calls
+        max_tokens: Optional budget of prompt + completion tokens
+        min_sentences: Never stop on convergence before this many sentences
+        check_every: Batches between CI updates; each bootstrap resamples all
+                     sentences so far, so checking after every batch makes a
+                     run quadratic in its length
+        predictor: Optional function taking a sentence dictionary and returning
+                   predicted titles; defaults to get_entity_links with usage tracking
+
+    Returns:
+        Dictionary in the evaluate_sample format with an extra 'sequential' entry
+    """
+    usage = {'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+    if predictor is None:
+        from evaluation import get_entity_links
+
+        def predictor(item):
+            return get_entity_links(item['sentence'], client, deployment_name, usage=usage)
+
+    results = []
+    counts = []
+    error_analysis = defaultdict(list)
+    history = []
+    stopped = 'exhausted'
+    ci = (0.0, 1.0)
+
+    def over_budget():
+        if max_calls is not None and usage['calls'] >= max_calls:
+            return 'call_budget'
+        if max_tokens is not None and usage['prompt_tokens'] + usage['completion_tokens'] >= max_tokens:
+            return 'token_budget'
+        return None
+
+    def check():
+        """
+        Update the CI and append a history entry, unless no sentence was added since the last one.
+        """
+        nonlocal ci
+        if history and history[-1]['sentences'] == len(results):
+            return
+        ci = bootstrap_ci(counts, confidence, n_bootstrap)
+        history.append({
+            'sentences': len(results),
+            'f1': micro_f1(counts),
+            'ci_low': ci[0],
+            'ci_high': ci[1],
+            'calls': usage['calls'],
+            'tokens': usage['prompt_tokens'] + usage['completion_tokens'],
+        })
+        print(f"  {len(results):4d} sentences: F1={history[-1]['f1']:.3f} "
+              f"CI=[{ci[0]:.3f}, {ci[1]:.3f}] ±{(ci[1] - ci[0]) / 2:.3f} calls={usage['calls']}")
+
+    print(f"Evaluating up to {len(sample_data)} sentences "
+          f"(target CI half-width {target_half_width}, batches of {batch_size}, "
+          f"CI every {check_every} batches)...\n")
+
+    for batch, start in enumerate(range(0, len(sample_data), batch_size), 1):
+        for item in sample_data[start:start + batch_size]:
+            reason = over_budget()
+            if reason:
+                stopped = reason
+                break
+            result = score_prediction(item, predictor(item))
+            results.append(result)
+            collect_errors(error_analysis, result)
+            m = result['metrics']
+            counts.append((m['tp'], m['fp'], m['fn']))
+
+        if stopped != 'exhausted':
+            break
+        if len(results) >= min_sentences and batch % check_every == 0:
+            check()
+            if (ci[1] - ci[0]) / 2 <= target_half_width:
+                stopped = 'converged'
+                break
+
+    # The interval of the final sample, if the last check did not cover it
+    check()
+
+    return {
+        'overall_metrics': overall_metrics([r['metrics'] for r in results]),
+        'detailed_results': results,
+        'error_analysis': dict(error_analysis),
+        'sequential': {
+            'stopped_reason': stopped,
+            'sentences_evaluated': len(results),
+            'confidence': confidence,
+            'ci': list(ci),
+            'half_width': (ci[1] - ci[0]) / 2,
+            'target_half_width': target_half_width,
+            'usage': usage,
+            'history': history,
+        }
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Sequential entity linking evaluation with early stopping")
+    parser.add_argument('--data', default='dev_nl.tsv', help='MultiNERD TSV file')
+    parser.add_argument('--max-sentences', type=int, default=1000, help='sentences to load')
+    parser.add_argument('--target', type=float, default=0.05, help='target CI half-width on F1')
+    parser.add_argument('--batch-size', type=int, default=5, help='sentences between budget checks')
+    parser.add_argument('--check-every', type=int, default=4, help='batches between CI updates')
+    parser.add_argument('--min-sentences', type=int, default=20, help='minimum sentences before stopping')
+    parser.add_argument('--max-calls', type=int, help='budget of API calls')
+    parser.add_argument('--max-tokens', type=int, help='budget of prompt + completion tokens')
+    parser.add_argument('--confidence', type=float, default=0.95, help='confidence level of the interval')
+    parser.add_argument('--seed', type=int, default=42, help='seed for the evaluation order')
+    parser.add_argument('--linker', choices=['llm', 'local'], default='llm',
+                        help="'local' uses local_linker instead of API calls")
+    add_index_arguments(parser)
+    args = parser.parse_args()
+
+    data = load_multinerd_data(args.data, max_sentences=args.max_sentences)
+    # Shuffle everything once; the run consumes a prefix of this order
+    sample_data = random.Random(args.seed).sample(data, len(data))
+    print(f"Loaded {len(data)} sentences with entities")
+
+    client = deployment_name = predictor = None
+    if args.linker == 'local':
+        predictor = LocalLinker(index_from_args(args, data)).predict
+    else:
+        client, deployment_name = make_client()
+        if client is None:
+            print("Error: Missing Azure OpenAI configuration in .env file")
+            return
+
+    results = evaluate_sequential(
+        sample_data, client, deployment_name, target_half_width=args.target, batch_size=args.batch_size,
+        max_calls=args.max_calls, max_tokens=args.max_tokens, min_sentences=args.min_sentences,
+        confidence=args.confidence, predictor=predictor, check_every=args.check_every)
+    print_evaluation_report(results)
+
+    seq = results['sequential']
+    print(f"Stopped: {seq['stopped_reason']} after {seq['sentences_evaluated']} sentences, "
+          f"F1 {results['overall_metrics']['f1']:.3f} "
+          f"({seq['confidence']:.0%} CI [{seq['ci'][0]:.3f}, {seq['ci'][1]:.3f}]), "
+          f"{seq['usage']['calls']} API calls, "
+          f"{seq['usage']['prompt_tokens'] + seq['usage']['completion_tokens']} tokens")
+
+    output_file = f"evaluation_results_sequential_{seq['sentences_evaluated']}samples.json"
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"\nResults saved to: {output_file}")
+
+if __name__ == "__main__":
+    main()
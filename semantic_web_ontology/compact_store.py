@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Compact, memory-mapped triple storage (HDT-style) for the California ontology.
+
+A `.cahdt` file holds:
+  - a shared term dictionary: every term in N-Triples syntax, sorted bytewise,
+    stored as one UTF-8 blob plus an offsets array (a term's ID is its rank);
+  - the triples as integer IDs in three sorted permutations (SPO, POS, OSP),
+    each stored as three uint32 columns.
+
+Opening a file only memory-maps it, so nothing is parsed up front. A triple
+pattern picks the permutation whose prefix is bound, narrows it with
+bisections over the columns, and only decodes the terms of matching triples.
+Looking a term up by value is a binary search over the dictionary, decoding
+O(log n) entries.
+
+`CompactStore` plugs into rdflib as a read-only store, so SPARQL works too:
+
+    g = Graph(store=CompactStore("california.cahdt"))
+
+Usage:
+    python compact_store.py build california_ontology.ttl california.cahdt
+    python compact_store.py query california.cahdt "<http://...#BayArea>" - -
+    python compact_store.py bench project.owl california.cahdt
+"""
+
+import mmap
+import os
+import struct
+import subprocess
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+
+from rdflib import Graph
+from rdflib.store import Store
+from rdflib.util import from_n3, guess_format
+
+MAGIC = b"CAHDT001"
+# magic, term count, triple count, offsets-array position, blob position, triples position
+HEADER = struct.Struct("<8sQQQQQ")
+
+# Column order of each permutation, as indexes into (s, p, o)
+ORDERS = {
+    'spo': (0, 1, 2),
+    'pos': (1, 2, 0),
+    'osp': (2, 0, 1),
+}
+
+
+def _align(f, boundary=8):
+    pad = -f.tell() % boundary
+    if pad:
+        f.write(b"\0" * pad)
+
+
+def build(source, destination):
+    """
+    Encode a graph (or an RDF file) into a compact store file.
+
+    Returns:
+        (number of terms, number of triples)
+    """
+    if not isinstance(source, Graph):
+        g = Graph()
+        g.parse(source, format=guess_format(source) or "xml")
+        source = g
+
+    terms = set()
+    for s, p, o in source:
+        terms.update((s, p, o))
+    n3 = {t: t.n3().encode("utf-8") for t in terms}
+    encoded = sorted(set(n3.values()))
+    rank = {e: i for i, e in enumerate(encoded)}
+    ids = {t: rank[e] for t, e in n3.items()}
+
+    triples = sorted((ids[s], ids[p], ids[o]) for s, p, o in source)
+
+    with open(destination, "wb") as f:
+        f.write(b"\0" * HEADER.size)
+
+        _align(f)
+        offsets_pos = f.tell()
+        offsets = array("Q", [0])
+        for e in encoded:
+            offsets.append(offsets[-1] + len(e))
+        offsets.tofile(f)
+
+        blob_pos = f.tell()
+        for e in encoded:
+            f.write(e)
+
+        _align(f)
+        triples_pos = f.tell()
+        for order in ORDERS.values():
+            permuted = sorted(tuple(t[i] for i in order) for t in triples)
+            for column in range(3):
+                array("I", (t[column] for t in permuted)).tofile(f)
+
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, len(encoded), len(triples), offsets_pos, blob_pos, triples_pos))
+
+    return len(encoded), len(triples)
+
+
+class CompactStore(Store):
+    """
+    Read-only, memory-mapped view of a `.cahdt` file.
+    """
+
+    context_aware = False
+    formula_aware = False
+    transaction_aware = False
+    graph_aware = False
+
+    def __init__(self, path=None, **kwargs):
+        super().__init__(**kwargs)
+        self._mmap = None
+        self._namespaces = {}
+        if path is not None:
+            self.open(path)
+
+    def open(self, path, create=False):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        magic, n_terms, n_triples, offsets_pos, blob_pos, triples_pos = HEADER.unpack_from(view, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a compact store file")
+
+        self.n_terms = n_terms
+        self.n_triples = n_triples
+        self._offsets = view[offsets_pos:offsets_pos + 8 * (n_terms + 1)].cast("Q")
+        self._blob = view[blob_pos:blob_pos + self._offsets[n_terms]]
+
+        column_bytes = 4 * n_triples
+        self._columns = {}
+        position = triples_pos
+        for name in ORDERS:
+            columns = []
+            for _ in range(3):
+                columns.append(view[position:position + column_bytes].cast("I"))
+                position += column_bytes
+            self._columns[name] = columns
+
+        self._decode = lru_cache(maxsize=65536)(self._decode_uncached)
+        return 1
+
+    def close(self, commit_pending_transaction=False):
+        if self._mmap is not None:
+            self._offsets.release()
+            self._blob.release()
+            for columns in self._columns.values():
+                for column in columns:
+                    column.release()
+            self._columns = {}
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ============== DICTIONARY ==============
+
+    def _raw_term(self, term_id):
+        return self._blob[self._offsets[term_id]:self._offsets[term_id + 1]]
+
+    def _decode_uncached(self, term_id):
+        return from_n3(bytes(self._raw_term(term_id)).decode("utf-8"))
+
+    def term(self, term_id):
+        """
+        Decode the term with the given ID.
+        """
+        return self._decode(term_id)
+
+    def term_id(self, term):
+        """
+        ID of an RDF term, or None if it does not occur in the store.
+        """
+        key = term.n3().encode("utf-8")
+        lo, hi = 0, self.n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if bytes(self._raw_term(mid)) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.n_terms and bytes(self._raw_term(lo)) == key:
+            return lo
+        return None
+
+    # ============== TRIPLE PATTERNS ==============
+
+    def triple_ids(self, s=None, p=None, o=None):
+        """
+        Yield (s, p, o) ID triples matching a pattern of IDs (None = wildcard).
+        """
+        bound = (s is not None, p is not None, o is not None)
+        if bound[0] and not bound[1] and bound[2]:
+            name = 'osp'
+        elif bound[0] or not (bound[1] or bound[2]):
+            name = 'spo'
+        elif bound[1]:
+            name = 'pos'
+        else:
+            name = 'osp'
+
+        order = ORDERS[name]
+        key = [(s, p, o)[i] for i in order]
+        columns = self._columns[name]
+
+        lo, hi = 0, self.n_triples
+        for column, value in zip(columns, key):
+            if value is None:
+                break
+            lo, hi = bisect_left(column, value, lo, hi), bisect_right(column, value, lo, hi)
+            if lo == hi:
+                return
+
+        first, second, third = columns
+        for row in range(lo, hi):
+            values = (first[row], second[row], third[row])
+            triple = [0, 0, 0]
+            for position, value in zip(order, values):
+                triple[position] = value
+            if (s is None or triple[0] == s) and (p is None or triple[1] == p) and (o is None or triple[2] == o):
+                yield tuple(triple)
+
+    def triples(self, triple_pattern, context=None):
+        """
+        rdflib Store API: yield ((s, p, o), contexts) for a pattern of terms.
+        """
+        pattern_ids = []
+        for term in triple_pattern:
+            if term is None:
+                pattern_ids.append(None)
+                continue
+            if not hasattr(term, "n3") or type(term).__name__ == "Path":
+                # property paths are expanded by rdflib before reaching the store
+                return
+            term_id = self.term_id(term)
+            if term_id is None:
+                return
+            pattern_ids.append(term_id)
+
+        decode = self._decode
+        for s, p, o in self.triple_ids(*pattern_ids):
+            yield (decode(s), decode(p), decode(o)), iter(())
+
+    def __len__(self, context=None):
+        return self.n_triples
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    def bind(self, prefix, namespace, override=True):
+        self._namespaces[prefix] = namespace
+
+    def namespace(self, prefix):
+        return self._namespaces.get(prefix)
+
+    def prefix(self, namespace):
+        for prefix, ns in self._namespaces.items():
+            if ns == namespace:
+                return prefix
+        return None
+
+    def namespaces(self):
+        return iter(self._namespaces.items())
+
+    def add(self, triple, context=None, quoted=False):
+        raise TypeError("CompactStore is read-only")
+
+    def remove(self, triple, context=None):
+        raise TypeError("CompactStore is read-only")
+
+
+# ============== COMMAND LINE ==============
+
+def _max_rss_mb():
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _measure(kind, path):
+    """
+    Open a file one way and report the time and peak RSS (run in a child process).
+    """
+    baseline = _max_rss_mb()
+    start = time.perf_counter()
+    if kind == "rdflib":
+        g = Graph()
+        g.parse(path, format=guess_format(path) or "xml")
+        count = sum(1 for _ in g.triples((None, None, None)))
+    else:
+        store = CompactStore(path)
+        count = sum(1 for _ in store.triple_ids())
+    elapsed = time.perf_counter() - start
+    print(f"{elapsed:.6f} {_max_rss_mb() - baseline:.2f} {count}")
+
+
+def bench(rdf_path, compact_path):
+    for kind, path in (("rdflib", rdf_path), ("compact", compact_path)):
+        output = subprocess.run(
+            [sys.executable, __file__, "_measure", kind, path],
+            check=True, capture_output=True, text=True,
+        ).stdout.split()
+        seconds, rss_mb, count = float(output[0]), float(output[1]), int(output[2])
+        print(f"{kind:8s} open+scan: {seconds * 1000:9.2f} ms   extra peak RSS: {rss_mb:8.2f} MB   triples: {count}")
+    print(f"File sizes: {os.path.getsize(rdf_path)} bytes (RDF) vs {os.path.getsize(compact_path)} bytes (compact)")
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return
+    command, args = sys.argv[1], sys.argv[2:]
+
+    if command == "build":
+        source = args[0] if args else "california_ontology.ttl"
+        destination = args[1] if len(args) > 1 else "california.cahdt"
+        start = time.perf_counter()
+        n_terms, n_triples = build(source, destination)
+        print(f"Wrote {destination}: {n_terms} terms, {n_triples} triples "
+              f"({os.path.getsize(destination)} bytes) in {time.perf_counter() - start:.2f}s")
+    elif command == "query":
+        pattern = [None if a == "-" else from_n3(a) for a in (args[1:] + ["-", "-", "-"])[:3]]
+        with CompactStore(args[0]) as store:
+            for (s, p, o), _ in store.triples(tuple(pattern)):
+                print(f"{s.n3()} {p.n3()} {o.n3()} .")
+    elif command == "bench":
+        bench(args[0] if args else "project.owl", args[1] if len(args) > 1 else "california.cahdt")
+    elif command == "_measure":
+        _measure(args[0], args[1])
+    else:
+        print(f"Unknown command: {command}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
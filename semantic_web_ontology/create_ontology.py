@@ -1,117 +1,17 @@
+import argparse
+
 from rdflib import Graph, Namespace, RDF, RDFS, OWL, Literal, URIRef
 from rdflib.namespace import XSD
 
-# Create a new graph
-g = Graph()
+from incremental_build import incremental_build
+from profiling import Profiler, add_profile_arguments
 
 # Define namespace for our California ontology
 CA = Namespace("http://www.semanticweb.org/california-ontology#")
-g.bind("ca", CA)
-g.bind("owl", OWL)
-g.bind("rdfs", RDFS)
-g.bind("rdf", RDF)
-g.bind("xsd", XSD)
-
-# Define the ontology itself
-ontology = CA[""]
-g.add((ontology, RDF.type, OWL.Ontology))
-g.add((ontology, RDFS.label, Literal("California Ontology")))
-g.add((ontology, RDFS.comment, Literal("An ontology describing California's regions, cities, and their properties")))
-
-# ============== CLASSES ==============
-# Top-level class
-g.add((CA.GeographicalEntity, RDF.type, OWL.Class))
-g.add((CA.GeographicalEntity, RDFS.label, Literal("Geographical Entity")))
-g.add((CA.GeographicalEntity, RDFS.comment, Literal("Any geographical entity in California")))
-
-# Region classes
-g.add((CA.Region, RDF.type, OWL.Class))
-g.add((CA.Region, RDFS.subClassOf, CA.GeographicalEntity))
-g.add((CA.Region, RDFS.label, Literal("Region")))
-
-g.add((CA.NorthernRegion, RDF.type, OWL.Class))
-g.add((CA.NorthernRegion, RDFS.subClassOf, CA.Region))
-g.add((CA.NorthernRegion, RDFS.label, Literal("Northern Region")))
-
-g.add((CA.CentralRegion, RDF.type, OWL.Class))
-g.add((CA.CentralRegion, RDFS.subClassOf, CA.Region))
-g.add((CA.CentralRegion, RDFS.label, Literal("Central Region")))
-
-g.add((CA.SouthernRegion, RDF.type, OWL.Class))
-g.add((CA.SouthernRegion, RDFS.subClassOf, CA.Region))
-g.add((CA.SouthernRegion, RDFS.label, Literal("Southern Region")))
-
-# City classes
-g.add((CA.City, RDF.type, OWL.Class))
-g.add((CA.City, RDFS.subClassOf, CA.GeographicalEntity))
-g.add((CA.City, RDFS.label, Literal("City")))
-
-g.add((CA.MajorCity, RDF.type, OWL.Class))
-g.add((CA.MajorCity, RDFS.subClassOf, CA.City))
-g.add((CA.MajorCity, RDFS.label, Literal("Major City")))
-g.add((CA.MajorCity, RDFS.comment, Literal("City with population over 500,000")))
-
-g.add((CA.MediumCity, RDF.type, OWL.Class))
-g.add((CA.MediumCity, RDFS.subClassOf, CA.City))
-g.add((CA.MediumCity, RDFS.label, Literal("Medium City")))
-g.add((CA.MediumCity, RDFS.comment, Literal("City with population between 100,000 and 500,000")))
-
-g.add((CA.SmallCity, RDF.type, OWL.Class))
-g.add((CA.SmallCity, RDFS.subClassOf, CA.City))
-g.add((CA.SmallCity, RDFS.label, Literal("Small City")))
-g.add((CA.SmallCity, RDFS.comment, Literal("City with population under 100,000")))
-
-# Additional classes
-g.add((CA.County, RDF.type, OWL.Class))
-g.add((CA.County, RDFS.subClassOf, CA.GeographicalEntity))
-g.add((CA.County, RDFS.label, Literal("County")))
-
-g.add((CA.Landmark, RDF.type, OWL.Class))
-g.add((CA.Landmark, RDFS.subClassOf, CA.GeographicalEntity))
-g.add((CA.Landmark, RDFS.label, Literal("Landmark")))
-
-# ============== OBJECT PROPERTIES ==============
-# locatedIn property
-g.add((CA.locatedIn, RDF.type, OWL.ObjectProperty))
-g.add((CA.locatedIn, RDFS.domain, CA.City))
-g.add((CA.locatedIn, RDFS.range, CA.Region))
-g.add((CA.locatedIn, RDFS.label, Literal("located in")))
-
-# hasCity property (inverse of locatedIn)
-g.add((CA.hasCity, RDF.type, OWL.ObjectProperty))
-g.add((CA.hasCity, RDFS.domain, CA.Region))
-g.add((CA.hasCity, RDFS.range, CA.City))
-g.add((CA.hasCity, OWL.inverseOf, CA.locatedIn))
-g.add((CA.hasCity, RDFS.label, Literal("has city")))
-
-# borders property
-g.add((CA.borders, RDF.type, OWL.ObjectProperty))
-g.add((CA.borders, RDF.type, OWL.SymmetricProperty))
-g.add((CA.borders, RDFS.domain, CA.Region))
-g.add((CA.borders, RDFS.range, CA.Region))
-g.add((CA.borders, RDFS.label, Literal("borders")))
-
-# ============== DATA PROPERTIES ==============
-# hasPopulation property
-g.add((CA.hasPopulation, RDF.type, OWL.DatatypeProperty))
-g.add((CA.hasPopulation, RDFS.domain, CA.GeographicalEntity))
-g.add((CA.hasPopulation, RDFS.range, XSD.integer))
-g.add((CA.hasPopulation, RDFS.label, Literal("has population")))
-
-# hasArea property
-g.add((CA.hasArea, RDF.type, OWL.DatatypeProperty))
-g.add((CA.hasArea, RDFS.domain, CA.GeographicalEntity))
-g.add((CA.hasArea, RDFS.range, XSD.float))
-g.add((CA.hasArea, RDFS.label, Literal("has area (km²)")))
-
-# establishedYear property
-g.add((CA.establishedYear, RDF.type, OWL.DatatypeProperty))
-g.add((CA.establishedYear, RDFS.domain, CA.City))
-g.add((CA.establishedYear, RDFS.range, XSD.integer))
-g.add((CA.establishedYear, RDFS.label, Literal("established year")))
-
-# ============== INSTANCES - REGIONS ==============
-# Based on the map image
+GEO = Namespace("http://www.opengis.net/ont/geosparql#")
+
+# ============== SOURCE DATA ==============
+# Regions based on the map image
 regions = [
     ("NorthCoast", CA.NorthernRegion, "North Coast"),
     ("ShastaCascades", CA.NorthernRegion, "Shasta Cascades"),
@@ -125,27 +25,128 @@ regions = [
     ("SouthernCalifornia", CA.SouthernRegion, "Southern California")
 ]
 
-for region_id, region_class, label in regions:
-    region = CA[region_id]
-    g.add((region, RDF.type, region_class))
-    g.add((region, RDFS.label, Literal(label)))
-
-# Add border relationships based on the map
-g.add((CA.NorthCoast, CA.borders, CA.ShastaCascades))
-g.add((CA.NorthCoast, CA.borders, CA.SacramentoValley))
-g.add((CA.ShastaCascades, CA.borders, CA.SacramentoValley))
-g.add((CA.SacramentoValley, CA.borders, CA.GoldCountry))
-g.add((CA.SacramentoValley, CA.borders, CA.BayArea))
-g.add((CA.GoldCountry, CA.borders, CA.SierraNevada))
-g.add((CA.BayArea, CA.borders, CA.CentralCoast))
-g.add((CA.BayArea, CA.borders, CA.SanJoaquinValley))
-g.add((CA.SierraNevada, CA.borders, CA.SanJoaquinValley))
-g.add((CA.SanJoaquinValley, CA.borders, CA.CentralCoast))
-g.add((CA.CentralCoast, CA.borders, CA.SouthernCalifornia))
-g.add((CA.SanJoaquinValley, CA.borders, CA.Desert))
-g.add((CA.Desert, CA.borders, CA.SouthernCalifornia))
-
-# ============== INSTANCES - CITIES ==============
+# Border relationships based on the map
+borders = [
+    ("NorthCoast", "ShastaCascades"),
+    ("NorthCoast", "SacramentoValley"),
+    ("ShastaCascades", "SacramentoValley"),
+    ("SacramentoValley", "GoldCountry"),
+    ("SacramentoValley", "BayArea"),
+    ("GoldCountry", "SierraNevada"),
+    ("BayArea", "CentralCoast"),
+    ("BayArea", "SanJoaquinValley"),
+    ("SierraNevada", "SanJoaquinValley"),
+    ("SanJoaquinValley", "CentralCoast"),
+    ("CentralCoast", "SouthernCalifornia"),
+    ("SanJoaquinValley", "Desert"),
+    ("Desert", "SouthernCalifornia")
+]
+
+# Coarse region outlines: (longitude, latitude) vertices shared between
+# neighbouring regions, so that borders can be derived from shared edges
+geo_vertices = {
+    # state boundary
+    "OregonCoast": (-124.21, 42.00),
+    "SiskiyouOregon": (-123.62, 42.00),
+    "OregonNevada": (-120.00, 42.00),
+    "PlumasNevada": (-120.00, 39.80),
+    "Tahoe": (-120.00, 39.00),
+    "AlpineNevada": (-119.46, 38.60),
+    "InyoNevada": (-117.05, 36.80),
+    "ColoradoRiver": (-114.63, 35.00),
+    "YumaCorner": (-114.72, 32.72),
+    "ImperialMexico": (-116.10, 32.62),
+    "TijuanaCorner": (-117.12, 32.53),
+    # coastline
+    "Oceanside": (-117.38, 33.20),
+    "DanaPoint": (-117.70, 33.46),
+    "PalosVerdes": (-118.40, 33.75),
+    "MalibuVentura": (-118.93, 34.05),
+    "Ventura": (-119.30, 34.28),
+    "PointConception": (-120.47, 34.45),
+    "PointSal": (-120.64, 34.90),
+    "BigSur": (-121.50, 36.00),
+    "Monterey": (-121.90, 36.60),
+    "SantaCruzCoast": (-122.10, 36.95),
+    "SanMateoCoast": (-122.30, 37.10),
+    "PescaderoPoint": (-122.40, 37.20),
+    "GoldenGate": (-122.51, 37.78),
+    "Bodega": (-123.05, 38.30),
+    "FortRoss": (-123.24, 38.51),
+    "PointArena": (-123.71, 38.95),
+    "CapeMendocino": (-124.40, 40.44),
+    # interior junctions
+    "TrinityTehama": (-123.50, 40.00),
+    "LassenTehama": (-121.30, 40.00),
+    "GlennLake": (-122.90, 39.40),
+    "YubaPlacer": (-121.05, 39.00),
+    "Delta": (-121.40, 38.20),
+    "YoloSolano": (-121.95, 38.55),
+    "Yosemite": (-119.65, 37.50),
+    "CalaverasStanislaus": (-120.65, 37.90),
+    "AlpineCalaveras": (-119.95, 38.40),
+    "Pacheco": (-121.20, 36.90),
+    "KingsMonterey": (-120.20, 35.80),
+    "KernInyo": (-117.80, 35.60),
+    "Tejon": (-118.90, 34.80),
+    "CajonPass": (-117.60, 34.40),
+    "SanGorgonio": (-116.80, 33.90),
+}
+
+region_outlines = {
+    "NorthCoast": ["OregonCoast", "SiskiyouOregon", "TrinityTehama", "GlennLake", "FortRoss",
+                   "PointArena", "CapeMendocino"],
+    "ShastaCascades": ["SiskiyouOregon", "OregonNevada", "PlumasNevada", "LassenTehama", "TrinityTehama"],
+    "SacramentoValley": ["TrinityTehama", "LassenTehama", "PlumasNevada", "YubaPlacer", "Delta",
+                         "YoloSolano", "FortRoss", "GlennLake"],
+    "GoldCountry": ["PlumasNevada", "Tahoe", "AlpineCalaveras", "Yosemite", "CalaverasStanislaus",
+                    "Delta", "YubaPlacer"],
+    "SierraNevada": ["Tahoe", "AlpineNevada", "InyoNevada", "Yosemite", "AlpineCalaveras"],
+    "SanJoaquinValley": ["Delta", "CalaverasStanislaus", "Yosemite", "InyoNevada", "KernInyo", "Tejon",
+                         "KingsMonterey", "Pacheco"],
+    "BayArea": ["FortRoss", "YoloSolano", "Delta", "Pacheco", "SanMateoCoast", "PescaderoPoint",
+                "GoldenGate", "Bodega"],
+    "CentralCoast": ["SanMateoCoast", "Pacheco", "KingsMonterey", "Tejon", "MalibuVentura", "Ventura",
+                     "PointConception", "PointSal", "BigSur", "Monterey", "SantaCruzCoast"],
+    "Desert": ["InyoNevada", "ColoradoRiver", "YumaCorner", "ImperialMexico", "SanGorgonio", "CajonPass",
+               "Tejon", "KernInyo"],
+    "SouthernCalifornia": ["Tejon", "CajonPass", "SanGorgonio", "ImperialMexico", "TijuanaCorner",
+                           "Oceanside", "DanaPoint", "PalosVerdes", "MalibuVentura"],
+}
+
+# City locations as (longitude, latitude)
+city_locations = {
+    "LosAngeles": (-118.24, 34.05),
+    "SanDiego": (-117.16, 32.72),
+    "SanJose": (-121.89, 37.34),
+    "SanFrancisco": (-122.42, 37.77),
+    "Sacramento": (-121.49, 38.58),
+    "Fresno": (-119.79, 36.74),
+    "Bakersfield": (-119.02, 35.37),
+    "Oakland": (-122.27, 37.80),
+    "SantaCruz": (-122.03, 36.97),
+    "PalmSprings": (-116.55, 33.83),
+    "Eureka": (-124.16, 40.80),
+    "Redding": (-122.39, 40.59),
+}
+
+
+def region_polygon(region_id):
+    """
+    Closed list of (longitude, latitude) vertices outlining a region.
+    """
+    ring = [geo_vertices[name] for name in region_outlines[region_id]]
+    return ring + ring[:1]
+
+
+def point_wkt(lon, lat):
+    return Literal(f"POINT({lon} {lat})", datatype=GEO.wktLiteral)
+
+
+def polygon_wkt(ring):
+    return Literal("POLYGON((" + ", ".join(f"{lon} {lat}" for lon, lat in ring) + "))", datatype=GEO.wktLiteral)
+
+
 # Major cities (>500k population)
 cities_data = [
     # City ID, Type, Label, Region, Population, Area(km²), Year
@@ -167,19 +168,221 @@ cities_data = [
     ("Redding", CA.SmallCity, "Redding", CA.ShastaCascades, 93611, 158.4, 1887)
 ]
 
-for city_id, city_type, label, region, pop, area, year in cities_data:
-    city = CA[city_id]
-    g.add((city, RDF.type, city_type))
-    g.add((city, RDFS.label, Literal(label)))
-    g.add((city, CA.locatedIn, region))
-    g.add((city, CA.hasPopulation, Literal(pop, datatype=XSD.integer)))
-    g.add((city, CA.hasArea, Literal(area, datatype=XSD.float)))
-    g.add((city, CA.establishedYear, Literal(year, datatype=XSD.integer)))
-
-# Save as RDF/XML (OWL format)
-g.serialize(destination="project.owl", format="xml")
-print("Ontology created successfully as project.owl")
-
-# Also save as Turtle for readability
-g.serialize(destination="california_ontology.ttl", format="turtle")
-print("Also saved as california_ontology.ttl for better readability")
\ No newline at end of file
+
+def build_graph(derive_borders=False):
+    """
+    Build the California ontology graph from the source data above.
+
+    Args:
+        derive_borders: Take `borders` from shared edges of the region outlines
+                        instead of the hand-made list
+    """
+    # Create a new graph
+    g = Graph()
+    g.bind("ca", CA)
+    g.bind("owl", OWL)
+    g.bind("rdfs", RDFS)
+    g.bind("rdf", RDF)
+    g.bind("xsd", XSD)
+    g.bind("geo", GEO)
+
+    # Define the ontology itself
+    ontology = CA[""]
+    g.add((ontology, RDF.type, OWL.Ontology))
+    g.add((ontology, RDFS.label, Literal("California Ontology")))
+    g.add((ontology, RDFS.comment, Literal("An ontology describing California's regions, cities, and their properties")))
+
+    # ============== CLASSES ==============
+    # Top-level class
+    g.add((CA.GeographicalEntity, RDF.type, OWL.Class))
+    g.add((CA.GeographicalEntity, RDFS.label, Literal("Geographical Entity")))
+    g.add((CA.GeographicalEntity, RDFS.comment, Literal("Any geographical entity in California")))
+
+    # Region classes
+    g.add((CA.Region, RDF.type, OWL.Class))
+    g.add((CA.Region, RDFS.subClassOf, CA.GeographicalEntity))
+    g.add((CA.Region, RDFS.label, Literal("Region")))
+
+    g.add((CA.NorthernRegion, RDF.type, OWL.Class))
+    g.add((CA.NorthernRegion, RDFS.subClassOf, CA.Region))
+    g.add((CA.NorthernRegion, RDFS.label, Literal("Northern Region")))
+
+    g.add((CA.CentralRegion, RDF.type, OWL.Class))
+    g.add((CA.CentralRegion, RDFS.subClassOf, CA.Region))
+    g.add((CA.CentralRegion, RDFS.label, Literal("Central Region")))
+
+    g.add((CA.SouthernRegion, RDF.type, OWL.Class))
+    g.add((CA.SouthernRegion, RDFS.subClassOf, CA.Region))
+    g.add((CA.SouthernRegion, RDFS.label, Literal("Southern Region")))
+
+    # City classes
+    g.add((CA.City, RDF.type, OWL.Class))
+    g.add((CA.City, RDFS.subClassOf, CA.GeographicalEntity))
+    g.add((CA.City, RDFS.label, Literal("City")))
+
+    g.add((CA.MajorCity, RDF.type, OWL.Class))
+    g.add((CA.MajorCity, RDFS.subClassOf, CA.City))
+    g.add((CA.MajorCity, RDFS.label, Literal("Major City")))
+    g.add((CA.MajorCity, RDFS.comment, Literal("City with population over 500,000")))
+
+    g.add((CA.MediumCity, RDF.type, OWL.Class))
+    g.add((CA.MediumCity, RDFS.subClassOf, CA.City))
+    g.add((CA.MediumCity, RDFS.label, Literal("Medium City")))
+    g.add((CA.MediumCity, RDFS.comment, Literal("City with population between 100,000 and 500,000")))
+
+    g.add((CA.SmallCity, RDF.type, OWL.Class))
+    g.add((CA.SmallCity, RDFS.subClassOf, CA.City))
+    g.add((CA.SmallCity, RDFS.label, Literal("Small City")))
+    g.add((CA.SmallCity, RDFS.comment, Literal("City with population under 100,000")))
+
+    # Additional classes
+    g.add((CA.County, RDF.type, OWL.Class))
+    g.add((CA.County, RDFS.subClassOf, CA.GeographicalEntity))
+    g.add((CA.County, RDFS.label, Literal("County")))
+
+    g.add((CA.Landmark, RDF.type, OWL.Class))
+    g.add((CA.Landmark, RDFS.subClassOf, CA.GeographicalEntity))
+    g.add((CA.Landmark, RDFS.label, Literal("Landmark")))
+
+    # ============== OBJECT PROPERTIES ==============
+    # locatedIn property
+    g.add((CA.locatedIn, RDF.type, OWL.ObjectProperty))
+    g.add((CA.locatedIn, RDFS.domain, CA.City))
+    g.add((CA.locatedIn, RDFS.range, CA.Region))
+    g.add((CA.locatedIn, RDFS.label, Literal("located in")))
+
+    # hasCity property (inverse of locatedIn)
+    g.add((CA.hasCity, RDF.type, OWL.ObjectProperty))
+    g.add((CA.hasCity, RDFS.domain, CA.Region))
+    g.add((CA.hasCity, RDFS.range, CA.City))
+    g.add((CA.hasCity, OWL.inverseOf, CA.locatedIn))
+    g.add((CA.hasCity, RDFS.label, Literal("has city")))
+
+    # borders property
+    g.add((CA.borders, RDF.type, OWL.ObjectProperty))
+    g.add((CA.borders, RDF.type, OWL.SymmetricProperty))
+    g.add((CA.borders, RDFS.domain, CA.Region))
+    g.add((CA.borders, RDFS.range, CA.Region))
+    g.add((CA.borders, RDFS.label, Literal("borders")))
+
+    # ============== DATA PROPERTIES ==============
+    # hasPopulation property
+    g.add((CA.hasPopulation, RDF.type, OWL.DatatypeProperty))
+    g.add((CA.hasPopulation, RDFS.domain, CA.GeographicalEntity))
+    g.add((CA.hasPopulation, RDFS.range, XSD.integer))
+    g.add((CA.hasPopulation, RDFS.label, Literal("has population")))
+
+    # hasArea property
+    g.add((CA.hasArea, RDF.type, OWL.DatatypeProperty))
+    g.add((CA.hasArea, RDFS.domain, CA.GeographicalEntity))
+    g.add((CA.hasArea, RDFS.range, XSD.float))
+    g.add((CA.hasArea, RDFS.label, Literal("has area (km²)")))
+
+    # establishedYear property
+    g.add((CA.establishedYear, RDF.type, OWL.DatatypeProperty))
+    g.add((CA.establishedYear, RDFS.domain, CA.City))
+    g.add((CA.establishedYear, RDFS.range, XSD.integer))
+    g.add((CA.establishedYear, RDFS.label, Literal("established year")))
+
+    # ============== GEOMETRY (GeoSPARQL) ==============
+    g.add((GEO.Geometry, RDF.type, OWL.Class))
+    g.add((GEO.hasGeometry, RDF.type, OWL.ObjectProperty))
+    g.add((GEO.hasGeometry, RDFS.range, GEO.Geometry))
+    g.add((GEO.asWKT, RDF.type, OWL.DatatypeProperty))
+    g.add((GEO.asWKT, RDFS.domain, GEO.Geometry))
+
+    # ============== INSTANCES - REGIONS ==============
+    # Based on the map image (see regions above)
+    for region_id, region_class, label in regions:
+        region = CA[region_id]
+        g.add((region, RDF.type, region_class))
+        g.add((region, RDFS.label, Literal(label)))
+        geometry = CA[f"{region_id}Geometry"]
+        g.add((region, GEO.hasGeometry, geometry))
+        g.add((geometry, RDF.type, GEO.Geometry))
+        g.add((geometry, GEO.asWKT, polygon_wkt(region_polygon(region_id))))
+
+    # Add border relationships based on the map (or on the outlines)
+    if derive_borders:
+        from spatial_index import shared_edge_pairs
+        border_pairs = shared_edge_pairs({r: region_polygon(r) for r in region_outlines})
+    else:
+        border_pairs = borders
+    for region_a, region_b in border_pairs:
+        g.add((CA[region_a], CA.borders, CA[region_b]))
+
+    # ============== INSTANCES - CITIES ==============
+    for city_id, city_type, label, region, pop, area, year in cities_data:
+        city = CA[city_id]
+        g.add((city, RDF.type, city_type))
+        g.add((city, RDFS.label, Literal(label)))
+        g.add((city, CA.locatedIn, region))
+        g.add((city, CA.hasPopulation, Literal(pop, datatype=XSD.integer)))
+        g.add((city, CA.hasArea, Literal(area, datatype=XSD.float)))
+        g.add((city, CA.establishedYear, Literal(year, datatype=XSD.integer)))
+        geometry = CA[f"{city_id}Geometry"]
+        g.add((city, GEO.hasGeometry, geometry))
+        g.add((geometry, RDF.type, GEO.Geometry))
+        g.add((geometry, GEO.asWKT, point_wkt(*city_locations[city_id])))
+
+    return g
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the California ontology")
+    parser.add_argument("--incremental", action="store_true",
+                        help="diff against the previous build snapshot and only apply the delta")
+    parser.add_argument("--snapshot", default="build_snapshot.txt", help="build snapshot file")
+    parser.add_argument("--patch-dir", default="patches", help="directory for RDF Patch files")
+    parser.add_argument("--inferred", default="california_inferred.trig",
+                        help="materialized inference to update in incremental mode (if it exists)")
+    parser.add_argument("--derive-borders", action="store_true",
+                        help="derive borders from the region outlines instead of the hand-made list")
+    parser.add_argument("--shard-dir",
+                        help="also write the instance data as per-region-class shards to this directory")
+    parser.add_argument("--per-region", action="store_true", help="with --shard-dir, one shard per region")
+    add_profile_arguments(parser, "profile_create_ontology.json")
+    args = parser.parse_args()
+
+    profiler = Profiler.from_args(args, "create_ontology").start()
+    try:
+        build(args, profiler)
+    finally:
+        profiler.stop()
+
+
+def build(args, profiler):
+    with profiler.phase("build_graph") as details:
+        g = build_graph(derive_borders=args.derive_borders)
+        details['triples'] = len(g)
+
+    if args.incremental:
+        with profiler.phase("incremental_build"):
+            result = incremental_build(g, args.snapshot, args.patch_dir, args.inferred)
+        if result['patch'] is None:
+            print("No changes since the previous build; outputs left untouched")
+            return
+        print(f"Delta: +{result['added']} / -{result['removed']} triples, patch written to {result['patch']}")
+        for phase, seconds in result['timings'].items():
+            print(f"  {phase}: {seconds * 1000:.1f} ms")
+
+    # Save as RDF/XML (OWL format)
+    with profiler.phase("serialize.xml"):
+        g.serialize(destination="project.owl", format="xml")
+    print("Ontology created successfully as project.owl")
+
+    # Also save as Turtle for readability
+    with profiler.phase("serialize.turtle"):
+        g.serialize(destination="california_ontology.ttl", format="turtle")
+    print("Also saved as california_ontology.ttl for better readability")
+
+    if args.shard_dir:
+        from sharding import partition, write_shards
+
+        with profiler.phase("shards"):
+            paths = write_shards(partition(g, per_region=args.per_region), args.shard_dir)
+        print(f"Wrote {len(paths)} shards to {args.shard_dir}/")
+
+
+if __name__ == "__main__":
+    main()
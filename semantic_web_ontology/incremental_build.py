@@ -0,0 +1,250 @@
+"""
+Incremental ontology builds based on triple-level diffs.
+
+A build snapshot stores every triple of the previous build as one N-Triples
+line prefixed with a 16-hex-digit hash of that line, sorted by hash. Diffing a
+new build against it is a single merge-join over two hash-sorted lists, and
+the result is written as an RDF Patch file:
+
+    H id <urn:sha256:...> .      digest of the new build
+    H prev <urn:sha256:...> .    digest of the previous build
+    TX .
+    D <s> <p> <o> .              removed triples
+    A <s> <p> <o> .              added triples
+    TC .
+
+The delta is appended to the snapshot (which is rewritten in full only once
+the appended deltas outgrow it) and, if present, applied to the materialized
+inference (inference.InferenceCache), whose closure is maintained incrementally.
+
+Not everything is proportional to the change: the diff hashes every triple of
+the new build, the inference TriG file is parsed and written in full, and the
+caller re-serializes project.owl and the Turtle file.
+
+Blank nodes get new labels on every build, so before hashing they are
+canonicalized (rdflib.compare) and skolemized into IRIs under BNODE_BASE;
+a build that only relabels blank nodes produces no delta.
+"""
+
+import hashlib
+import os
+import time
+from datetime import datetime, timezone
+
+from rdflib import BNode, Graph
+from rdflib.compare import to_canonical_graph
+
+SNAPSHOT_HEADER = "# california-ontology build snapshot"
+DELTA_HEADER = "# delta"
+BNODE_BASE = "urn:x-california:bnode:"
+
+
+def triple_line(triple):
+    s, p, o = triple
+    return f"{s.n3()} {p.n3()} {o.n3()} ."
+
+
+def line_hash(line):
+    return hashlib.sha1(line.encode("utf-8")).hexdigest()[:16]
+
+
+def stable_triples(graph):
+    """
+    The triples of a graph with blank nodes replaced by stable skolem IRIs.
+    """
+    if not any(isinstance(term, BNode) for triple in graph for term in triple):
+        return graph
+    return to_canonical_graph(graph).skolemize(authority=BNODE_BASE, basepath="")
+
+
+def hashed_lines(graph):
+    """
+    Hash-sorted (hash, line) pairs for every triple of a graph.
+    """
+    return sorted((line_hash(line), line) for line in map(triple_line, stable_triples(graph)))
+
+
+def digest(entries):
+    """
+    Order-independent digest of a build, from its hash-sorted entries.
+    """
+    h = hashlib.sha256()
+    for key, line in entries:
+        h.update(line.encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+def read_snapshot(path):
+    """
+    Load a snapshot written by write_snapshot() plus the deltas appended to it.
+
+    Returns:
+        (digest, hash-sorted list of (hash, line) pairs, number of appended delta lines);
+        (None, [], 0) if there is none
+    """
+    if not os.path.exists(path):
+        return None, [], 0
+    entries = set()
+    snapshot_digest = None
+    delta_lines = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.startswith(SNAPSHOT_HEADER) or line.startswith(DELTA_HEADER):
+                snapshot_digest = line.split()[-1]
+            elif line.startswith(("+ ", "- ")):
+                key, _, triple = line[2:].partition(" ")
+                if line[0] == "+":
+                    entries.add((key, triple))
+                else:
+                    entries.discard((key, triple))
+                delta_lines += 1
+            elif line:
+                key, _, triple = line.partition(" ")
+                entries.add((key, triple))
+    return snapshot_digest, sorted(entries), delta_lines
+
+
+def write_snapshot(path, entries, snapshot_digest):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"{SNAPSHOT_HEADER} {snapshot_digest}\n")
+        for key, line in entries:
+            f.write(f"{key} {line}\n")
+
+
+def append_snapshot_delta(path, added, removed, snapshot_digest):
+    """
+    Append a delta (N-Triples lines) to an existing snapshot.
+    """
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(f"{DELTA_HEADER} {snapshot_digest}\n")
+        for line in removed:
+            f.write(f"- {line_hash(line)} {line}\n")
+        for line in added:
+            f.write(f"+ {line_hash(line)} {line}\n")
+
+
+def diff_entries(old, new):
+    """
+    Merge-join two hash-sorted entry lists.
+
+    Returns:
+        (added lines, removed lines)
+    """
+    added, removed = [], []
+    i = j = 0
+    while i < len(old) and j < len(new):
+        if old[i] == new[j]:
+            i += 1
+            j += 1
+        elif old[i] < new[j]:
+            removed.append(old[i][1])
+            i += 1
+        else:
+            added.append(new[j][1])
+            j += 1
+    removed.extend(line for _, line in old[i:])
+    added.extend(line for _, line in new[j:])
+    return added, removed
+
+
+def parse_lines(lines):
+    """
+    Turn N-Triples lines back into rdflib triples.
+    """
+    if not lines:
+        return []
+    return list(Graph().parse(data="\n".join(lines), format="nt"))
+
+
+def write_patch(path, added, removed, new_digest, prev_digest):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"H id <urn:sha256:{new_digest}> .\n")
+        if prev_digest:
+            f.write(f"H prev <urn:sha256:{prev_digest}> .\n")
+        f.write("TX .\n")
+        for line in removed:
+            f.write(f"D {line}\n")
+        for line in added:
+            f.write(f"A {line}\n")
+        f.write("TC .\n")
+
+
+def read_patch(path):
+    """
+    Read an RDF Patch file written by write_patch().
+
+    Returns:
+        (added triples, removed triples)
+    """
+    added, removed = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("A "):
+                added.append(line[2:].rstrip("\n"))
+            elif line.startswith("D "):
+                removed.append(line[2:].rstrip("\n"))
+    return parse_lines(added), parse_lines(removed)
+
+
+def apply_patch(graph, path):
+    """
+    Apply an RDF Patch file to a graph (or an InferenceCache) in place.
+    """
+    added, removed = read_patch(path)
+    if hasattr(graph, "apply_changes"):
+        graph.apply_changes(added=added, removed=removed)
+    else:
+        for triple in removed:
+            graph.remove(triple)
+        for triple in added:
+            graph.add(triple)
+    return len(added), len(removed)
+
+
+def incremental_build(graph, snapshot_path="build_snapshot.txt", patch_dir="patches",
+                      inferred_path="california_inferred.trig"):
+    """
+    Diff a freshly built graph against the previous build and apply the delta.
+
+    Returns:
+        Dictionary with 'added', 'removed', 'patch' (path or None) and timings
+    """
+    timings = {}
+    start = time.perf_counter()
+    prev_digest, old_entries, delta_lines = read_snapshot(snapshot_path)
+    new_entries = hashed_lines(graph)
+    new_digest = digest(new_entries)
+    timings['diff'] = time.perf_counter() - start
+
+    if new_digest == prev_digest:
+        return {'added': 0, 'removed': 0, 'patch': None, 'timings': timings}
+
+    start = time.perf_counter()
+    added, removed = diff_entries(old_entries, new_entries)
+    os.makedirs(patch_dir, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    patch_path = os.path.join(patch_dir, f"{stamp}.rdfp")
+    write_patch(patch_path, added, removed, new_digest, prev_digest)
+    timings['patch'] = time.perf_counter() - start
+
+    if os.path.exists(inferred_path):
+        from inference import InferenceCache
+
+        start = time.perf_counter()
+        cache = InferenceCache.load(inferred_path)
+        cache.apply_changes(added=parse_lines(added), removed=parse_lines(removed))
+        cache.save(inferred_path)
+        timings['inference'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    delta_lines += len(added) + len(removed)
+    if prev_digest is None or delta_lines > len(new_entries):
+        # Compact once the appended deltas are larger than the snapshot itself
+        write_snapshot(snapshot_path, new_entries, new_digest)
+    else:
+        append_snapshot_delta(snapshot_path, added, removed, new_digest)
+    timings['snapshot'] = time.perf_counter() - start
+
+    return {'added': len(added), 'removed': len(removed), 'patch': patch_path, 'timings': timings}
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Materialized RDFS/OWL-RL inference for the California ontology.
+
+The closure of the rules below is computed once and stored in its own named
+graph, next to the asserted triples, so SPARQL queries can use plain triple
+patterns (e.g. `?city rdf:type ca:City`) instead of re-walking the class
+hierarchy with `rdf:type/rdfs:subClassOf*` on every execution:
+
+  - rdfs:subClassOf      (transitive, and inherited by rdf:type)
+  - rdfs:domain / rdfs:range
+  - owl:inverseOf        (e.g. locatedIn <-> hasCity)
+  - owl:SymmetricProperty (e.g. borders)
+
+Additions are forward-chained from the new triple only. Removals use the
+DRed strategy (over-delete everything derived from the removed triple, then
+re-derive what still has support), so updates cost time proportional to the
+affected part of the closure rather than the whole graph. Changes to the
+schema itself trigger a full rebuild.
+
+SPARQL UPDATE requests go through `InferenceCache.update`: each operation is
+evaluated against the asserted + inferred view with its writes recorded, and
+the recorded delta is then applied with `add`/`remove`.
+"""
+
+import sys
+import time
+from collections import defaultdict
+
+from rdflib import Dataset, Graph, Literal, Namespace, OWL, RDF, RDFS, URIRef
+from rdflib.namespace import XSD
+from rdflib.plugins.sparql.algebra import translateUpdate
+from rdflib.plugins.sparql.parser import parseUpdate
+from rdflib.plugins.sparql.sparql import Update
+from rdflib.plugins.sparql.update import evalUpdate
+from rdflib.store import Store
+
+CA = Namespace("http://www.semanticweb.org/california-ontology#")
+
+# Named graphs holding the asserted and the inferred triples
+ASSERTED_GRAPH = URIRef("urn:x-california:asserted")
+INFERRED_GRAPH = URIRef("urn:x-california:inferred")
+
+SCHEMA_PREDICATES = {RDFS.subClassOf, RDFS.domain, RDFS.range, OWL.inverseOf}
+
+
+def is_schema_triple(triple):
+    """
+    Check whether a triple changes the rule set (and therefore needs a rebuild).
+    """
+    s, p, o = triple
+    return p in SCHEMA_PREDICATES or (p == RDF.type and o == OWL.SymmetricProperty)
+
+
+class Schema:
+    """
+    Rule tables compiled from the TBox of a graph.
+    """
+
+    def __init__(self, graph):
+        direct = defaultdict(set)
+        for sub, sup in graph.subject_objects(RDFS.subClassOf):
+            if sub != sup:
+                direct[sub].add(sup)
+
+        # Transitive closure of rdfs:subClassOf
+        self.superclasses = {}
+        for cls in direct:
+            seen = set()
+            stack = list(direct[cls])
+            while stack:
+                sup = stack.pop()
+                if sup not in seen and sup != cls:
+                    seen.add(sup)
+                    stack.extend(direct.get(sup, ()))
+            self.superclasses[cls] = seen
+
+        self.subclasses = defaultdict(set)
+        for cls, sups in self.superclasses.items():
+            for sup in sups:
+                self.subclasses[sup].add(cls)
+
+        self.domains = defaultdict(set)
+        for prop, cls in graph.subject_objects(RDFS.domain):
+            self.domains[prop].add(cls)
+
+        # Datatype ranges (xsd:integer, xsd:float, ...) do not type anything
+        self.ranges = defaultdict(set)
+        for prop, cls in graph.subject_objects(RDFS.range):
+            if not str(cls).startswith(str(XSD)) and cls != RDFS.Literal:
+                self.ranges[prop].add(cls)
+
+        # owl:inverseOf is itself symmetric
+        self.inverses = defaultdict(set)
+        for p, q in graph.subject_objects(OWL.inverseOf):
+            self.inverses[p].add(q)
+            self.inverses[q].add(p)
+
+        self.symmetric = set(graph.subjects(RDF.type, OWL.SymmetricProperty))
+
+        self.direct_superclasses = direct
+
+    def closure_triples(self):
+        """
+        Yield the entailed rdfs:subClassOf triples that are not asserted.
+        """
+        for cls, sups in self.superclasses.items():
+            for sup in sups - self.direct_superclasses[cls]:
+                yield (cls, RDFS.subClassOf, sup)
+
+    def consequences(self, triple):
+        """
+        Yield the triples entailed in one step by a single instance triple.
+        """
+        s, p, o = triple
+        if p == RDF.type:
+            for sup in self.superclasses.get(o, ()):
+                yield (s, RDF.type, sup)
+            return
+        if p == RDFS.subClassOf:
+            return
+        for cls in self.domains.get(p, ()):
+            yield (s, RDF.type, cls)
+        if isinstance(o, Literal):
+            return
+        for cls in self.ranges.get(p, ()):
+            yield (o, RDF.type, cls)
+        for q in self.inverses.get(p, ()):
+            yield (o, q, s)
+        if p in self.symmetric:
+            yield (o, p, s)
+
+
+class _DeltaStore(Store):
+    """
+    Reads the asserted + inferred view of a cache and records writes instead
+    of applying them, so an update's WHERE clause sees the state before it.
+    """
+
+    def __init__(self, cache):
+        super().__init__()
+        self.cache = cache
+        self.added = set()
+        self.removed = set()
+
+    def triples(self, pattern, context=None):
+        for triple in self.cache.dataset.triples(pattern):
+            yield triple, iter(())
+
+    def add(self, triple, context, quoted=False):
+        self.removed.discard(triple)
+        self.added.add(triple)
+
+    def addN(self, quads):
+        for s, p, o, c in quads:
+            self.add((s, p, o), c)
+
+    def remove(self, pattern, context=None):
+        # Only asserted triples can be retracted
+        for triple in self.cache.asserted.triples(pattern):
+            self.added.discard(triple)
+            self.removed.add(triple)
+        if None not in pattern:
+            self.added.discard(pattern)
+
+    def __len__(self, context=None):
+        return len(self.cache.dataset)
+
+
+class InferenceCache:
+    """
+    Asserted triples plus their materialized closure in a single Dataset.
+
+    `dataset` is created with `default_union=True`, so querying it sees the
+    asserted and the inferred graph together, while `asserted` and `inferred`
+    give access to each named graph on its own.
+    """
+
+    def __init__(self, graph=None):
+        self.dataset = Dataset(default_union=True)
+        self.asserted = self.dataset.graph(ASSERTED_GRAPH)
+        self.inferred = self.dataset.graph(INFERRED_GRAPH)
+
+        if graph is not None:
+            for prefix, namespace in graph.namespaces():
+                self.dataset.bind(prefix, namespace)
+            for triple in graph:
+                self.asserted.add(triple)
+
+        self.rebuild()
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reopen a cache saved with `save()` without re-running the closure.
+        """
+        cache = cls.__new__(cls)
+        cache.dataset = Dataset(default_union=True)
+        cache.dataset.parse(path, format="trig")
+        cache.asserted = cache.dataset.graph(ASSERTED_GRAPH)
+        cache.inferred = cache.dataset.graph(INFERRED_GRAPH)
+        cache.schema = Schema(cache.asserted)
+        return cache
+
+    def save(self, path):
+        """
+        Write both named graphs to a TriG file.
+        """
+        self.dataset.serialize(destination=path, format="trig")
+
+    def rebuild(self):
+        """
+        Recompute the whole closure from the asserted triples.
+        """
+        self.schema = Schema(self.asserted)
+        self.inferred.remove((None, None, None))
+        for triple in self.schema.closure_triples():
+            if triple not in self.asserted:
+                self.inferred.add(triple)
+        self._materialize(list(self.asserted))
+
+    def _contains(self, triple):
+        return triple in self.asserted or triple in self.inferred
+
+    def _materialize(self, triples):
+        """
+        Forward-chain from the given triples until nothing new is entailed.
+        """
+        agenda = list(triples)
+        added = 0
+        while agenda:
+            triple = agenda.pop()
+            for entailed in self.schema.consequences(triple):
+                if not self._contains(entailed):
+                    self.inferred.add(entailed)
+                    agenda.append(entailed)
+                    added += 1
+        return added
+
+    def _derivable(self, triple):
+        """
+        Check whether a triple is entailed in one step by the current triples.
+        """
+        s, p, o = triple
+        schema = self.schema
+        if p == RDF.type:
+            for sub in schema.subclasses.get(o, ()):
+                if self._contains((s, RDF.type, sub)):
+                    return True
+            for prop, classes in schema.domains.items():
+                if o in classes and self._any((s, prop, None)):
+                    return True
+            for prop, classes in schema.ranges.items():
+                if o in classes and self._any((None, prop, s)):
+                    return True
+            return False
+        if isinstance(o, Literal):
+            return False
+        for q in schema.inverses.get(p, ()):
+            if self._contains((o, q, s)):
+                return True
+        if p in schema.symmetric and self._contains((o, p, s)):
+            return True
+        return False
+
+    def _any(self, pattern):
+        for _ in self.dataset.triples(pattern):
+            return True
+        return False
+
+    def add(self, triple):
+        """
+        Assert a triple and materialize only what it newly entails.
+        """
+        if triple in self.asserted:
+            return
+        self.asserted.add(triple)
+        if is_schema_triple(triple):
+            self.rebuild()
+            return
+        if triple in self.inferred:
+            # Already entailed, so its consequences are materialized too
+            self.inferred.remove(triple)
+            return
+        self._materialize([triple])
+
+    def remove(self, triple):
+        """
+        Retract an asserted triple and repair the closure (DRed).
+        """
+        if triple not in self.asserted:
+            return
+        self.asserted.remove(triple)
+        if is_schema_triple(triple):
+            self.rebuild()
+            return
+
+        # Over-delete everything reachable from the removed triple
+        deleted = [triple]
+        agenda = [triple]
+        while agenda:
+            current = agenda.pop()
+            for entailed in self.schema.consequences(current):
+                if entailed in self.inferred:
+                    self.inferred.remove(entailed)
+                    deleted.append(entailed)
+                    agenda.append(entailed)
+
+        # Re-derive the deleted triples that still have an alternative support
+        rederived = [t for t in deleted if self._derivable(t)]
+        for t in rederived:
+            self.inferred.add(t)
+        self._materialize(rederived)
+
+    def apply_changes(self, added=(), removed=()):
+        """
+        Apply a batch of retractions and assertions (e.g. from a build patch).
+
+        If the batch touches the schema, the asserted triples are updated
+        directly and the closure is rebuilt once.
+        """
+        added, removed = list(added), list(removed)
+        if any(is_schema_triple(t) for t in added) or any(is_schema_triple(t) for t in removed):
+            for triple in removed:
+                self.asserted.remove(triple)
+            for triple in added:
+                self.asserted.add(triple)
+            self.rebuild()
+            return
+        for triple in removed:
+            self.remove(triple)
+        for triple in added:
+            self.add(triple)
+
+    def update(self, update_string):
+        """
+        Run a SPARQL UPDATE and maintain the closure incrementally.
+
+        Operations that manage whole graphs (LOAD, CLEAR, DROP, ...) and
+        GRAPH blocks are not supported.
+        """
+        parsed = translateUpdate(parseUpdate(update_string), initNs=dict(self.dataset.namespaces()))
+        for operation in parsed.algebra:
+            recorder = _DeltaStore(self)
+            evalUpdate(Graph(store=recorder), Update(parsed.prologue, [operation]))
+            self.apply_changes(added=recorder.added, removed=recorder.removed)
+
+    def query(self, query_string, **kwargs):
+        """
+        Run a SPARQL query over asserted and inferred triples together.
+        """
+        return self.dataset.query(query_string, **kwargs)
+
+    def __len__(self):
+        return len(self.asserted) + len(self.inferred)
+
+
+def main():
+    """
+    Materialize the closure of project.owl and write it to a TriG file.
+    """
+    source = sys.argv[1] if len(sys.argv) > 1 else "project.owl"
+    destination = sys.argv[2] if len(sys.argv) > 2 else "california_inferred.trig"
+
+    g = Graph()
+    g.parse(source, format="xml")
+
+    start = time.perf_counter()
+    cache = InferenceCache(g)
+    elapsed = time.perf_counter() - start
+
+    print(f"Asserted triples: {len(cache.asserted)}")
+    print(f"Inferred triples: {len(cache.inferred)}")
+    print(f"Materialization time: {elapsed * 1000:.1f} ms")
+
+    cache.save(destination)
+    print(f"Saved asserted and inferred graphs to {destination}")
+
+
+if __name__ == "__main__":
+    main()
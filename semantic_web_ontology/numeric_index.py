@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Sorted secondary indexes for the numeric datatype properties of the ontology.
+
+For every owl:DatatypeProperty with a numeric range (hasPopulation, hasArea,
+establishedYear) the values are kept in a sorted `array('d')` with the subjects
+alongside, so a range lookup is two bisections and a slice.
+
+`enable_range_pushdown(graph, indexes)` hooks into rdflib's SPARQL evaluator
+(CUSTOM_EVALS): a FILTER directly over a basic graph pattern whose conjuncts
+compare a variable to a numeric constant, e.g.
+
+    ?city ca:hasPopulation ?population .
+    FILTER(?population > 100000 && ?area < 500)
+
+is answered by seeding the BGP with the subjects from the most selective index
+range instead of enumerating every binding first. The complete FILTER is still
+applied to each solution, so results are identical to plain evaluation.
+
+Indexes are a snapshot: rebuild them after the graph changes. The graph must
+live on a `VersionedMemory` store, whose add and remove bump a change counter
+for every Graph that shares the store, and pushdown is skipped automatically
+once the counter no longer matches the one the indexes were built at. Seed
+triples are also checked against the graph before use.
+"""
+
+import argparse
+import random
+import time
+import weakref
+from array import array
+from bisect import bisect_left, bisect_right
+
+from rdflib import Graph, Literal, Namespace, OWL, RDF, RDFS, Variable
+from rdflib.namespace import XSD
+from rdflib.plugins.sparql import CUSTOM_EVALS
+from rdflib.plugins.sparql.evaluate import evalBGP
+from rdflib.plugins.sparql.evalutils import _ebv
+from rdflib.plugins.stores.memory import Memory
+
+CA = Namespace("http://www.semanticweb.org/california-ontology#")
+
+NUMERIC_DATATYPES = {
+    XSD.integer, XSD.int, XSD.long, XSD.short, XSD.nonNegativeInteger,
+    XSD.positiveInteger, XSD.decimal, XSD.float, XSD.double,
+}
+
+
+class NumericIndex:
+    """
+    Values of one property in ascending order, with their subjects.
+    """
+
+    def __init__(self, graph, prop):
+        entries = []
+        for s, o in graph.subject_objects(prop):
+            if isinstance(o, Literal):
+                value = o.toPython()
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    entries.append((float(value), s, o))
+                elif hasattr(value, 'is_finite'):  # Decimal
+                    entries.append((float(value), s, o))
+        entries.sort(key=lambda e: e[0])
+
+        self.prop = prop
+        self.values = array('d', (e[0] for e in entries))
+        self.subjects = [e[1] for e in entries]
+        self.literals = [e[2] for e in entries]
+
+    def _bounds(self, low=None, high=None):
+        # Bounds are always inclusive: the index only has to return a superset,
+        # the exact comparison is left to the FILTER.
+        i = 0 if low is None else bisect_left(self.values, low)
+        j = len(self.values) if high is None else bisect_right(self.values, high)
+        return i, max(i, j)
+
+    def count(self, low=None, high=None):
+        i, j = self._bounds(low, high)
+        return j - i
+
+    def range(self, low=None, high=None):
+        """
+        Yield (subject, literal) pairs with low <= value <= high.
+        """
+        i, j = self._bounds(low, high)
+        for k in range(i, j):
+            yield self.subjects[k], self.literals[k]
+
+    def __len__(self):
+        return len(self.values)
+
+
+def build_numeric_indexes(graph):
+    """
+    Index every datatype property whose rdfs:range is a numeric XSD type.
+
+    Returns:
+        Dictionary mapping property IRI to its NumericIndex
+    """
+    indexes = {}
+    for prop in graph.subjects(RDF.type, OWL.DatatypeProperty):
+        if graph.value(prop, RDFS.range) in NUMERIC_DATATYPES:
+            indexes[prop] = NumericIndex(graph, prop)
+    return indexes
+
+
+# ============== FILTER PUSHDOWN ==============
+
+_FLIPPED = {'<': '>', '<=': '>=', '>': '<', '>=': '<=', '=': '='}
+
+
+def _numeric_constant(term):
+    if isinstance(term, Literal) and term.datatype in NUMERIC_DATATYPES:
+        try:
+            return float(term.toPython())
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+def range_constraints(expr, constraints=None):
+    """
+    Collect `?var op constant` conjuncts of a FILTER expression.
+
+    Returns:
+        Dictionary mapping Variable to a [low, high] pair (None = unbounded)
+    """
+    if constraints is None:
+        constraints = {}
+    name = getattr(expr, 'name', None)
+
+    if name == 'ConditionalAndExpression':
+        range_constraints(expr.expr, constraints)
+        for other in expr.other or []:
+            range_constraints(other, constraints)
+    elif name == 'RelationalExpression' and expr.op in _FLIPPED:
+        var, op, value = expr.expr, expr.op, _numeric_constant(expr.other)
+        if not isinstance(var, Variable):
+            var, op, value = expr.other, _FLIPPED[expr.op], _numeric_constant(expr.expr)
+        if isinstance(var, Variable) and value is not None:
+            low, high = constraints.get(var, [None, None])
+            if op in ('>', '>=', '='):
+                low = value if low is None else max(low, value)
+            if op in ('<', '<=', '='):
+                high = value if high is None else min(high, value)
+            constraints[var] = [low, high]
+    return constraints
+
+
+class VersionedMemory(Memory):
+    """
+    In-memory store that counts its changes, so indexes built over a graph
+    can tell whether they are still current.
+
+    Every write through any Graph on this store reaches add or remove
+    (rdflib's addN, parse and SPARQL UPDATE included), so `version` changes
+    whenever the data may have.
+    """
+
+    def __init__(self, configuration=None, identifier=None):
+        super().__init__(configuration, identifier)
+        self.version = 0
+
+    def add(self, triple, context, quoted=False):
+        self.version += 1
+        super().add(triple, context, quoted)
+
+    def remove(self, triple_pattern, context=None):
+        self.version += 1
+        super().remove(triple_pattern, context)
+
+
+def graph_version(graph):
+    """
+    Change counter of the graph's store.
+    """
+    try:
+        return graph.store.version
+    except AttributeError:
+        raise TypeError("Range pushdown needs a graph on a VersionedMemory store, "
+                        "e.g. Graph(store=VersionedMemory())") from None
+
+
+# Graph -> (indexes, graph_version when the indexes were built)
+_INDEXED_GRAPHS = weakref.WeakKeyDictionary()
+
+
+def _indexes_for(ctx):
+    # ctx.dataset raises for plain graphs, so read the underlying attribute
+    for graph in (ctx.graph, getattr(ctx, '_dataset', None)):
+        if graph is None:
+            continue
+        entry = _INDEXED_GRAPHS.get(graph)
+        if entry is not None:
+            indexes, version = entry
+            return indexes if graph_version(graph) == version else None
+    return None
+
+
+def _eval_range_filter(ctx, part):
+    if part.name != 'Filter' or getattr(part.p, 'name', None) != 'BGP':
+        raise NotImplementedError
+    indexes = _indexes_for(ctx)
+    if not indexes:
+        raise NotImplementedError
+    constraints = range_constraints(part.expr)
+
+    # Seed from the narrowest indexed range
+    best = None
+    for triple in part.p.triples:
+        s, p, o = triple
+        if p in indexes and isinstance(o, Variable) and o in constraints and ctx[o] is None:
+            count = indexes[p].count(*constraints[o])
+            if best is None or count < best[1]:
+                best = (triple, count)
+    if best is None:
+        raise NotImplementedError
+
+    seed = best[0]
+    rest = [t for t in part.p.triples if t is not seed]
+    return _seeded_filter(ctx, part, seed, indexes[seed[1]], constraints[seed[2]], rest)
+
+
+def _seeded_filter(ctx, part, seed, index, bounds, rest):
+    s, p, o = seed
+    bound_subject = ctx[s] if isinstance(s, Variable) else s
+    for subject, literal in index.range(*bounds):
+        if bound_subject is not None and subject != bound_subject:
+            continue
+        # The seed triple is not re-matched by evalBGP; make sure it still holds
+        if (subject, p, literal) not in ctx.graph:
+            continue
+        c = ctx.push()
+        if bound_subject is None:
+            c[s] = subject
+        c[o] = literal
+        remaining = sorted(rest, key=lambda t: len([n for n in t if c[n] is None]))
+        for x in evalBGP(c, remaining):
+            if _ebv(part.expr, x.forget(ctx, _except=part._vars) if not part.no_isolated_scope else x):
+                yield x
+
+
+def enable_range_pushdown(graph, indexes=None):
+    """
+    Answer numeric range FILTERs over `graph` from sorted indexes. The graph
+    must live on a VersionedMemory store; pushdown is skipped once the store
+    has changed since the indexes were built.
+
+    Returns:
+        The indexes used (built from the graph if not given)
+    """
+    if indexes is None:
+        indexes = build_numeric_indexes(graph)
+    _INDEXED_GRAPHS[graph] = (indexes, graph_version(graph))
+    CUSTOM_EVALS['numeric_range_pushdown'] = _eval_range_filter
+    return indexes
+
+
+def disable_range_pushdown(graph):
+    _INDEXED_GRAPHS.pop(graph, None)
+
+
+def add_generated_cities(graph, count, seed=42):
+    """
+    Add synthetic cities to measure range queries on larger graphs.
+    """
+    random.seed(seed)
+    regions = [CA.BayArea, CA.CentralCoast, CA.SanJoaquinValley, CA.Desert, CA.NorthCoast]
+    for i in range(count):
+        city = CA[f"GeneratedCity{i}"]
+        graph.add((city, RDF.type, CA.SmallCity))
+        graph.add((city, RDFS.label, Literal(f"Generated City {i}")))
+        graph.add((city, CA.locatedIn, random.choice(regions)))
+        graph.add((city, CA.hasPopulation, Literal(random.randint(1000, 99999), datatype=XSD.integer)))
+        graph.add((city, CA.hasArea, Literal(round(random.uniform(5, 2000), 1), datatype=XSD.float)))
+
+
+def main():
+    from test_queries import queries
+
+    parser = argparse.ArgumentParser(description="Compare Query 1 with and without range-index pushdown")
+    parser.add_argument("--ontology", default="project.owl")
+    parser.add_argument("--generate", type=int, default=0, metavar="N",
+                        help="add N synthetic small cities first")
+    args = parser.parse_args()
+
+    g = Graph(store=VersionedMemory())
+    g.parse(args.ontology, format="xml")
+    if args.generate:
+        add_generated_cities(g, args.generate)
+    query = queries[0]['query']
+
+    start = time.perf_counter()
+    plain = list(g.query(query))
+    plain_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexes = enable_range_pushdown(g)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = list(g.query(query))
+    indexed_time = time.perf_counter() - start
+
+    print(f"Triples: {len(g)}")
+    for prop, index in indexes.items():
+        print(f"  {prop.split('#')[-1]}: {len(index)} values")
+    print(f"Index build:     {build_time * 1000:.1f} ms")
+    print(f"Full scan:       {plain_time * 1000:.1f} ms ({len(plain)} rows)")
+    print(f"Index pushdown:  {indexed_time * 1000:.1f} ms ({len(indexed)} rows)")
+    print(f"Same results:    {plain == indexed}")
+
+
+if __name__ == "__main__":
+    main()
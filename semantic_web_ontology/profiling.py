@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Phase timers and profiling output shared by create_ontology.py and
+test_queries.py (`--profile`).
+
+A `Profiler` wraps each phase of a run in a timer:
+
+    with profiler.phase("serialize.xml"):
+        g.serialize(...)
+
+and writes a JSON report with the wall time of every phase. Optionally:
+
+  - `--profile-memory`: peak traced memory per phase (tracemalloc; nested
+    phases are accounted in their parents too);
+  - `--profile-cprofile`: a cProfile dump next to the report (`.prof`, for
+    pstats/snakeviz) and the top functions in the report;
+  - `--profile-stacks`: a background thread samples the main thread's stack
+    every millisecond and writes collapsed stacks (`.folded`), the input
+    format of flamegraph.pl and speedscope.
+
+Reports from two runs can be compared phase by phase:
+
+    python profiling.py diff profile_before.json profile_after.json
+"""
+
+import argparse
+import cProfile
+import json
+import os
+import platform
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+
+class StackSampler(threading.Thread):
+    """
+    Samples the stack of one thread at a fixed interval into collapsed stacks.
+    """
+
+    def __init__(self, thread_id, interval=0.001):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._stop_event = threading.Event()
+
+    @staticmethod
+    def _label(code):
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    """
+    Records phase timings for one run; a disabled profiler only runs the phases.
+    """
+
+    def __init__(self, command, report_path=None, cprofile=False, memory=False, stacks=False):
+        self.command = command
+        self.enabled = report_path is not None
+        self.report_path = report_path
+        self.use_cprofile = cprofile and self.enabled
+        self.use_memory = memory and self.enabled
+        self.use_stacks = stacks and self.enabled
+        self.phases = []
+        self._stack = []
+        self._profile = None
+        self._sampler = None
+        self._start = None
+
+    @classmethod
+    def from_args(cls, args, command):
+        return cls(command, args.profile, args.profile_cprofile, args.profile_memory, args.profile_stacks)
+
+    def _base(self, extension):
+        return os.path.splitext(self.report_path)[0] + extension
+
+    def start(self):
+        if not self.enabled:
+            return self
+        self._start = time.perf_counter()
+        if self.use_memory:
+            tracemalloc.start()
+        if self.use_stacks:
+            self._sampler = StackSampler(threading.get_ident())
+            self._sampler.start()
+        if self.use_cprofile:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        return self
+
+    @contextmanager
+    def phase(self, name, **details):
+        """
+        Time a phase; extra keyword arguments are stored with it in the report.
+        """
+        if not self.enabled:
+            yield details
+            return
+
+        if self.use_memory:
+            if self._stack:
+                self._stack[-1]['peak'] = max(self._stack[-1]['peak'], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        entry = {'peak': 0}
+        self._stack.append(entry)
+        start = time.perf_counter()
+        try:
+            yield details
+        finally:
+            seconds = time.perf_counter() - start
+            self._stack.pop()
+            record = {'name': name, 'seconds': seconds}
+            if self.use_memory:
+                peak = max(entry['peak'], tracemalloc.get_traced_memory()[1])
+                if self._stack:
+                    self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+                record['peak_kb'] = round(peak / 1024, 1)
+            record.update(details)
+            self.phases.append(record)
+
+    def stop(self):
+        """
+        Stop profiling and write the report (and .prof / .folded files).
+
+        Returns:
+            The report dictionary, or None when profiling is disabled
+        """
+        if not self.enabled:
+            return None
+
+        report = {
+            'command': self.command,
+            'argv': sys.argv[1:],
+            'started': datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            'python': platform.python_version(),
+            'total_seconds': time.perf_counter() - self._start,
+            'phases': self.phases,
+        }
+
+        if self._profile is not None:
+            self._profile.disable()
+            prof_path = self._base(".prof")
+            self._profile.dump_stats(prof_path)
+            stats = pstats.Stats(self._profile)
+            top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:15]
+            report['cprofile'] = prof_path
+            report['top_functions'] = [
+                {'function': f"{func[2]} ({os.path.basename(func[0])}:{func[1]})",
+                 'calls': nc, 'tottime': round(tt, 6), 'cumtime': round(ct, 6)}
+                for func, (cc, nc, tt, ct, callers) in top
+            ]
+        if self._sampler is not None:
+            self._sampler.stop()
+            folded_path = self._base(".folded")
+            self._sampler.write(folded_path)
+            report['flamegraph'] = folded_path
+        if self.use_memory:
+            report['peak_kb'] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+            tracemalloc.stop()
+
+        with open(self.report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nProfile report written to {self.report_path}")
+        print_report(report)
+        return report
+
+
+def add_profile_arguments(parser, default_report):
+    group = parser.add_argument_group("profiling")
+    group.add_argument("--profile", nargs="?", const=default_report, metavar="REPORT",
+                       help=f"time each phase and write a JSON report (default: {default_report})")
+    group.add_argument("--profile-cprofile", action="store_true", help="also run cProfile (writes .prof)")
+    group.add_argument("--profile-memory", action="store_true", help="also record tracemalloc peaks per phase")
+    group.add_argument("--profile-stacks", action="store_true",
+                       help="also sample stacks into flamegraph input (writes .folded)")
+
+
+# ============== REPORTS ==============
+
+def print_report(report):
+    print(f"{'Phase':48s} {'seconds':>10s} {'peak KB':>10s}")
+    for p in report['phases']:
+        peak = f"{p['peak_kb']:10.1f}" if 'peak_kb' in p else f"{'-':>10s}"
+        print(f"{p['name'][:48]:48s} {p['seconds']:10.4f} {peak}")
+    print(f"{'total':48s} {report['total_seconds']:10.4f}")
+
+
+def diff_reports(old, new, threshold=10.0):
+    """
+    Compare two reports phase by phase.
+
+    Returns:
+        List of (phase, old seconds, new seconds, percent change, regressed)
+    """
+    old_phases = {p['name']: p for p in old['phases']}
+    new_phases = {p['name']: p for p in new['phases']}
+    names = list(old_phases) + [n for n in new_phases if n not in old_phases]
+    names.append('total')
+    old_phases['total'] = {'seconds': old['total_seconds']}
+    new_phases['total'] = {'seconds': new['total_seconds']}
+
+    rows = []
+    for name in names:
+        before = old_phases.get(name, {}).get('seconds')
+        after = new_phases.get(name, {}).get('seconds')
+        change = None
+        if before and after is not None:
+            change = (after - before) / before * 100
+        regressed = change is not None and change > threshold and after - before > 0.001
+        rows.append((name, before, after, change, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show or compare --profile reports")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("show", help="print a report")
+    show.add_argument("report")
+    diff = sub.add_parser("diff", help="compare two reports phase by phase")
+    diff.add_argument("old")
+    diff.add_argument("new")
+    diff.add_argument("--threshold", type=float, default=10.0,
+                      help="flag phases that got slower by more than this percentage (default 10)")
+    args = parser.parse_args()
+
+    if args.command == "show":
+        with open(args.report, encoding="utf-8") as f:
+            print_report(json.load(f))
+        return
+
+    with open(args.old, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+
+    def fmt(seconds):
+        return f"{seconds:10.4f}" if seconds is not None else f"{'-':>10s}"
+
+    print(f"{'Phase':48s} {'old':>10s} {'new':>10s} {'change':>9s}")
+    regressions = 0
+    for name, before, after, change, regressed in diff_reports(old, new, args.threshold):
+        pct = f"{change:+8.1f}%" if change is not None else f"{'-':>9s}"
+        flag = "  REGRESSION" if regressed else ""
+        regressions += regressed
+        print(f"{name[:48]:48s} {fmt(before)} {fmt(after)} {pct}{flag}")
+    print(f"\n{regressions} phase(s) slower by more than {args.threshold:g}%")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Precomputed reachability index for region graphs such as `ca:borders`.
+
+The transitive closure of a property is built once from the graph: strongly
+connected components are collapsed (Tarjan), and every component gets a bitset
+(a Python int, one bit per node) of the nodes reachable from it, propagated in
+reverse topological order. Answering "is B reachable from A?" is then a single
+bit test, and `reachable(A)` decodes one bitset instead of traversing the graph.
+
+Edges declared symmetric (owl:SymmetricProperty) are indexed in both
+directions, and triples of an owl:inverseOf property are added reversed, so
+the answers no longer depend on which direction a border was asserted in.
+
+The index is also available inside SPARQL through custom functions:
+
+    PREFIX fn: <http://www.semanticweb.org/california-ontology/functions#>
+    SELECT ?region WHERE {
+      ?region rdf:type ca:Region .
+      FILTER(fn:reachable(ca:BayArea, ?region, ca:borders))
+    }
+
+`fn:hops(?a, ?b, ca:borders)` returns the length of the shortest path.
+"""
+
+import sys
+import time
+
+from rdflib import Graph, Literal, Namespace, OWL, RDF, URIRef
+from rdflib.namespace import XSD
+from rdflib.plugins.sparql.operators import register_custom_function
+from rdflib.plugins.sparql.sparql import SPARQLError
+
+CA = Namespace("http://www.semanticweb.org/california-ontology#")
+FN = Namespace("http://www.semanticweb.org/california-ontology/functions#")
+
+
+def _iter_bits(bits):
+    """
+    Yield the positions of the set bits of an int, lowest first.
+    """
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class ReachabilityIndex:
+    """
+    Transitive-closure index over a single property of a graph.
+    """
+
+    def __init__(self, graph, prop, symmetric=None):
+        self.prop = prop
+        if symmetric is None:
+            symmetric = (prop, RDF.type, OWL.SymmetricProperty) in graph
+
+        edges = set()
+        for s, o in graph.subject_objects(prop):
+            edges.add((s, o))
+            if symmetric:
+                edges.add((o, s))
+        for inverse in set(graph.subjects(OWL.inverseOf, prop)) | set(graph.objects(prop, OWL.inverseOf)):
+            for s, o in graph.subject_objects(inverse):
+                edges.add((o, s))
+                if symmetric:
+                    edges.add((s, o))
+
+        self.nodes = sorted({n for edge in edges for n in edge})
+        self.position = {node: i for i, node in enumerate(self.nodes)}
+
+        self.successors = [[] for _ in self.nodes]
+        self.adjacency = [0] * len(self.nodes)
+        for s, o in edges:
+            i, j = self.position[s], self.position[o]
+            self.successors[i].append(j)
+            self.adjacency[i] |= 1 << j
+
+        self._build_closure()
+
+    def _strongly_connected_components(self):
+        """
+        Iterative Tarjan; components come out in reverse topological order.
+        """
+        n = len(self.nodes)
+        index = [None] * n
+        low = [0] * n
+        on_stack = [False] * n
+        stack = []
+        components = []
+        counter = 0
+
+        for root in range(n):
+            if index[root] is not None:
+                continue
+            work = [(root, 0)]
+            while work:
+                node, child = work.pop()
+                if child == 0:
+                    index[node] = low[node] = counter
+                    counter += 1
+                    stack.append(node)
+                    on_stack[node] = True
+                recurse = False
+                successors = self.successors[node]
+                while child < len(successors):
+                    nxt = successors[child]
+                    child += 1
+                    if index[nxt] is None:
+                        work.append((node, child))
+                        work.append((nxt, 0))
+                        recurse = True
+                        break
+                    if on_stack[nxt]:
+                        low[node] = min(low[node], index[nxt])
+                if recurse:
+                    continue
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+        return components
+
+    def _build_closure(self):
+        components = self._strongly_connected_components()
+        self.component = [0] * len(self.nodes)
+        for c, members in enumerate(components):
+            for member in members:
+                self.component[member] = c
+
+        # Successor components always precede their predecessors here
+        self.component_reach = []
+        for c, members in enumerate(components):
+            member_bits = 0
+            for member in members:
+                member_bits |= 1 << member
+            cyclic = len(members) > 1 or any(m in self.successors[m] for m in members)
+            reach = member_bits if cyclic else 0
+            for member in members:
+                for nxt in self.successors[member]:
+                    d = self.component[nxt]
+                    if d != c:
+                        reach |= self.component_reach[d] | (1 << nxt)
+            self.component_reach.append(reach)
+
+    def _bits(self, node):
+        i = self.position.get(node)
+        if i is None:
+            return 0
+        return self.component_reach[self.component[i]]
+
+    def reachable(self, node):
+        """
+        Nodes reachable from `node` in one or more steps (like `prop+`).
+        """
+        return {self.nodes[i] for i in _iter_bits(self._bits(node))}
+
+    def is_reachable(self, source, target):
+        j = self.position.get(target)
+        return j is not None and bool(self._bits(source) >> j & 1)
+
+    def hops(self, source, target):
+        """
+        Length of the shortest path from source to target, or None.
+        """
+        if not self.is_reachable(source, target):
+            return None
+        target_bit = 1 << self.position[target]
+        frontier = 1 << self.position[source]
+        visited = 0
+        distance = 0
+        while frontier:
+            distance += 1
+            following = 0
+            for i in _iter_bits(frontier):
+                following |= self.adjacency[i]
+            if following & target_bit:
+                return distance
+            visited |= frontier
+            frontier = following & ~visited
+        return None
+
+    def __len__(self):
+        return len(self.nodes)
+
+
+# Indexes used by the SPARQL functions, keyed by property IRI
+_INDEXES = {}
+
+
+def _index_for(prop):
+    index = _INDEXES.get(prop)
+    if index is None:
+        raise SPARQLError(f"No reachability index registered for {prop}")
+    return index
+
+
+def _sparql_reachable(source, target, prop):
+    return Literal(_index_for(prop).is_reachable(source, target))
+
+
+def _sparql_hops(source, target, prop):
+    distance = _index_for(prop).hops(source, target)
+    if distance is None:
+        raise SPARQLError(f"{target} is not reachable from {source}")
+    return Literal(distance, datatype=XSD.integer)
+
+
+def register_sparql_functions(*indexes):
+    """
+    Make the given indexes available as fn:reachable / fn:hops in SPARQL.
+    """
+    for index in indexes:
+        _INDEXES[index.prop] = index
+    register_custom_function(FN.reachable, _sparql_reachable, override=True)
+    register_custom_function(FN.hops, _sparql_hops, override=True)
+
+
+def build_indexes(graph, props=(CA.borders, CA.locatedIn)):
+    """
+    Build and register an index for each property.
+
+    Returns:
+        Dictionary mapping property IRI to its ReachabilityIndex
+    """
+    indexes = {prop: ReachabilityIndex(graph, prop) for prop in props}
+    register_sparql_functions(*indexes.values())
+    return indexes
+
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else "project.owl"
+    g = Graph()
+    g.parse(source, format="xml")
+
+    start = time.perf_counter()
+    indexes = build_indexes(g)
+    print(f"Built indexes in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    borders = indexes[CA.borders]
+    start = time.perf_counter()
+    regions = borders.reachable(CA.BayArea)
+    elapsed = time.perf_counter() - start
+    print(f"\nRegions reachable from Bay Area ({len(regions)}, {elapsed * 1e6:.1f} µs):")
+    for region in sorted(regions):
+        print(f"  {region.split('#')[-1]} ({borders.hops(CA.BayArea, region)} hops)")
+
+    qres = g.query("""
+        PREFIX ca: <http://www.semanticweb.org/california-ontology#>
+        PREFIX fn: <http://www.semanticweb.org/california-ontology/functions#>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+        SELECT ?regionName ?hops
+        WHERE {
+          ?region rdfs:label ?regionName .
+          FILTER(fn:reachable(ca:BayArea, ?region, ca:borders))
+          BIND(fn:hops(ca:BayArea, ?region, ca:borders) AS ?hops)
+        }
+        ORDER BY ?hops ?regionName
+    """)
+    print("\nSame question through the SPARQL functions:")
+    for row in qres:
+        print(f"  {row.regionName} | {row.hops}")
+
+
+if __name__ == "__main__":
+    main()
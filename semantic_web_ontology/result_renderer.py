@@ -0,0 +1,185 @@
+"""
+Streaming renderer for SPARQL SELECT results.
+
+Rows are pulled from the query evaluator one at a time and written out in
+pages, so a result set is never held in memory as a whole (rdflib's `Result`
+object caches every row it yields). IRIs are compacted with the graph's
+namespace manager (`ca:BayArea`) instead of splitting strings on '#'.
+
+Supported formats: a plain-text table, CSV, JSON lines and the W3C SPARQL 1.1
+Query Results JSON format.
+"""
+
+import csv
+import io
+import json
+import sys
+import time
+
+from rdflib import BNode, Literal, URIRef
+from rdflib.plugins.sparql.evaluate import evalQuery
+from rdflib.plugins.sparql.parser import parseQuery
+from rdflib.plugins.sparql.algebra import translateQuery
+
+FORMATS = {
+    'table': '.txt',
+    'csv': '.csv',
+    'jsonl': '.jsonl',
+    'sparql-json': '.srj',
+}
+
+
+def stream_select(graph, query_string):
+    """
+    Evaluate a SELECT query without materializing its results.
+
+    Returns:
+        (variables, iterator of binding dicts)
+    """
+    query = translateQuery(parseQuery(query_string), initNs=dict(graph.namespaces()))
+    return evaluate_select(graph, query)
+
+
+def evaluate_select(graph, query):
+    """
+    Lazily evaluate an already translated SELECT query.
+
+    Returns:
+        (variables, iterator of binding dicts)
+    """
+    res = evalQuery(graph, query)
+    if res.get('type_') != 'SELECT':
+        raise ValueError("Only SELECT queries can be streamed")
+    # Every solution is a row, including one in which no variable is bound
+    return list(res['vars_']), iter(res['bindings'])
+
+
+class TermFormatter:
+    """
+    Turns RDF terms into display strings, memoizing IRI compaction.
+    """
+
+    def __init__(self, namespace_manager):
+        self.namespace_manager = namespace_manager
+        self._compacted = {}
+
+    def __call__(self, term):
+        if term is None:
+            return ""
+        if isinstance(term, URIRef):
+            compact = self._compacted.get(term)
+            if compact is None:
+                compact = term.n3(self.namespace_manager)
+                if compact.startswith('<'):
+                    compact = str(term)
+                self._compacted[term] = compact
+            return compact
+        if isinstance(term, Literal):
+            value = term.value
+            return str(value) if value is not None else str(term)
+        return str(term)
+
+
+def sparql_json_term(term):
+    """
+    Encode a term as a SPARQL 1.1 Query Results JSON object.
+    """
+    if isinstance(term, URIRef):
+        return {'type': 'uri', 'value': str(term)}
+    if isinstance(term, BNode):
+        return {'type': 'bnode', 'value': str(term)}
+    encoded = {'type': 'literal', 'value': str(term)}
+    if term.language:
+        encoded['xml:lang'] = term.language
+    elif term.datatype:
+        encoded['datatype'] = str(term.datatype)
+    return encoded
+
+
+class ResultRenderer:
+    """
+    Writes a stream of bindings to a text stream, one page at a time.
+    """
+
+    def __init__(self, namespace_manager, fmt='table', out=None, page_size=100):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format {fmt!r}, expected one of {sorted(FORMATS)}")
+        self.fmt = fmt
+        self.out = out or sys.stdout
+        self.page_size = page_size
+        self.format_term = TermFormatter(namespace_manager)
+
+    def _encode_row(self, variables, binding):
+        if self.fmt == 'sparql-json':
+            return json.dumps(
+                {str(v): sparql_json_term(binding[v]) for v in variables if binding.get(v) is not None},
+                ensure_ascii=False,
+            )
+        cells = [self.format_term(binding.get(v)) for v in variables]
+        if self.fmt == 'table':
+            return " | ".join(cells)
+        if self.fmt == 'jsonl':
+            return json.dumps(dict(zip(map(str, variables), cells)), ensure_ascii=False)
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(cells)
+        return buffer.getvalue().rstrip("\r\n")
+
+    def _write_header(self, variables):
+        names = [str(v) for v in variables]
+        if self.fmt == 'table':
+            header = " | ".join(names)
+            self.out.write(header + "\n" + "-" * len(header) + "\n")
+        elif self.fmt == 'csv':
+            self.out.write(",".join(names) + "\n")
+        elif self.fmt == 'sparql-json':
+            self.out.write(json.dumps({'head': {'vars': names}})[:-1] + ', "results": {"bindings": [\n')
+
+    def _write_page(self, lines, first_page):
+        if not lines:
+            return
+        separator = ",\n" if self.fmt == 'sparql-json' else "\n"
+        prefix = "" if first_page or self.fmt != 'sparql-json' else separator
+        self.out.write(prefix + separator.join(lines) + ("\n" if self.fmt != 'sparql-json' else ""))
+        self.out.flush()
+
+    def render(self, variables, bindings, started=None):
+        """
+        Consume the bindings once and write them out.
+
+        Args:
+            started: perf_counter() value the timings are measured from; pass the
+                     time before stream_select so parsing counts towards them
+
+        Returns:
+            Dictionary with 'rows', 'seconds', 'first_row_seconds' and 'rows_per_second'
+        """
+        start = time.perf_counter() if started is None else started
+        first_row = None
+        rows = 0
+        page = []
+        first_page = True
+
+        self._write_header(variables)
+        for binding in bindings:
+            if first_row is None:
+                first_row = time.perf_counter() - start
+            page.append(self._encode_row(variables, binding))
+            rows += 1
+            if len(page) >= self.page_size:
+                self._write_page(page, first_page)
+                first_page = False
+                page = []
+        self._write_page(page, first_page)
+
+        if self.fmt == 'sparql-json':
+            self.out.write("\n]}}\n")
+        elif self.fmt == 'table' and rows == 0:
+            self.out.write("No results found.\n")
+
+        elapsed = time.perf_counter() - start
+        return {
+            'rows': rows,
+            'seconds': elapsed,
+            'first_row_seconds': first_row,
+            'rows_per_second': rows / elapsed if elapsed > 0 else 0.0,
+        }
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Named-graph sharding of the California ontology with parallel query fan-out.
+
+`partition(graph)` splits the instance data into one named graph per region
+class (NorthernRegion, CentralRegion, SouthernRegion), or per region with
+`per_region=True`:
+
+  - a region belongs to the shard of its class, a city to the shard of the
+    region it is located in, a geometry to the shard of its feature, and each
+    triple goes to the shard that owns its subject;
+  - everything else (the TBox, the ontology header) is replicated into every
+    shard;
+  - when an owned triple points at a node owned by another shard, that node's
+    type and literal properties are copied in as a "halo", so joins such as
+    Query 5's `?region1 ca:borders ?region2 . ?region2 rdfs:label ?name`
+    resolve locally.
+
+Next to every `<name>.nt` file, `write_shards` writes `<name>.owned`, the
+nodes that shard owns.
+
+`ShardExecutor` runs one single-process pool per shard; each process loads its
+shard once in the pool initializer. A query is sent to every shard with its
+LIMIT raised to OFFSET + LIMIT and no OFFSET. Unless the query is DISTINCT,
+each shard keeps only the solutions whose anchor (the node in subject
+position of the most triple patterns) it owns; solutions anchored at a
+replicated or unbound node come from the first shard only. Halo and
+replicated triples therefore never produce a solution twice, and the partial
+results are simply concatenated before DISTINCT, ORDER BY and OFFSET/LIMIT
+are applied again.
+
+Limitations: a solution must be computable within one shard plus its halo.
+Transitive property paths over instance data (e.g. Query 4's `ca:borders+`)
+can leave their home shard and will be incomplete, and a warning is issued for
+them. Aggregates cannot be merged and are refused, as is ORDER BY on anything
+but a projected variable.
+
+Usage:
+    python sharding.py [project.owl] [--shard-dir shards] [--per-region] [--generate N]
+"""
+
+import argparse
+import os
+import time
+import warnings
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from rdflib import Dataset, Graph, Literal, Namespace, RDF, RDFS, URIRef, Variable
+from rdflib.paths import MulPath
+from rdflib.plugins.sparql import CUSTOM_EVALS
+from rdflib.plugins.sparql.algebra import translateQuery
+from rdflib.plugins.sparql.evaluate import evalPart, evalQuery
+from rdflib.plugins.sparql.evalutils import _val
+from rdflib.plugins.sparql.parser import parseQuery
+from rdflib.plugins.sparql.parserutils import CompValue
+
+CA = Namespace("http://www.semanticweb.org/california-ontology#")
+GEO = Namespace("http://www.opengis.net/ont/geosparql#")
+
+SHARD_CLASSES = (CA.NorthernRegion, CA.CentralRegion, CA.SouthernRegion)
+SHARD_PREFIX = "urn:x-california:shard:"
+
+# Named graph of (node, OWNED_BY, shard graph IRI) produced by partition()
+OWNERS_GRAPH = URIRef("urn:x-california:shard-owners")
+OWNED_BY = URIRef("urn:x-california:ownedBy")
+
+# Predicates whose subjects inherit the shard of their object
+OWNER_LINKS = (CA.locatedIn,)
+
+
+def shard_name(cls):
+    return str(cls).split('#')[-1]
+
+
+# ============== PARTITIONING ==============
+
+def assign_owners(graph, shard_classes=SHARD_CLASSES, per_region=False):
+    """
+    Map every instance node that belongs to a shard to that shard's name.
+
+    Shards are the region classes, or with per_region=True the individual
+    regions (smaller, better balanced shards).
+    """
+    owner = {}
+    for cls in shard_classes:
+        for node in graph.subjects(RDF.type, cls):
+            owner[node] = shard_name(node if per_region else cls)
+    for link in OWNER_LINKS:
+        for node, parent in graph.subject_objects(link):
+            if parent in owner:
+                owner[node] = owner[parent]
+    for feature, geometry in graph.subject_objects(GEO.hasGeometry):
+        if feature in owner:
+            owner[geometry] = owner[feature]
+    return owner
+
+
+def partition(graph, shard_classes=SHARD_CLASSES, per_region=False):
+    """
+    Split a graph into self-contained shards.
+
+    Returns:
+        Dataset with one named graph per shard (SHARD_PREFIX + class or region
+        name), plus OWNERS_GRAPH recording which shard owns which node
+    """
+    owner = assign_owners(graph, shard_classes, per_region)
+    names = sorted(set(owner.values()))
+
+    shared, owned = [], defaultdict(list)
+    for triple in graph:
+        shard = owner.get(triple[0])
+        if shard is None:
+            shared.append(triple)
+        else:
+            owned[shard].append(triple)
+
+    ds = Dataset()
+    for prefix, namespace in graph.namespaces():
+        ds.bind(prefix, namespace)
+    owners = ds.graph(OWNERS_GRAPH)
+    for node, name in owner.items():
+        owners.add((node, OWNED_BY, URIRef(SHARD_PREFIX + name)))
+    for name in names:
+        shard = ds.graph(URIRef(SHARD_PREFIX + name))
+        for triple in shared:
+            shard.add(triple)
+        halo = set()
+        for triple in owned[name]:
+            shard.add(triple)
+            target = triple[2]
+            if owner.get(target, name) != name:
+                halo.add(target)
+        for node in halo:
+            for p, o in graph.predicate_objects(node):
+                if p == RDF.type or isinstance(o, Literal):
+                    shard.add((node, p, o))
+    return ds
+
+
+def write_shards(dataset, directory):
+    """
+    Write each named graph of a sharded dataset to <directory>/<name>.nt, and
+    the nodes it owns to <directory>/<name>.owned (one N-Triples term per line).
+
+    Returns:
+        List of written .nt paths
+    """
+    os.makedirs(directory, exist_ok=True)
+    owned = defaultdict(list)
+    for node, shard in dataset.graph(OWNERS_GRAPH).subject_objects(OWNED_BY):
+        owned[str(shard)].append(node.n3())
+
+    paths = []
+    for shard in dataset.graphs():
+        name = str(shard.identifier)
+        if not name.startswith(SHARD_PREFIX):
+            continue
+        base = os.path.join(directory, name[len(SHARD_PREFIX):])
+        shard.serialize(destination=base + ".nt", format="nt", encoding="utf-8")
+        with open(base + ".owned", "w", encoding="utf-8") as f:
+            f.writelines(term + "\n" for term in sorted(owned[name]))
+        paths.append(base + ".nt")
+    return sorted(paths)
+
+
+def read_owned(path):
+    """
+    The nodes listed in a .owned file.
+    """
+    with open(path, encoding="utf-8") as f:
+        return {URIRef(line.strip()[1:-1]) for line in f if line.strip()}
+
+
+def load_shards(directory):
+    """
+    Assemble the shard files of a directory back into a Dataset.
+    """
+    ds = Dataset()
+    owners = ds.graph(OWNERS_GRAPH)
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(".nt"):
+            name = filename[:-len(".nt")]
+            shard = URIRef(SHARD_PREFIX + name)
+            ds.graph(shard).parse(os.path.join(directory, filename), format="nt")
+            owned_path = os.path.join(directory, name + ".owned")
+            if os.path.exists(owned_path):
+                for node in read_owned(owned_path):
+                    owners.add((node, OWNED_BY, shard))
+    return ds
+
+
+# ============== QUERY PLANNING ==============
+
+def _walk(node):
+    yield node
+    if isinstance(node, CompValue):
+        for value in node.values():
+            yield from _walk(value)
+    elif isinstance(node, (list, tuple)):
+        for value in node:
+            yield from _walk(value)
+
+
+def anchor_term(algebra):
+    """
+    The subject of the most triple patterns of a query (property paths, which
+    walk the shared schema, are not counted), a Variable or a node.
+    """
+    counts = Counter()
+    for node in _walk(algebra):
+        if isinstance(node, CompValue) and node.name == "BGP":
+            counts.update(s for s, p, o in node.triples if isinstance(p, URIRef))
+    return counts.most_common(1)[0][0] if counts else None
+
+
+class QueryPlan:
+    """
+    The parts of a SELECT query that the coordinator re-applies after merging.
+    """
+
+    def __init__(self, query_string):
+        query = translateQuery(parseQuery(query_string))
+        if query.algebra.name != "SelectQuery":
+            raise ValueError("Only SELECT queries can be sharded")
+
+        self.variables = list(query.algebra.PV)
+        self.distinct = False
+        self.order = []        # (variable, descending)
+        self.start = 0
+        self.length = None
+        self.transitive_paths = []
+
+        for node in _walk(query.algebra):
+            if not isinstance(node, CompValue):
+                if isinstance(node, MulPath) and node.mod in ('+', '*') and node.path != RDFS.subClassOf:
+                    self.transitive_paths.append(node)
+                continue
+            if node.name in ("Group", "AggregateJoin"):
+                raise ValueError("Aggregate queries cannot be merged across shards")
+            if node.name in ("Distinct", "Reduced"):
+                self.distinct = True
+            elif node.name == "Slice":
+                self.start = node.start or 0
+                self.length = node.length
+            elif node.name == "OrderBy":
+                for condition in node.expr:
+                    expr = condition.expr
+                    if not isinstance(expr, Variable) or expr not in self.variables:
+                        raise ValueError("ORDER BY must use projected variables in sharded queries")
+                    self.order.append((expr, condition.order == "DESC"))
+
+    def merge(self, shard_rows):
+        """
+        Merge per-shard row lists into the final result rows.
+
+        Every solution comes from exactly one shard, so the rows are added
+        together; only DISTINCT removes duplicates.
+        """
+        merged = [row for rows in shard_rows for row in rows]
+        if self.distinct:
+            merged = list(dict.fromkeys(merged))
+
+        index = {var: i for i, var in enumerate(self.variables)}
+        for var, descending in reversed(self.order):
+            # Unbound values sort first, as in SPARQL
+            merged.sort(key=lambda row: (row[index[var]] is not None,
+                                         _val(row[index[var]]) if row[index[var]] is not None else ()),
+                        reverse=descending)
+
+        end = None if self.length is None else self.start + self.length
+        return merged[self.start:end]
+
+
+# ============== WORKERS ==============
+
+_SHARD = None
+_OWNED = set()
+_FOREIGN = set()
+_PRIMARY = False
+
+
+def _load_shard(path, owned_paths):
+    """
+    Load a shard and the ownership lists (this shard's first in owned_paths).
+    """
+    global _SHARD, _OWNED, _FOREIGN, _PRIMARY
+    _SHARD = Graph()
+    _SHARD.parse(path, format="nt")
+    _OWNED = read_owned(owned_paths[0])
+    _FOREIGN = set().union(*(read_owned(p) for p in owned_paths[1:]))
+    # The first shard also answers for replicated and unbound anchors
+    _PRIMARY = path == min([path] + [p[:-len(".owned")] + ".nt" for p in owned_paths[1:]])
+    CUSTOM_EVALS['shard_owned'] = _eval_owned
+
+
+def _owns(node):
+    if node in _OWNED:
+        return True
+    return _PRIMARY and node not in _FOREIGN
+
+
+def _eval_owned(ctx, part):
+    if part.name != "ShardOwned":
+        raise NotImplementedError
+    anchor = part.anchor
+    if not isinstance(anchor, Variable):
+        return evalPart(ctx, part.p) if _owns(anchor) else iter(())
+    return (solution for solution in evalPart(ctx, part.p) if _owns(solution.get(anchor)))
+
+
+def _run_on_shard(query_string):
+    """
+    Evaluate a query on this process's shard with OFFSET folded into LIMIT,
+    keeping only the solutions whose anchor this shard owns (all solutions
+    for DISTINCT queries).
+
+    Returns:
+        List of row tuples, in the order of the projected variables
+    """
+    query = translateQuery(parseQuery(query_string))
+    anchor = anchor_term(query.algebra)
+    if any(isinstance(node, CompValue) and node.name in ("Distinct", "Reduced")
+           for node in _walk(query.algebra)):
+        # Every shard solution is a real solution; the merge removes duplicates
+        anchor = None
+    for node in _walk(query.algebra):
+        if isinstance(node, CompValue) and node.name == "Slice":
+            if node.length is not None:
+                node.length = (node.start or 0) + node.length
+            node.start = 0
+        if isinstance(node, CompValue) and node.name == "Project" and anchor is not None:
+            node.p = CompValue("ShardOwned", p=node.p, anchor=anchor)
+    res = evalQuery(_SHARD, query)
+    variables = list(res['vars_'])
+    return [tuple(b.get(v) for v in variables) for b in res['bindings']]
+
+
+class ShardExecutor:
+    """
+    Fan SELECT queries out over shard files, one worker process per shard.
+    """
+
+    def __init__(self, directory):
+        self.paths = sorted(os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(".nt"))
+        if not self.paths:
+            raise ValueError(f"No shard files in {directory}")
+        owned = [path[:-len(".nt")] + ".owned" for path in self.paths]
+        self.pools = [ProcessPoolExecutor(max_workers=1, initializer=_load_shard,
+                                          initargs=(path, [owned[i]] + owned[:i] + owned[i + 1:]))
+                      for i, path in enumerate(self.paths)]
+
+    def query(self, query_string):
+        """
+        Returns:
+            (variables, rows)
+        """
+        plan = QueryPlan(query_string)
+        if plan.transitive_paths:
+            warnings.warn("Query uses a transitive property path over instance data; "
+                          "results may be incomplete across shards", stacklevel=2)
+        futures = [pool.submit(_run_on_shard, query_string) for pool in self.pools]
+        return plan.variables, plan.merge(f.result() for f in futures)
+
+    def close(self):
+        for pool in self.pools:
+            pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    from test_queries import queries
+
+    parser = argparse.ArgumentParser(description="Shard the ontology and fan queries out over the shards")
+    parser.add_argument("ontology", nargs="?", default="project.owl")
+    parser.add_argument("--shard-dir", default="shards", help="directory for the shard files")
+    parser.add_argument("--per-region", action="store_true", help="one shard per region instead of per region class")
+    parser.add_argument("--generate", type=int, default=0, metavar="N", help="add N synthetic cities")
+    args = parser.parse_args()
+
+    g = Graph()
+    g.parse(args.ontology, format="xml")
+    if args.generate:
+        from numeric_index import add_generated_cities
+        add_generated_cities(g, args.generate)
+
+    start = time.perf_counter()
+    paths = write_shards(partition(g, per_region=args.per_region), args.shard_dir)
+    print(f"Wrote {len(paths)} shards in {time.perf_counter() - start:.2f}s:")
+    for path in paths:
+        print(f"  {path} ({os.path.getsize(path)} bytes)")
+
+    with ShardExecutor(args.shard_dir) as executor:
+        executor.query(queries[1]['query'])  # wait for every shard to load
+        print(f"\n{'Query':40s} {'single':>10s} {'sharded':>10s}  rows  match")
+        for q in queries:
+            start = time.perf_counter()
+            expected = [tuple(row) for row in g.query(q['query'])]
+            single = time.perf_counter() - start
+
+            start = time.perf_counter()
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter("always")
+                _, rows = executor.query(q['query'])
+            sharded = time.perf_counter() - start
+
+            plan = QueryPlan(q['query'])
+            if plan.order:
+                match = rows == expected
+            else:
+                match = Counter(rows) == Counter(expected)
+            note = " (incomplete: transitive path)" if caught else ""
+            print(f"{q['name'][:40]:40s} {single * 1000:8.1f}ms {sharded * 1000:8.1f}ms "
+                  f"{len(rows):5d}  {'yes' if match else 'no'}{note}")
+
+
+if __name__ == "__main__":
+    main()
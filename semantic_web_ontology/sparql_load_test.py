@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Load-test client for sparql_server.py.
+
+Opens a number of keep-alive connections and sends the queries from
+test_queries.py round-robin until the request budget is used up, then prints
+throughput, latency percentiles and the server's cache metrics.
+
+Usage:
+    python sparql_load_test.py [--url http://127.0.0.1:3030] [--concurrency 16]
+                               [--requests 1000] [--update-every 0]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+from test_queries import queries
+
+
+async def send(reader, writer, method, path, host, body=b'', content_type=None):
+    """
+    Send one HTTP/1.1 request on an open connection and read the response.
+
+    Returns:
+        (status code, response body)
+    """
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {host}", f"Content-Length: {len(body)}"]
+    if content_type:
+        lines.append(f"Content-Type: {content_type}")
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value.strip())
+    return status, await reader.readexactly(length)
+
+
+async def worker(worker_id, args, counter, latencies, errors):
+    url = urlsplit(args.url)
+    reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+    try:
+        while True:
+            n = counter[0]
+            if n >= args.requests:
+                break
+            counter[0] += 1
+
+            start = time.perf_counter()
+            if args.update_every and n and n % args.update_every == 0:
+                update = (
+                    "PREFIX ca: <http://www.semanticweb.org/california-ontology#>\n"
+                    f"INSERT DATA {{ ca:LoadTestMarker ca:hasPopulation {n} }}"
+                )
+                status, _ = await send(reader, writer, 'POST', '/update', url.netloc,
+                                       update.encode('utf-8'), 'application/sparql-update')
+            else:
+                query = queries[n % len(queries)]['query']
+                status, _ = await send(reader, writer, 'POST', '/sparql', url.netloc,
+                                       query.encode('utf-8'), 'application/sparql-query')
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status >= 400:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+async def run(args):
+    counter, latencies, errors = [0], [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i, args, counter, latencies, errors) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    print("=" * 60)
+    print("SPARQL LOAD TEST")
+    print("=" * 60)
+    print(f"Requests:     {len(latencies)} ({len(errors)} errors)")
+    print(f"Concurrency:  {args.concurrency}")
+    print(f"Duration:     {elapsed:.2f}s")
+    print(f"Throughput:   {len(latencies) / elapsed:.0f} req/s")
+    print(f"Latency p50:  {percentile(latencies, 50):.2f} ms")
+    print(f"Latency p95:  {percentile(latencies, 95):.2f} ms")
+    print(f"Latency p99:  {percentile(latencies, 99):.2f} ms")
+
+    url = urlsplit(args.url)
+    reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+    _, body = await send(reader, writer, 'GET', '/metrics', url.netloc)
+    writer.close()
+    metrics = json.loads(body)
+    print(f"\nServer cache hit rate: {metrics['cache_hit_rate']:.1%} "
+          f"({metrics['cache_hits']}/{metrics['total_queries']}), graph version {metrics['graph_version']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the local SPARQL endpoint")
+    parser.add_argument("--url", default="http://127.0.0.1:3030")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--update-every", type=int, default=0, metavar="N",
+                        help="send an INSERT DATA update every N requests (invalidates the cache)")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Local SPARQL 1.1 Protocol endpoint for the California ontology.
+
+The ontology is parsed once at startup and then served over HTTP by an asyncio
+server; query evaluation runs in a thread pool so slow queries do not block
+other connections. Only the standard library and rdflib are needed.
+
+Endpoints:
+  GET  /sparql?query=...                      SPARQL query
+  POST /sparql                                body: application/sparql-query
+                                              or form-encoded query=...
+  POST /update                                body: application/sparql-update
+                                              or form-encoded update=...
+  GET  /metrics                               JSON latency and cache metrics
+
+Results are cached by normalized query text plus a graph version counter.
+Every successful update bumps the version, which invalidates the cache. With
+--inferred, updates go through InferenceCache.update, so the inferred closure
+is maintained incrementally along with the asserted triples.
+
+Usage:
+    python sparql_server.py [--ontology project.owl] [--port 3030] [--inferred]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from rdflib import Graph
+from rdflib.plugins.sparql.algebra import translateQuery
+from rdflib.plugins.sparql.parser import parseQuery
+
+RESULT_TYPES = {
+    'SELECT': ('json', 'application/sparql-results+json'),
+    'ASK': ('json', 'application/sparql-results+json'),
+    'CONSTRUCT': ('turtle', 'text/turtle; charset=utf-8'),
+    'DESCRIBE': ('turtle', 'text/turtle; charset=utf-8'),
+}
+
+STATUS_TEXT = {200: 'OK', 204: 'No Content', 400: 'Bad Request', 404: 'Not Found',
+               405: 'Method Not Allowed', 413: 'Payload Too Large', 415: 'Unsupported Media Type',
+               500: 'Internal Server Error'}
+
+MAX_BODY = 1 << 20
+
+
+def normalize_query(text):
+    """
+    Canonical form of a query for cache lookups.
+
+    Comments are dropped and whitespace runs collapsed, except inside string
+    literals and IRI references.
+    """
+    out = []
+    i, n = 0, len(text)
+    pending_space = False
+    while i < n:
+        ch = text[i]
+        if ch in '"\'':
+            quote = text[i:i + 3] if text[i:i + 3] in ('"""', "'''") else ch
+            end = i + len(quote)
+            while end < n and text[end:end + len(quote)] != quote:
+                end += 2 if text[end] == '\\' else 1
+            token, i = text[i:end + len(quote)], end + len(quote)
+        elif ch == '<' and i + 1 < n and not text[i + 1].isspace():
+            end = i + 1
+            while end < n and text[end] not in '> \t\r\n':
+                end += 1
+            if end < n and text[end] == '>':
+                token, i = text[i:end + 1], end + 1
+            else:
+                token, i = ch, i + 1
+        elif ch == '#':
+            while i < n and text[i] not in '\r\n':
+                i += 1
+            pending_space = True
+            continue
+        elif ch.isspace():
+            pending_space = True
+            i += 1
+            continue
+        else:
+            token, i = ch, i + 1
+        if pending_space and out:
+            out.append(' ')
+        pending_space = False
+        out.append(token)
+    return ''.join(out)
+
+
+class ReadWriteLock:
+    """
+    Many concurrent readers or a single writer.
+    """
+
+    def __init__(self):
+        self._readers = 0
+        self._writer = False
+        self._condition = asyncio.Condition()
+
+    async def acquire_read(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: not self._writer)
+            self._readers += 1
+
+    async def release_read(self):
+        async with self._condition:
+            self._readers -= 1
+            self._condition.notify_all()
+
+    async def acquire_write(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: not self._writer and self._readers == 0)
+            self._writer = True
+
+    async def release_write(self):
+        async with self._condition:
+            self._writer = False
+            self._condition.notify_all()
+
+
+class QueryMetrics:
+    """
+    Per-query latency and cache statistics.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.queries = defaultdict(lambda: {
+            'text': '', 'count': 0, 'cache_hits': 0, 'errors': 0,
+            'total_ms': 0.0, 'max_ms': 0.0, 'recent_ms': deque(maxlen=self.window),
+        })
+        self.updates = 0
+        self.started = time.time()
+
+    def record(self, key, text, latency_ms, cache_hit=False, error=False):
+        entry = self.queries[key]
+        entry['text'] = text[:200]
+        entry['count'] += 1
+        entry['cache_hits'] += int(cache_hit)
+        entry['errors'] += int(error)
+        entry['total_ms'] += latency_ms
+        entry['max_ms'] = max(entry['max_ms'], latency_ms)
+        entry['recent_ms'].append(latency_ms)
+
+    @staticmethod
+    def _percentile(values, pct):
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+    def snapshot(self, cache):
+        total = sum(e['count'] for e in self.queries.values())
+        hits = sum(e['cache_hits'] for e in self.queries.values())
+        return {
+            'uptime_seconds': round(time.time() - self.started, 1),
+            'graph_version': cache.version,
+            'cached_entries': len(cache),
+            'total_queries': total,
+            'cache_hits': hits,
+            'cache_hit_rate': hits / total if total else 0.0,
+            'updates': self.updates,
+            'queries': {
+                key: {
+                    'text': e['text'],
+                    'count': e['count'],
+                    'cache_hits': e['cache_hits'],
+                    'errors': e['errors'],
+                    'mean_ms': e['total_ms'] / e['count'],
+                    'p50_ms': self._percentile(e['recent_ms'], 50),
+                    'p95_ms': self._percentile(e['recent_ms'], 95),
+                    'max_ms': e['max_ms'],
+                }
+                for key, e in self.queries.items()
+            },
+        }
+
+
+class ResultCache:
+    """
+    LRU cache of serialized results, keyed by (normalized query, graph version).
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.version = 0
+        self._entries = OrderedDict()
+
+    def get(self, query):
+        key = (query, self.version)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, query, version, entry):
+        if version != self.version:
+            return  # the graph changed while the query was running
+        self._entries[(query, version)] = entry
+        self._entries.move_to_end((query, version))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self):
+        self.version += 1
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SparqlServer:
+    """
+    Serves one in-memory graph over the SPARQL 1.1 Protocol.
+    """
+
+    def __init__(self, graph, workers=4, cache_size=1024, updater=None):
+        self.graph = graph
+        # Applies SPARQL UPDATE requests; defaults to graph.update
+        self.updater = updater or graph.update
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.lock = ReadWriteLock()
+        self.cache = ResultCache(cache_size)
+        self.metrics = QueryMetrics()
+        # rdflib's pyparsing-based parser is not thread-safe; parsed queries
+        # are kept independently of the graph version
+        self._parse_lock = threading.Lock()
+        self._prepared = OrderedDict()
+
+    def _prepare(self, normalized, query):
+        with self._parse_lock:
+            prepared = self._prepared.get(normalized)
+            if prepared is None:
+                prepared = translateQuery(parseQuery(query), initNs=dict(self.graph.namespaces()))
+                self._prepared[normalized] = prepared
+                if len(self._prepared) > self.cache.max_entries:
+                    self._prepared.popitem(last=False)
+            return prepared
+
+    def _run_query(self, normalized, query):
+        result = self.graph.query(self._prepare(normalized, query))
+        fmt, content_type = RESULT_TYPES[result.type]
+        return result.serialize(format=fmt), content_type
+
+    def _run_update(self, update):
+        with self._parse_lock:
+            self.updater(update)
+
+    async def handle_query(self, query):
+        normalized = normalize_query(query)
+        key = hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:12]
+        start = time.perf_counter()
+
+        cached = self.cache.get(normalized)
+        if cached is not None:
+            self.metrics.record(key, normalized, (time.perf_counter() - start) * 1000, cache_hit=True)
+            return 200, cached[1], cached[0]
+
+        await self.lock.acquire_read()
+        version = self.cache.version
+        try:
+            loop = asyncio.get_running_loop()
+            body, content_type = await loop.run_in_executor(self.executor, self._run_query, normalized, query)
+        except Exception as e:
+            self.metrics.record(key, normalized, (time.perf_counter() - start) * 1000, error=True)
+            return 400, 'text/plain; charset=utf-8', f"Query failed: {e}".encode('utf-8')
+        finally:
+            await self.lock.release_read()
+
+        self.cache.put(normalized, version, (body, content_type))
+        self.metrics.record(key, normalized, (time.perf_counter() - start) * 1000)
+        return 200, content_type, body
+
+    async def handle_update(self, update):
+        await self.lock.acquire_write()
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self.executor, self._run_update, update)
+            self.cache.invalidate()
+            self.metrics.updates += 1
+        except Exception as e:
+            return 400, 'text/plain; charset=utf-8', f"Update failed: {e}".encode('utf-8')
+        finally:
+            await self.lock.release_write()
+        return 204, None, b''
+
+    async def dispatch(self, method, target, headers, body):
+        url = urlsplit(target)
+        params = parse_qs(url.query)
+        content_type = headers.get('content-type', '').split(';')[0].strip()
+
+        if url.path == '/metrics' and method == 'GET':
+            payload = json.dumps(self.metrics.snapshot(self.cache), indent=2)
+            return 200, 'application/json', payload.encode('utf-8')
+
+        if url.path == '/sparql':
+            if method == 'GET':
+                query = params.get('query', [None])[0]
+            elif method == 'POST' and content_type == 'application/sparql-query':
+                query = body.decode('utf-8')
+            elif method == 'POST' and content_type == 'application/x-www-form-urlencoded':
+                query = parse_qs(body.decode('utf-8')).get('query', [None])[0]
+            elif method == 'POST':
+                return 415, 'text/plain', b'Unsupported content type'
+            else:
+                return 405, 'text/plain', b'Use GET or POST'
+            if not query:
+                return 400, 'text/plain', b'Missing query'
+            return await self.handle_query(query)
+
+        if url.path == '/update':
+            if method != 'POST':
+                return 405, 'text/plain', b'Use POST'
+            if content_type == 'application/sparql-update':
+                update = body.decode('utf-8')
+            elif content_type == 'application/x-www-form-urlencoded':
+                update = parse_qs(body.decode('utf-8')).get('update', [None])[0]
+            else:
+                return 415, 'text/plain', b'Unsupported content type'
+            if not update:
+                return 400, 'text/plain', b'Missing update'
+            return await self.handle_update(update)
+
+        return 404, 'text/plain', b'Not found'
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                length = headers.get('content-length', '0') or '0'
+                if not (length.isascii() and length.isdigit()):
+                    # The body cannot be delimited, so the connection cannot be reused
+                    status, content_type, body = 400, 'text/plain', b'Invalid Content-Length'
+                    keep_alive = False
+                elif int(length) > MAX_BODY:
+                    # The unread body would be parsed as the next request
+                    status, content_type, body = 413, 'text/plain', b'Request body too large'
+                    keep_alive = False
+                else:
+                    length = int(length)
+                    body = await reader.readexactly(length) if length else b''
+                    status, content_type, body = await self.dispatch(method, target, headers, body)
+
+                response = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+                            f"Content-Length: {len(body)}",
+                            f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                if content_type:
+                    response.append(f"Content-Type: {content_type}")
+                writer.write(("\r\n".join(response) + "\r\n\r\n").encode('latin-1') + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"SPARQL endpoint: http://{host}:{port}/sparql")
+        print(f"Metrics:         http://{host}:{port}/metrics")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the California ontology over the SPARQL 1.1 Protocol")
+    parser.add_argument("--ontology", default="project.owl", help="RDF/XML ontology file to load")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3030)
+    parser.add_argument("--workers", type=int, default=4, help="query evaluation threads")
+    parser.add_argument("--cache-size", type=int, default=1024, help="maximum cached results")
+    parser.add_argument("--inferred", action="store_true", help="serve the materialized RDFS/OWL-RL closure")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    graph = Graph()
+    graph.parse(args.ontology, format="xml")
+    updater = None
+    if args.inferred:
+        # Updates must go through the cache so the closure stays current
+        from inference import InferenceCache
+        cache = InferenceCache(graph)
+        graph, updater = cache.dataset, cache.update
+    print(f"Loaded {len(graph)} triples in {time.perf_counter() - start:.2f}s")
+
+    server = SparqlServer(graph, workers=args.workers, cache_size=args.cache_size, updater=updater)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nShutting down")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+Grid spatial index over the GeoSPARQL geometries of the California ontology.
+
+create_ontology.py attaches a `geo:hasGeometry` to every city (a WKT POINT)
+and region (a WKT POLYGON). `SpatialIndex(graph)` reads them once and buckets
+points into a uniform lon/lat grid, and polygons into every grid cell their
+bounding box overlaps. Queries only look at the cells that can contain an
+answer:
+
+  - `within(place, km)`: points within a great-circle radius;
+  - `nearest(place, k)`: k nearest points, searching rings of cells outward
+    until no unvisited cell can hold anything closer;
+  - `regions_containing(place)`: polygons containing a point (ray casting
+    after a bounding-box check).
+
+`shared_edge_pairs()` derives `borders` from polygons that share an edge, and
+the index is also exposed to SPARQL:
+
+    PREFIX fn: <http://www.semanticweb.org/california-ontology/functions#>
+    SELECT ?city WHERE {
+      ?city rdf:type/rdfs:subClassOf* ca:City .
+      FILTER(fn:withinDistance(ca:SanFrancisco, ?city, 50))
+    }
+
+`fn:withinDistance` asks `within()` once per anchor and radius and caches the
+result set, so the FILTER only visits the grid cells around the anchor and is
+then a set lookup per row; like `within()`, it excludes the anchor itself.
+`fn:distance(?a, ?b)` returns kilometres, `fn:within(?city, ?region)` tests
+point-in-region.
+
+Usage:
+    python spatial_index.py [project.owl] [--generate N] [--cell-size DEGREES]
+"""
+
+import argparse
+import heapq
+import math
+import random
+import re
+import time
+from collections import defaultdict
+from functools import lru_cache
+
+from rdflib import Graph, Literal, Namespace, RDF
+from rdflib.namespace import XSD
+from rdflib.plugins.sparql.operators import register_custom_function
+from rdflib.plugins.sparql.sparql import SPARQLError
+
+CA = Namespace("http://www.semanticweb.org/california-ontology#")
+FN = Namespace("http://www.semanticweb.org/california-ontology/functions#")
+GEO = Namespace("http://www.opengis.net/ont/geosparql#")
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+
+_WKT = re.compile(r"^\s*(POINT|POLYGON)\s*\((.*)\)\s*$", re.IGNORECASE | re.DOTALL)
+
+
+# ============== GEOMETRY ==============
+
+def parse_wkt(wkt):
+    """
+    Parse a WKT POINT or POLYGON (outer ring only).
+
+    Returns:
+        ('point', (lon, lat)) or ('polygon', [(lon, lat), ...])
+    """
+    match = _WKT.match(str(wkt))
+    if not match:
+        raise ValueError(f"Unsupported WKT: {wkt}")
+    kind, body = match.group(1).lower(), match.group(2)
+    if kind == "point":
+        lon, lat = map(float, body.split())
+        return kind, (lon, lat)
+    outer = body.strip().lstrip("(").split(")")[0]
+    ring = [tuple(map(float, pair.split())) for pair in outer.split(",")]
+    return kind, ring
+
+
+def haversine_km(lon1, lat1, lon2, lat2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def point_in_polygon(lon, lat, ring):
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        xi, yi = ring[i]
+        xj, yj = ring[j]
+        if (yi > lat) != (yj > lat) and lon < (xj - xi) * (lat - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+def shared_edge_pairs(polygons):
+    """
+    Pairs of polygons that share at least one edge (touching at a single
+    vertex does not count). Vertices must match exactly, as they do when the
+    outlines are built from a shared vertex table.
+
+    Args:
+        polygons: Dictionary mapping a key to a closed ring of (lon, lat)
+
+    Returns:
+        List of (key_a, key_b) pairs in the order the keys were given
+    """
+    order = {key: i for i, key in enumerate(polygons)}
+    owners = defaultdict(set)
+    for key, ring in polygons.items():
+        for a, b in zip(ring, ring[1:]):
+            if a != b:
+                owners[frozenset((a, b))].add(key)
+
+    pairs = set()
+    for keys in owners.values():
+        keys = sorted(keys, key=order.get)
+        for i, a in enumerate(keys):
+            for b in keys[i + 1:]:
+                pairs.add((a, b))
+    return sorted(pairs, key=lambda pair: (order[pair[0]], order[pair[1]]))
+
+
+# ============== INDEX ==============
+
+class SpatialIndex:
+    """
+    Uniform grid over the point and polygon geometries of a graph.
+    """
+
+    def __init__(self, graph=None, cell_size=0.25):
+        self.cell_size = cell_size
+        self.points = {}                    # feature -> (lon, lat)
+        self.polygons = {}                  # feature -> (ring, bbox)
+        self._point_cells = defaultdict(list)
+        self._polygon_cells = defaultdict(list)
+        self._bounds = None                 # (min ix, min iy, max ix, max iy) of point cells
+        if graph is not None:
+            self.load(graph)
+
+    def _cell(self, lon, lat):
+        return math.floor(lon / self.cell_size), math.floor(lat / self.cell_size)
+
+    def load(self, graph):
+        for feature, geometry in graph.subject_objects(GEO.hasGeometry):
+            for wkt in graph.objects(geometry, GEO.asWKT):
+                kind, shape = parse_wkt(wkt)
+                if kind == "point":
+                    self.add_point(feature, *shape)
+                else:
+                    self.add_polygon(feature, shape)
+
+    def add_point(self, feature, lon, lat):
+        self.points[feature] = (lon, lat)
+        ix, iy = self._cell(lon, lat)
+        self._point_cells[(ix, iy)].append((lon, lat, feature))
+        if self._bounds is None:
+            self._bounds = (ix, iy, ix, iy)
+        else:
+            x0, y0, x1, y1 = self._bounds
+            self._bounds = (min(x0, ix), min(y0, iy), max(x1, ix), max(y1, iy))
+
+    def add_polygon(self, feature, ring):
+        lons = [lon for lon, _ in ring]
+        lats = [lat for _, lat in ring]
+        bbox = (min(lons), min(lats), max(lons), max(lats))
+        self.polygons[feature] = (ring, bbox)
+        x0, y0 = self._cell(bbox[0], bbox[1])
+        x1, y1 = self._cell(bbox[2], bbox[3])
+        for ix in range(x0, x1 + 1):
+            for iy in range(y0, y1 + 1):
+                self._polygon_cells[(ix, iy)].append(feature)
+
+    def location(self, place):
+        """
+        (lon, lat) of a point feature, or the place itself if it is a pair.
+        """
+        if isinstance(place, tuple):
+            return place
+        try:
+            return self.points[place]
+        except KeyError:
+            raise KeyError(f"No point geometry for {place}") from None
+
+    # ============== QUERIES ==============
+
+    def distance(self, a, b):
+        return haversine_km(*self.location(a), *self.location(b))
+
+    def within(self, place, km):
+        """
+        Point features within `km` kilometres of a place, nearest first.
+
+        Returns:
+            List of (feature, distance in km)
+        """
+        lon, lat = self.location(place)
+        dlat = km / KM_PER_DEGREE
+        max_lat = min(89.9, abs(lat) + dlat)
+        dlon = min(180.0, dlat / math.cos(math.radians(max_lat)))
+        x0, y0 = self._cell(lon - dlon, lat - dlat)
+        x1, y1 = self._cell(lon + dlon, lat + dlat)
+
+        found = []
+        for ix in range(x0, x1 + 1):
+            for iy in range(y0, y1 + 1):
+                for plon, plat, feature in self._point_cells.get((ix, iy), ()):
+                    d = haversine_km(lon, lat, plon, plat)
+                    if d <= km and feature != place:
+                        found.append((feature, d))
+        found.sort(key=lambda item: item[1])
+        return found
+
+    def _ring_bound_km(self, lon, lat, ix, iy, r):
+        """
+        Lower bound on the distance from (lon, lat) to any cell outside ring r.
+        """
+        size = self.cell_size
+        dlat = min(lat - (iy - r) * size, (iy + r + 1) * size - lat)
+        dlon = min(lon - (ix - r) * size, (ix + r + 1) * size - lon)
+        # distance to a parallel is along the meridian; to a meridian it is
+        # asin(cos(lat) * sin(dlon)) on the sphere
+        to_meridian = EARTH_RADIUS_KM * math.asin(
+            min(1.0, math.cos(math.radians(lat)) * math.sin(math.radians(min(dlon, 90.0)))))
+        return min(dlat * KM_PER_DEGREE, to_meridian)
+
+    def nearest(self, place, k=1):
+        """
+        The k point features nearest to a place.
+
+        Returns:
+            List of (feature, distance in km), nearest first
+        """
+        if not self._point_cells or k <= 0:
+            return []
+        lon, lat = self.location(place)
+        ix, iy = self._cell(lon, lat)
+        x0, y0, x1, y1 = self._bounds
+        max_ring = max(ix - x0, x1 - ix, iy - y0, y1 - iy)
+
+        best = []   # max-heap of (-distance, feature)
+        r = 0
+        while r <= max_ring:
+            for cx in range(ix - r, ix + r + 1):
+                for cy in range(iy - r, iy + r + 1):
+                    if r and max(abs(cx - ix), abs(cy - iy)) != r:
+                        continue
+                    for plon, plat, feature in self._point_cells.get((cx, cy), ()):
+                        if feature == place:
+                            continue
+                        d = haversine_km(lon, lat, plon, plat)
+                        if len(best) < k:
+                            heapq.heappush(best, (-d, str(feature), feature))
+                        elif d < -best[0][0]:
+                            heapq.heapreplace(best, (-d, str(feature), feature))
+            if len(best) == k and -best[0][0] <= self._ring_bound_km(lon, lat, ix, iy, r):
+                break
+            r += 1
+        return [(feature, -neg) for neg, _, feature in sorted(best, reverse=True)]
+
+    def regions_containing(self, place):
+        """
+        Polygon features that contain a place.
+        """
+        lon, lat = self.location(place)
+        found = []
+        for feature in self._polygon_cells.get(self._cell(lon, lat), ()):
+            ring, (x0, y0, x1, y1) = self.polygons[feature]
+            if x0 <= lon <= x1 and y0 <= lat <= y1 and point_in_polygon(lon, lat, ring):
+                found.append(feature)
+        return found
+
+    def contains(self, region, place):
+        ring, (x0, y0, x1, y1) = self.polygons[region]
+        lon, lat = self.location(place)
+        return x0 <= lon <= x1 and y0 <= lat <= y1 and point_in_polygon(lon, lat, ring)
+
+    def derived_borders(self):
+        """
+        Pairs of polygon features that share an edge.
+        """
+        return shared_edge_pairs({feature: ring for feature, (ring, _) in self.polygons.items()})
+
+
+# ============== SPARQL FUNCTIONS ==============
+
+_INDEX = None
+
+
+def _index():
+    if _INDEX is None:
+        raise SPARQLError("No spatial index registered")
+    return _INDEX
+
+
+def _sparql_distance(a, b):
+    try:
+        return Literal(_index().distance(a, b), datatype=XSD.double)
+    except KeyError as e:
+        raise SPARQLError(str(e))
+
+
+@lru_cache(maxsize=1024)
+def _within_set(anchor, km):
+    """
+    Features within km of an anchor, cached per (anchor, km) for the FILTER.
+    """
+    return frozenset(feature for feature, _ in _index().within(anchor, km))
+
+
+def _sparql_within_distance(a, b, km):
+    index = _index()
+    if a not in index.points or b not in index.points:
+        raise SPARQLError(f"No point geometry for {a} or {b}")
+    return Literal(b in _within_set(a, float(km)))
+
+
+def _sparql_within(place, region):
+    index = _index()
+    if region not in index.polygons or place not in index.points:
+        raise SPARQLError(f"No geometry for {place} or {region}")
+    return Literal(index.contains(region, place))
+
+
+def register_sparql_functions(index):
+    """
+    Make an index available as fn:distance / fn:withinDistance / fn:within.
+    """
+    global _INDEX
+    _INDEX = index
+    _within_set.cache_clear()
+    register_custom_function(FN.distance, _sparql_distance, override=True)
+    register_custom_function(FN.withinDistance, _sparql_within_distance, override=True)
+    register_custom_function(FN.within, _sparql_within, override=True)
+
+
+def add_generated_places(graph, count, seed=42):
+    """
+    Add synthetic point features spread over California's bounding box.
+    """
+    random.seed(seed)
+    for i in range(count):
+        place = CA[f"GeneratedPlace{i}"]
+        geometry = CA[f"GeneratedPlace{i}Geometry"]
+        lon, lat = round(random.uniform(-124.4, -114.1), 5), round(random.uniform(32.5, 42.0), 5)
+        graph.add((place, GEO.hasGeometry, geometry))
+        graph.add((geometry, RDF.type, GEO.Geometry))
+        graph.add((geometry, GEO.asWKT, Literal(f"POINT({lon} {lat})", datatype=GEO.wktLiteral)))
+
+
+def _timed(fn, *args, repeat=200):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(*args)
+    return result, (time.perf_counter() - start) / repeat * 1e6
+
+
+def _name(node):
+    return str(node).split('#')[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spatial queries over the California ontology")
+    parser.add_argument("ontology", nargs="?", default="project.owl")
+    parser.add_argument("--generate", type=int, default=0, metavar="N", help="add N synthetic places")
+    parser.add_argument("--cell-size", type=float, default=0.25, help="grid cell size in degrees")
+    args = parser.parse_args()
+
+    g = Graph()
+    g.parse(args.ontology, format="xml")
+    if args.generate:
+        add_generated_places(g, args.generate)
+
+    start = time.perf_counter()
+    index = SpatialIndex(g, cell_size=args.cell_size)
+    print(f"Indexed {len(index.points)} points and {len(index.polygons)} polygons "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    found, us = _timed(index.within, CA.SanFrancisco, 50)
+    print(f"\nWithin 50 km of San Francisco ({len(found)}, {us:.1f} µs):")
+    for feature, d in found[:10]:
+        print(f"  {_name(feature)}: {d:.1f} km")
+
+    found, us = _timed(index.nearest, CA.Fresno, 3)
+    print(f"\n3 nearest to Fresno ({us:.1f} µs):")
+    for feature, d in found:
+        print(f"  {_name(feature)}: {d:.1f} km")
+
+    print("\nRegion of each city (point-in-polygon vs. ca:locatedIn):")
+    for city, region in sorted(g.subject_objects(CA.locatedIn)):
+        if city in index.points:
+            containing, us = _timed(index.regions_containing, city)
+            located = ", ".join(_name(r) for r in containing) or "-"
+            status = "ok" if region in containing else "MISMATCH"
+            print(f"  {_name(city)}: {located} ({us:.1f} µs) {status}")
+
+    asserted = {frozenset(pair) for pair in g.subject_objects(CA.borders)}
+    derived = {frozenset(pair) for pair in index.derived_borders()}
+    print(f"\nBorders from shared polygon edges: {len(derived)} (asserted: {len(asserted)})")
+    for pair in sorted(derived - asserted, key=sorted):
+        print(f"  + {' / '.join(sorted(_name(r) for r in pair))}")
+    for pair in sorted(asserted - derived, key=sorted):
+        print(f"  - {' / '.join(sorted(_name(r) for r in pair))}")
+
+    register_sparql_functions(index)
+    qres = g.query("""
+        PREFIX ca: <http://www.semanticweb.org/california-ontology#>
+        PREFIX fn: <http://www.semanticweb.org/california-ontology/functions#>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+        SELECT ?cityName ?km
+        WHERE {
+          ?city ca:locatedIn ?region ;
+                rdfs:label ?cityName .
+          FILTER(fn:withinDistance(ca:SanFrancisco, ?city, 100))
+          BIND(fn:distance(ca:SanFrancisco, ?city) AS ?km)
+        }
+        ORDER BY ?km
+    """)
+    print("\nCities within 100 km of San Francisco (SPARQL):")
+    for row in qres:
+        print(f"  {row.cityName} | {float(row.km):.1f} km")
+
+
+if __name__ == "__main__":
+    main()
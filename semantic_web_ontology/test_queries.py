@@ -1,15 +1,18 @@
+import argparse
+import os
+import time
+
 from rdflib import Graph
 from rdflib.plugins.sparql import prepareQuery
+from rdflib.plugins.sparql.algebra import translateQuery
+from rdflib.plugins.sparql.parser import parseQuery
 
-# Load the ontology
-g = Graph()
-g.parse("project.owl", format="xml")
-
-print("=" * 60)
-print("Testing SPARQL Queries on California Ontology")
-print("=" * 60)
+from profiling import Profiler, add_profile_arguments
+from result_renderer import FORMATS, ResultRenderer, evaluate_select, stream_select
 
 # Define queries
+# "inferred_query" is the plain-triple-pattern form used with --inferred, where
+# the subclass hierarchy is already materialized by inference.InferenceCache
 queries = [
     {
         "name": "Query 1: Complex query - Cities in Central regions with population > 100k and area < 500 km²",
@@ -29,6 +32,23 @@ queries = [
               FILTER(?population > 100000 && ?area < 500)
             }
             ORDER BY DESC(?population)
+        """,
+        "inferred_query": """
+            PREFIX ca: <http://www.semanticweb.org/california-ontology#>
+            PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+            SELECT ?city ?cityName ?population ?area ?region
+            WHERE {
+              ?city rdf:type ca:City .
+              ?city rdfs:label ?cityName .
+              ?city ca:hasPopulation ?population .
+              ?city ca:hasArea ?area .
+              ?city ca:locatedIn ?region .
+              ?region rdf:type ca:CentralRegion .
+              FILTER(?population > 100000 && ?area < 500)
+            }
+            ORDER BY DESC(?population)
         """
     },
     {
@@ -61,6 +81,20 @@ queries = [
               ?city rdfs:label ?cityName .
             }
             ORDER BY ?type ?cityName
+        """,
+        "inferred_query": """
+            PREFIX ca: <http://www.semanticweb.org/california-ontology#>
+            PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+            SELECT ?city ?cityName ?type
+            WHERE {
+              ?city rdf:type ca:City .
+              ?city rdf:type ?type .
+              ?type rdfs:subClassOf ca:City .
+              ?city rdfs:label ?cityName .
+            }
+            ORDER BY ?type ?cityName
         """
     },
     {
@@ -99,48 +133,117 @@ queries = [
     }
 ]
 
-# Execute and display results for each query
-for i, q in enumerate(queries, 1):
-    print(f"\n{q['name']}")
-    print("-" * 60)
-
-    try:
-        qres = g.query(q['query'])
-
-        # Print results
-        if len(qres) == 0:
-            print("No results found.")
-        else:
-            # Get column headers from the first result
-            headers = list(qres.bindings[0].keys()) if qres.bindings else []
-
-            # Print headers
-            if headers:
-                header_str = " | ".join([str(h) for h in headers])
-                print(header_str)
-                print("-" * len(header_str))
-
-            # Print rows
-            for row in qres:
-                row_values = []
-                for var in headers:
-                    val = row[var]
-                    # Format the value
-                    if hasattr(val, 'value'):
-                        row_values.append(str(val.value))
-                    else:
-                        # Extract just the fragment from URIs
-                        val_str = str(val)
-                        if '#' in val_str:
-                            val_str = val_str.split('#')[-1]
-                        row_values.append(val_str)
-                print(" | ".join(row_values))
-
-        print(f"\nTotal results: {len(qres)}")
-
-    except Exception as e:
-        print(f"Error executing query: {e}")
-
-print("\n" + "=" * 60)
-print("Query testing complete!")
-print("=" * 60)
\ No newline at end of file
+
+def load_graph(path="project.owl", inferred=False):
+    """
+    Load the ontology, optionally with its RDFS/OWL-RL closure materialized.
+
+    With inferred=True the returned object is the union view of an
+    inference.InferenceCache, which answers SPARQL queries like a Graph.
+    """
+    g = Graph()
+    g.parse(path, format="xml")
+    if not inferred:
+        return g
+
+    from inference import InferenceCache
+    return InferenceCache(g).dataset
+
+
+def profiled_select(g, query, profiler, prefix):
+    """
+    Run a SELECT query in separately timed parse / translate / evaluate phases.
+
+    The bindings are materialized so that evaluation is not billed to rendering.
+    """
+    with profiler.phase(f"{prefix}.parse"):
+        parsed = parseQuery(query)
+    with profiler.phase(f"{prefix}.translate"):
+        algebra = translateQuery(parsed, initNs=dict(g.namespaces()))
+    with profiler.phase(f"{prefix}.evaluate") as details:
+        variables, bindings = evaluate_select(g, algebra)
+        bindings = list(bindings)
+        details['rows'] = len(bindings)
+    return variables, iter(bindings)
+
+
+def run_queries(g, queries, inferred=False, fmt='table', output_dir=None, page_size=100, profiler=None):
+    """
+    Execute each query against the graph and stream its results.
+
+    Rows are rendered as they are produced (see result_renderer), either to
+    stdout or, with output_dir, to one file per query in the chosen format.
+    With an enabled profiler, each query is timed phase by phase instead.
+    """
+    if profiler is None:
+        profiler = Profiler("test_queries")
+    # Execute and display results for each query
+    for i, q in enumerate(queries, 1):
+        query = q.get('inferred_query', q['query']) if inferred else q['query']
+        print(f"\n{q['name']}")
+        print("-" * 60)
+
+        out = None
+        try:
+            if output_dir:
+                path = os.path.join(output_dir, f"query{i}{FORMATS[fmt]}")
+                out = open(path, 'w', encoding='utf-8', newline='')
+            renderer = ResultRenderer(g.namespace_manager, fmt=fmt, out=out, page_size=page_size)
+
+            started = time.perf_counter()
+            if profiler.enabled:
+                variables, bindings = profiled_select(g, query, profiler, f"query{i}")
+                with profiler.phase(f"query{i}.render"):
+                    stats = renderer.render(variables, bindings, started)
+            else:
+                variables, bindings = stream_select(g, query)
+                stats = renderer.render(variables, bindings, started)
+
+            if output_dir:
+                print(f"Results written to: {path}")
+            print(f"\nTotal results: {stats['rows']}")
+            if stats['first_row_seconds'] is not None:
+                print(f"Time to first row (incl. parsing): {stats['first_row_seconds'] * 1000:.2f} ms, "
+                      f"{stats['rows_per_second']:.0f} rows/sec")
+
+        except Exception as e:
+            print(f"Error executing query: {e}")
+        finally:
+            if out is not None:
+                out.close()
+
+    print("\n" + "=" * 60)
+    print("Query testing complete!")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the California ontology SPARQL queries")
+    parser.add_argument("--ontology", default="project.owl", help="RDF/XML ontology file to load")
+    parser.add_argument("--inferred", action="store_true",
+                        help="materialize the RDFS/OWL-RL closure first and use plain triple patterns")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="table", help="result format")
+    parser.add_argument("--output-dir", help="write each query's results to a file in this directory")
+    parser.add_argument("--page-size", type=int, default=100, help="rows written per page")
+    add_profile_arguments(parser, "profile_test_queries.json")
+    args = parser.parse_args()
+
+    profiler = Profiler.from_args(args, "test_queries").start()
+
+    # Load the ontology
+    with profiler.phase("load_graph"):
+        g = load_graph(args.ontology, inferred=args.inferred)
+
+    print("=" * 60)
+    print("Testing SPARQL Queries on California Ontology")
+    print("=" * 60)
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    run_queries(g, queries, inferred=args.inferred, fmt=args.format,
+                output_dir=args.output_dir, page_size=args.page_size, profiler=profiler)
+    profiler.stop()
+
+
+if __name__ == "__main__":
+    main()
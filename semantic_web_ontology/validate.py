@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+SHACL-style validation of the generated California ontology.
+
+Shapes are read from shapes.ttl (a SHACL Core subset, see that file). The data
+graph is indexed in a single pass: the types of every node (closed under
+rdfs:subClassOf) and, for each constrained predicate, the values per subject
+and the subjects per value. Each constraint check is then a handful of dict
+lookups, so millions of triples validate in one pass without SPARQL.
+
+`Validator.apply_changes(added, removed)` updates the indexes and re-validates
+only the focus nodes touched by the change: the subjects of changed triples,
+plus the nodes whose sh:class constraints point at a node whose type changed.
+
+Usage:
+    python validate.py [project.owl] [--shapes shapes.ttl] [--patch file.rdfp]
+                       [--generate N]
+"""
+
+import argparse
+import random
+import time
+from collections import Counter, defaultdict
+
+from rdflib import Graph, Literal, Namespace, RDF, RDFS
+from rdflib.namespace import SH, XSD
+
+CA = Namespace("http://www.semanticweb.org/california-ontology#")
+
+RANGE_PARAMETERS = {
+    SH.minInclusive: ('minInclusive', lambda v, b: v >= b),
+    SH.minExclusive: ('minExclusive', lambda v, b: v > b),
+    SH.maxInclusive: ('maxInclusive', lambda v, b: v <= b),
+    SH.maxExclusive: ('maxExclusive', lambda v, b: v < b),
+}
+
+
+class PropertyConstraint:
+    """
+    The constraints of one sh:property node.
+    """
+
+    def __init__(self, shapes, node):
+        self.path = shapes.value(node, SH.path)
+        min_count = shapes.value(node, SH.minCount)
+        max_count = shapes.value(node, SH.maxCount)
+        self.min_count = int(min_count) if min_count is not None else None
+        self.max_count = int(max_count) if max_count is not None else None
+        self.datatype = shapes.value(node, SH.datatype)
+        self.cls = shapes.value(node, SH['class'])
+        self.ranges = []
+        for parameter, (name, test) in RANGE_PARAMETERS.items():
+            bound = shapes.value(node, parameter)
+            if bound is not None:
+                self.ranges.append((name, bound.toPython(), test))
+
+
+class NodeShape:
+    def __init__(self, shapes, node):
+        self.node = node
+        self.name = str(node).split('#')[-1]
+        self.target_class = shapes.value(node, SH.targetClass)
+        self.properties = [PropertyConstraint(shapes, p) for p in shapes.objects(node, SH.property)]
+
+
+def load_shapes(path):
+    shapes = Graph()
+    shapes.parse(path, format="turtle")
+    return [NodeShape(shapes, node) for node in shapes.subjects(RDF.type, SH.NodeShape)]
+
+
+class Validator:
+    """
+    Indexed validation state for one data graph and a set of shapes.
+    """
+
+    def __init__(self, shapes):
+        self.shapes = shapes
+        self.paths = {c.path for shape in shapes for c in shape.properties}
+        self.class_paths = {c.path for shape in shapes for c in shape.properties if c.cls is not None}
+
+        self.asserted_types = defaultdict(set)
+        self.direct_superclasses = defaultdict(set)
+        # path -> subject -> values, as an insertion-ordered set (dict keys) so
+        # a triple added twice counts once and reports stay in a stable order
+        self.values = defaultdict(lambda: defaultdict(dict))
+        self.referrers = defaultdict(lambda: defaultdict(set))  # path -> value -> subjects
+        self._superclasses = {}
+
+        # focus node -> list of violations
+        self.violations = {}
+
+    # ============== INDEXING ==============
+
+    def _index(self, triple, add=True):
+        s, p, o = triple
+        if p == RDF.type:
+            (self.asserted_types[s].add if add else self.asserted_types[s].discard)(o)
+        elif p == RDFS.subClassOf:
+            (self.direct_superclasses[s].add if add else self.direct_superclasses[s].discard)(o)
+            self._superclasses = {}
+        if p in self.paths:
+            if add:
+                self.values[p][s][o] = None
+                if p in self.class_paths:
+                    self.referrers[p][o].add(s)
+            elif o in self.values[p][s]:
+                del self.values[p][s][o]
+                if p in self.class_paths:
+                    self.referrers[p][o].discard(s)
+
+    def _superclasses_of(self, cls):
+        closure = self._superclasses.get(cls)
+        if closure is None:
+            closure, stack = {cls}, [cls]
+            while stack:
+                for sup in self.direct_superclasses.get(stack.pop(), ()):
+                    if sup not in closure:
+                        closure.add(sup)
+                        stack.append(sup)
+            self._superclasses[cls] = closure
+        return closure
+
+    def types(self, node):
+        result = set()
+        for cls in self.asserted_types.get(node, ()):
+            result |= self._superclasses_of(cls)
+        return result
+
+    # ============== VALIDATION ==============
+
+    def _check(self, focus, shape):
+        found = []
+        for c in shape.properties:
+            values = self.values[c.path].get(focus, ())
+
+            def violation(constraint, value=None, message=""):
+                found.append({
+                    'focus': focus, 'shape': shape.name, 'path': c.path,
+                    'constraint': constraint, 'value': value, 'message': message,
+                })
+
+            if c.min_count is not None and len(values) < c.min_count:
+                violation('minCount', message=f"expected at least {c.min_count} value(s), found {len(values)}")
+            if c.max_count is not None and len(values) > c.max_count:
+                violation('maxCount', message=f"expected at most {c.max_count} value(s), found {len(values)}")
+
+            for value in values:
+                if c.datatype is not None and (
+                        not isinstance(value, Literal) or value.datatype != c.datatype
+                        or getattr(value, 'ill_typed', False)):
+                    violation('datatype', value, f"expected a well-formed {c.datatype.n3()} literal")
+                if c.cls is not None and c.cls not in self.types(value):
+                    violation('class', value, f"expected an instance of {c.cls.split('#')[-1]}")
+                if c.ranges:
+                    number = value.toPython() if isinstance(value, Literal) else None
+                    for name, bound, test in c.ranges:
+                        try:
+                            ok = test(number, bound)
+                        except TypeError:
+                            ok = False
+                        if not ok:
+                            violation(name, value, f"{value} violates {name} {bound}")
+        return found
+
+    def validate_node(self, focus):
+        node_types = self.types(focus)
+        found = []
+        for shape in self.shapes:
+            if shape.target_class in node_types:
+                found.extend(self._check(focus, shape))
+        if found:
+            self.violations[focus] = found
+        else:
+            self.violations.pop(focus, None)
+        return found
+
+    def focus_nodes(self):
+        targets = {shape.target_class for shape in self.shapes}
+        return [node for node in self.asserted_types if targets & self.types(node)]
+
+    def load(self, graph):
+        """
+        Index a whole graph and validate every focus node.
+
+        Returns:
+            Statistics dictionary (triples, focus nodes, timings, throughput)
+        """
+        start = time.perf_counter()
+        triples = 0
+        for triple in graph:
+            self._index(triple)
+            triples += 1
+        indexed = time.perf_counter()
+
+        self.violations = {}
+        nodes = self.focus_nodes()
+        for focus in nodes:
+            self.validate_node(focus)
+        done = time.perf_counter()
+
+        return {
+            'triples': triples,
+            'focus_nodes': len(nodes),
+            'index_seconds': indexed - start,
+            'validate_seconds': done - indexed,
+            'triples_per_second': triples / (done - start) if done > start else 0.0,
+        }
+
+    def apply_changes(self, added=(), removed=()):
+        """
+        Update the indexes and re-validate only the affected focus nodes.
+
+        Returns:
+            Statistics dictionary (changed triples, re-validated nodes, seconds)
+        """
+        start = time.perf_counter()
+        affected = set()
+        retyped = set()
+        for triple in removed:
+            self._index(triple, add=False)
+        for triple in added:
+            self._index(triple, add=True)
+        for s, p, o in list(removed) + list(added):
+            affected.add(s)
+            if p == RDF.type:
+                retyped.add(s)
+            elif p == RDFS.subClassOf:
+                # the class hierarchy changed: every node may be affected
+                affected.update(self.asserted_types)
+
+        for node in retyped:
+            for path in self.class_paths:
+                affected.update(self.referrers[path].get(node, ()))
+
+        for focus in affected:
+            self.validate_node(focus)
+
+        return {
+            'changed_triples': len(added) + len(removed),
+            'revalidated_nodes': len(affected),
+            'seconds': time.perf_counter() - start,
+        }
+
+    def report(self):
+        return [v for found in self.violations.values() for v in found]
+
+
+def print_report(validator, stats, limit=20):
+    violations = validator.report()
+    print("=" * 60)
+    print("VALIDATION REPORT")
+    print("=" * 60)
+    print(f"Conforms: {'yes' if not violations else 'no'}")
+    print(f"Violations: {len(violations)} on {len(validator.violations)} focus node(s)")
+
+    by_kind = Counter((v['shape'], v['constraint']) for v in violations)
+    for (shape, constraint), count in by_kind.most_common():
+        print(f"  {shape} / {constraint}: {count}")
+
+    for v in violations[:limit]:
+        focus = str(v['focus']).split('#')[-1]
+        path = str(v['path']).split('#')[-1]
+        print(f"  - {focus} [{v['shape']} {path}] {v['message']}")
+    if len(violations) > limit:
+        print(f"  ... and {len(violations) - limit} more")
+
+    print(f"\nTriples indexed: {stats['triples']}, focus nodes: {stats['focus_nodes']}")
+    print(f"Index: {stats['index_seconds'] * 1000:.1f} ms, validate: {stats['validate_seconds'] * 1000:.1f} ms "
+          f"({stats['triples_per_second']:.0f} triples/sec)")
+
+
+def add_generated_cities(graph, count, seed=42):
+    """
+    Add synthetic cities (some deliberately invalid) for throughput runs.
+    """
+    random.seed(seed)
+    regions = list(graph.subjects(RDFS.label, None))
+    regions = [r for r in regions if (r, CA.borders, None) in graph or (None, CA.borders, r) in graph]
+    bands = [(CA.MajorCity, 500001, 4000000), (CA.MediumCity, 100000, 500000), (CA.SmallCity, 1000, 99999)]
+    for i in range(count):
+        city = CA[f"GeneratedCity{i}"]
+        cls, low, high = random.choice(bands)
+        if random.random() < 0.01:
+            low, high = 1000, 4000000  # population outside the class band
+        graph.add((city, RDF.type, cls))
+        graph.add((city, RDFS.label, Literal(f"Generated City {i}")))
+        graph.add((city, CA.locatedIn, random.choice(regions)))
+        graph.add((city, CA.hasPopulation, Literal(random.randint(low, high), datatype=XSD.integer)))
+        graph.add((city, CA.hasArea, Literal(round(random.uniform(5, 2000), 1), datatype=XSD.float)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate the California ontology against shapes.ttl")
+    parser.add_argument("ontology", nargs="?", default="project.owl")
+    parser.add_argument("--shapes", default="shapes.ttl")
+    parser.add_argument("--patch", help="RDF Patch to apply afterwards, re-validating only touched nodes")
+    parser.add_argument("--generate", type=int, default=0, metavar="N", help="add N synthetic cities")
+    args = parser.parse_args()
+
+    g = Graph()
+    g.parse(args.ontology, format="xml")
+    if args.generate:
+        add_generated_cities(g, args.generate)
+
+    validator = Validator(load_shapes(args.shapes))
+    stats = validator.load(g)
+    print_report(validator, stats)
+
+    if args.patch:
+        from incremental_build import read_patch
+
+        added, removed = read_patch(args.patch)
+        delta = validator.apply_changes(added=added, removed=removed)
+        print(f"\nApplied {args.patch}: {delta['changed_triples']} triple(s) changed, "
+              f"{delta['revalidated_nodes']} node(s) re-validated in {delta['seconds'] * 1000:.2f} ms")
+        print(f"Violations now: {len(validator.report())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Headless classification of the extended California ontology.
+
+Computes the inferred members of the defined classes in california_extended.owl
+(BayAreaMajorCity, NorthernOrSouthernCity, PopulatedCity, EstablishedCity,
+CoastalRegion) without Protégé. Two engines are available:
+
+  - native:  a set-at-a-time evaluator for the OWL constructs used in this
+             ontology (intersectionOf, unionOf, hasValue, someValuesFrom,
+             minCardinality) on top of subClassOf, domain/range, inverseOf
+             and SymmetricProperty. Needs only rdflib.
+  - hermit:  owlready2's bundled HermiT reasoner (requires owlready2 and Java).
+
+Results are cached in a JSON file keyed by separate hashes of the TBox and the
+ABox, so the ontology is only re-reasoned when one of them changes.
+
+Usage:
+    python classify.py [california_extended.owl] [--engine native|hermit]
+                       [--generate N] [--cache classification_cache.json]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+from rdflib import BNode, Graph, Literal, Namespace, OWL, RDF, RDFS, URIRef
+from rdflib.collection import Collection
+from rdflib.compare import to_canonical_graph
+from rdflib.namespace import XSD
+
+CA = Namespace("http://www.semanticweb.org/california-ontology#")
+
+DEFINED_CLASSES = [
+    CA.BayAreaMajorCity,
+    CA.NorthernOrSouthernCity,
+    CA.PopulatedCity,
+    CA.EstablishedCity,
+    CA.CoastalRegion,
+]
+
+SCHEMA_TYPES = {
+    OWL.Class, OWL.ObjectProperty, OWL.DatatypeProperty, OWL.SymmetricProperty,
+    OWL.TransitiveProperty, OWL.Ontology, OWL.Restriction, RDFS.Class,
+}
+
+
+# ============== HASHING ==============
+
+def split_tbox_abox(g):
+    """
+    Split a graph into its terminological (TBox) and assertional (ABox) parts.
+    """
+    schema_nodes = set()
+    for node_type in SCHEMA_TYPES:
+        schema_nodes.update(g.subjects(RDF.type, node_type))
+
+    tbox, abox = Graph(), Graph()
+    for s, p, o in g:
+        if s in schema_nodes or isinstance(s, BNode):
+            tbox.add((s, p, o))
+        else:
+            abox.add((s, p, o))
+    return tbox, abox
+
+
+def graph_hash(g, canonical=False):
+    """
+    Hash a graph independently of serialization order.
+
+    Blank nodes only get stable labels after canonicalization, which is
+    expensive, so it is only requested for the (small) TBox.
+    """
+    if canonical:
+        g = to_canonical_graph(g)
+    lines = sorted(f"{s.n3()} {p.n3()} {o.n3()} ." for s, p, o in g)
+    return hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
+
+
+def cache_key(g, engine):
+    tbox, abox = split_tbox_abox(g)
+    return f"{engine}:{graph_hash(tbox, canonical=True)}:{graph_hash(abox)}"
+
+
+def load_cache(path):
+    if path and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def save_cache(path, cache):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2)
+
+
+# ============== NATIVE ENGINE ==============
+
+def parse_class_expression(g, node):
+    """
+    Turn an OWL class expression into a nested tuple.
+
+    Returns None for constructs the native engine does not support.
+    """
+    if isinstance(node, URIRef):
+        return ('class', node)
+
+    intersection = g.value(node, OWL.intersectionOf)
+    if intersection is not None:
+        parts = [parse_class_expression(g, n) for n in Collection(g, intersection)]
+        return None if None in parts else ('and', parts)
+
+    union = g.value(node, OWL.unionOf)
+    if union is not None:
+        parts = [parse_class_expression(g, n) for n in Collection(g, union)]
+        return None if None in parts else ('or', parts)
+
+    prop = g.value(node, OWL.onProperty)
+    if prop is None:
+        return None
+
+    value = g.value(node, OWL.hasValue)
+    if value is not None:
+        return ('value', prop, value)
+
+    filler = g.value(node, OWL.someValuesFrom)
+    if filler is not None:
+        if str(filler).startswith(str(XSD)) or filler == RDFS.Literal:
+            return ('some_data', prop, filler)
+        inner = parse_class_expression(g, filler)
+        return None if inner is None else ('some', prop, inner)
+
+    min_card = g.value(node, OWL.minCardinality)
+    if min_card is not None:
+        return ('min', prop, int(min_card))
+
+    return None
+
+
+class NativeReasoner:
+    """
+    Forward-chaining classifier over in-memory indexes of the ABox.
+    """
+
+    def __init__(self, g):
+        self.g = g
+        self.superclasses = self._superclass_closure()
+        self.inverses = defaultdict(set)
+        for p, q in g.subject_objects(OWL.inverseOf):
+            self.inverses[p].add(q)
+            self.inverses[q].add(p)
+        self.symmetric = set(g.subjects(RDF.type, OWL.SymmetricProperty))
+        self.domains = defaultdict(set)
+        for p, c in g.subject_objects(RDFS.domain):
+            self.domains[p].add(c)
+        self.ranges = defaultdict(set)
+        for p, c in g.subject_objects(RDFS.range):
+            if isinstance(c, URIRef) and not str(c).startswith(str(XSD)):
+                self.ranges[p].add(c)
+
+        self.definitions = {}
+        self.unsupported = []
+        for cls, expr_node in g.subject_objects(OWL.equivalentClass):
+            expr = parse_class_expression(g, expr_node)
+            if expr is None:
+                self.unsupported.append(cls)
+            else:
+                self.definitions[cls] = expr
+
+        # property -> subject -> objects, and property -> object -> subjects
+        self.forward = defaultdict(lambda: defaultdict(set))
+        self.backward = defaultdict(lambda: defaultdict(set))
+        # class -> members
+        self.members = defaultdict(set)
+        self.asserted = defaultdict(set)
+        # every named individual of the ABox, the extension of owl:Thing
+        self.individuals = set()
+
+    def _superclass_closure(self):
+        direct = defaultdict(set)
+        for sub, sup in self.g.subject_objects(RDFS.subClassOf):
+            if isinstance(sup, URIRef):
+                direct[sub].add(sup)
+        closure = {}
+        for cls in direct:
+            seen, stack = set(), list(direct[cls])
+            while stack:
+                sup = stack.pop()
+                if sup not in seen:
+                    seen.add(sup)
+                    stack.extend(direct.get(sup, ()))
+            closure[cls] = seen
+        return closure
+
+    def _add_type(self, individual, cls):
+        if individual in self.members[cls]:
+            return False
+        self.members[cls].add(individual)
+        for sup in self.superclasses.get(cls, ()):
+            self.members[sup].add(individual)
+        return True
+
+    def _add_edge(self, s, p, o):
+        if o in self.forward[p][s]:
+            return
+        self.forward[p][s].add(o)
+        self.backward[p][o].add(s)
+        if isinstance(o, Literal):
+            return
+        for q in self.inverses.get(p, ()):
+            self._add_edge(o, q, s)
+        if p in self.symmetric:
+            self._add_edge(o, p, s)
+
+    def _load_abox(self):
+        classes = set(self.g.subjects(RDF.type, OWL.Class)) | set(self.superclasses)
+        for s, p, o in self.g:
+            if isinstance(s, BNode):
+                continue
+            if p == RDF.type:
+                if o in classes or o == OWL.NamedIndividual:
+                    self.individuals.add(s)
+                    if o != OWL.NamedIndividual:
+                        self.asserted[o].add(s)
+                        self._add_type(s, o)
+            elif p not in (RDFS.label, RDFS.comment) and not str(p).startswith((str(RDFS), str(OWL))):
+                self._add_edge(s, p, o)
+                self.individuals.add(s)
+                if not isinstance(o, (Literal, BNode)):
+                    self.individuals.add(o)
+
+        # Domain and range typing
+        for p, subjects in self.forward.items():
+            for s, objects in subjects.items():
+                for c in self.domains.get(p, ()):
+                    self._add_type(s, c)
+                for c in self.ranges.get(p, ()):
+                    for o in objects:
+                        if not isinstance(o, Literal):
+                            self._add_type(o, c)
+
+    def evaluate(self, expr):
+        """
+        Return the set of individuals that satisfy a class expression.
+        """
+        kind = expr[0]
+        if kind == 'class':
+            return set(self.members.get(expr[1], ()))
+        if kind == 'and':
+            parts = sorted((self.evaluate(e) for e in expr[1]), key=len)
+            result = parts[0]
+            for part in parts[1:]:
+                result &= part
+            return result
+        if kind == 'or':
+            result = set()
+            for e in expr[1]:
+                result |= self.evaluate(e)
+            return result
+        if kind == 'value':
+            return set(self.backward[expr[1]].get(expr[2], ()))
+        if kind == 'some':
+            result = set()
+            for target in self.evaluate(expr[2]):
+                result |= self.backward[expr[1]].get(target, set())
+            return result
+        if kind == 'some_data':
+            datatype = expr[2]
+            return {
+                s for s, objects in self.forward[expr[1]].items()
+                if any(isinstance(o, Literal) and (datatype == RDFS.Literal or o.datatype == datatype)
+                       for o in objects)
+            }
+        if kind == 'min':
+            # Counting distinct names assumes unique names; OWL itself only
+            # entails "min 2" and above with owl:differentFrom assertions.
+            if expr[2] == 0:
+                # "min 0" holds for every individual, with or without the property
+                return set(self.individuals)
+            return {s for s, objects in self.forward[expr[1]].items() if len(objects) >= expr[2]}
+        raise ValueError(f"Unsupported class expression: {kind}")
+
+    def classify(self):
+        """
+        Compute the members of every defined class up to a fixpoint.
+
+        Returns:
+            Dictionary mapping class IRI to the sorted list of member IRIs
+        """
+        self._load_abox()
+        changed = True
+        while changed:
+            changed = False
+            for cls, expr in self.definitions.items():
+                for individual in self.evaluate(expr):
+                    if self._add_type(individual, cls):
+                        changed = True
+
+        return {
+            str(cls): sorted(str(i) for i in self.members.get(cls, ()))
+            for cls in self.definitions
+        }
+
+
+def classify_native(g):
+    reasoner = NativeReasoner(g)
+    memberships = reasoner.classify()
+    for cls in reasoner.unsupported:
+        print(f"Warning: definition of {cls} uses constructs the native engine does not support")
+    return memberships
+
+
+# ============== HERMIT (OWLREADY2) ENGINE ==============
+
+def classify_hermit(g):
+    """
+    Classify with owlready2's HermiT. Needs owlready2 and a Java runtime.
+    """
+    try:
+        import owlready2
+    except ImportError:
+        sys.exit("Error: the hermit engine requires owlready2 (pip install owlready2)")
+
+    import tempfile
+    with tempfile.NamedTemporaryFile(suffix=".owl", delete=False) as tmp:
+        g.serialize(destination=tmp.name, format="xml")
+    try:
+        world = owlready2.World()
+        onto = world.get_ontology(f"file://{tmp.name}").load()
+        with onto:
+            owlready2.sync_reasoner_hermit(world, infer_property_values=True, debug=0)
+        memberships = {}
+        for cls_iri in DEFINED_CLASSES:
+            cls = world[str(cls_iri)]
+            if cls is not None:
+                memberships[str(cls_iri)] = sorted(i.iri for i in cls.instances(world=world))
+        return memberships
+    finally:
+        os.unlink(tmp.name)
+
+
+ENGINES = {
+    'native': classify_native,
+    'hermit': classify_hermit,
+}
+
+
+# ============== INSTANCE GENERATION ==============
+
+def add_generated_cities(g, count, seed=42):
+    """
+    Add synthetic cities to the ABox for scaling experiments.
+    """
+    random.seed(seed)
+    regions = sorted(
+        set(g.subjects(RDF.type, CA.NorthernRegion))
+        | set(g.subjects(RDF.type, CA.CentralRegion))
+        | set(g.subjects(RDF.type, CA.SouthernRegion))
+    )
+    city_types = [CA.MajorCity, CA.MediumCity, CA.SmallCity]
+
+    for i in range(count):
+        city = CA[f"GeneratedCity{i}"]
+        g.add((city, RDF.type, random.choice(city_types)))
+        g.add((city, RDFS.label, Literal(f"Generated City {i}")))
+        g.add((city, CA.locatedIn, random.choice(regions)))
+        g.add((city, CA.hasPopulation, Literal(random.randint(1000, 4000000), datatype=XSD.integer)))
+        if random.random() < 0.8:
+            g.add((city, CA.establishedYear, Literal(random.randint(1769, 1990), datatype=XSD.integer)))
+
+
+def classify(g, engine='native', cache_path=None):
+    """
+    Classify a graph, reusing a cached result when TBox and ABox are unchanged.
+
+    Returns:
+        Dictionary with 'memberships', 'reasoning_time' (seconds) and 'cached'
+    """
+    cache = load_cache(cache_path)
+    key = cache_key(g, engine)
+
+    if key in cache:
+        entry = cache[key]
+        return {'memberships': entry['memberships'], 'reasoning_time': entry['reasoning_time'], 'cached': True}
+
+    start = time.perf_counter()
+    memberships = ENGINES[engine](g)
+    reasoning_time = time.perf_counter() - start
+
+    if cache_path:
+        cache[key] = {'memberships': memberships, 'reasoning_time': reasoning_time}
+        save_cache(cache_path, cache)
+
+    return {'memberships': memberships, 'reasoning_time': reasoning_time, 'cached': False}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify the extended California ontology")
+    parser.add_argument("ontology", nargs="?", default="california_extended.owl")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="native")
+    parser.add_argument("--generate", type=int, default=0, metavar="N",
+                        help="add N synthetic cities before classifying")
+    parser.add_argument("--cache", default="classification_cache.json",
+                        help="classification cache file ('' disables caching)")
+    args = parser.parse_args()
+
+    g = Graph()
+    start = time.perf_counter()
+    g.parse(args.ontology, format="xml")
+    if args.generate:
+        add_generated_cities(g, args.generate)
+    load_time = time.perf_counter() - start
+
+    result = classify(g, engine=args.engine, cache_path=args.cache or None)
+
+    print("=" * 60)
+    print("CLASSIFICATION RESULTS")
+    print("=" * 60)
+    for cls in DEFINED_CLASSES:
+        members = result['memberships'].get(str(cls), [])
+        names = [m.split('#')[-1] for m in members]
+        shown = ", ".join(names[:12]) + (f", ... (+{len(names) - 12})" if len(names) > 12 else "")
+        print(f"\n{cls.split('#')[-1]} ({len(members)} members)")
+        print(f"  {shown}")
+
+    print(f"\nTriples: {len(g)}")
+    print(f"Load time: {load_time:.3f}s")
+    status = "cached result" if result['cached'] else f"engine={args.engine}"
+    print(f"Reasoning time: {result['reasoning_time']:.3f}s ({status})")
+
+
+if __name__ == "__main__":
+    main()